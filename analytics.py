@@ -0,0 +1,330 @@
+# analytics.py
+#
+# Flow metrics from the board's TransitionLog (see model.py): lead and cycle
+# times, throughput per period, work in progress per column and a cumulative
+# flow series. The log is kept as parallel columns, so a rebuild is a handful
+# of passes made of C-level builtins (zip, dict, itertools.compress, sorted,
+# bisect) over whole columns rather than a Python loop per transition; after
+# that each mutation only folds in the rows it appended.
+#
+# Cards that were on the board before transitions were recorded have no
+# rows; they still count towards WIP and the flow series (which work back
+# from the current columns) but have no lead or cycle time. Only a card's
+# creation row (no source column) starts its lead time, so a card that was
+# only seen moving has a cycle time but no lead time.
+
+import operator
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import compress, repeat
+
+from PyQt6.QtCore import Qt, QTimer, QPointF
+from PyQt6.QtGui import QPainter, QColor, QPolygonF, QFont
+from PyQt6.QtWidgets import QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+
+DAY = 86400.0
+PERIODS = [("Day", DAY), ("Week", 7 * DAY), ("Month", 30 * DAY)]
+FLOW_SAMPLES = 60
+FLOW_COLORS = ['#5b8def', '#f2a541', '#4caf50', '#c06cd8', '#e05d5d', '#3fb8af', '#9e9e9e']
+
+
+def percentile(values, q):
+    """The ``q`` (0..1) percentile of sorted ``values``, interpolated; None if empty."""
+    if not values:
+        return None
+    pos = (len(values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def _matching(values, wanted):
+    """A selector for itertools.compress: which of ``values`` are in ``wanted``."""
+    return map(wanted.__contains__, values)
+
+
+def _first_by_key(keys, values):
+    """{key: its first value}: a dict built back to front keeps the earliest."""
+    return dict(zip(reversed(keys), reversed(values)))
+
+
+class FlowMetrics:
+    """Flow metrics over a BoardModel's transitions, kept up to date as it changes.
+
+    A card has started once it entered ``start_column`` or any column after
+    it, and is done while its last transition put it in ``done_column``
+    (by default the middle and the last column: In Progress and Done on the
+    default board).
+    """
+
+    def __init__(self, model, start_column=None, done_column=None, subscribe=True):
+        self.model = model
+        self.start_column = start_column
+        self.done_column = done_column
+        self.stale = True
+        if subscribe:
+            model.subscribe(self.on_change)
+
+    def on_change(self, change):
+        if change.op == 'reset' or not self.model.transitions.ordered:
+            self.stale = True
+        elif not self.stale:
+            # Creates, cross-column moves and deletes (batched or not) all
+            # append to the log; take whatever is new.
+            self._absorb(self.seen, len(self.times))
+
+    def set_columns(self, start_column=None, done_column=None):
+        self.start_column = start_column
+        self.done_column = done_column
+        self.stale = True
+
+    def ensure(self):
+        if self.stale or self.log is not self.model.transitions or self.keys != list(self.model.columns):
+            self.rebuild()
+
+    def rebuild(self):
+        log = self.log = self.model.transitions
+        keys = self.keys = list(self.model.columns)
+        self.done_key = self.done_column or (keys[-1] if keys else None)
+        self.start_key = self.start_column or (keys[len(keys) // 2] if keys else None)
+        start = keys.index(self.start_key) if self.start_key in keys else len(keys)
+        self.started_keys = set(keys[start:])
+
+        if log.ordered:
+            # The log's own columns: rows appended later show up here too.
+            cards, sources, targets, times = log.cards, log.sources, log.targets, log.times
+        else:
+            order = sorted(range(len(log)), key=log.times.__getitem__)
+            cards = [log.cards[i] for i in order]
+            sources = [log.sources[i] for i in order]
+            targets = [log.targets[i] for i in order]
+            times = array('d', [log.times[i] for i in order])
+        self.cards, self.sources, self.targets, self.times = cards, sources, targets, times
+
+        created = list(map(operator.is_, sources, repeat(None)))
+        self.created = _first_by_key(list(compress(cards, created)), list(compress(times, created)))
+        started = list(_matching(targets, self.started_keys))
+        self.started = _first_by_key(list(compress(cards, started)), list(compress(times, started)))
+        self.last = dict(zip(cards, targets))
+        done_key = self.done_key
+        arrived = list(map(operator.eq, targets, repeat(done_key)))
+        arrived = dict(zip(compress(cards, arrived), compress(times, arrived)))
+        finished = list(compress(self.last, map(operator.eq, self.last.values(), repeat(done_key))))
+        self.done = dict(zip(finished, map(arrived.__getitem__, finished)))
+        self.seen = len(times)
+        self.stale = False
+
+    def _absorb(self, first, stop):
+        cards, sources, targets, times = self.cards, self.sources, self.targets, self.times
+        for i in range(first, stop):
+            card, target, at = cards[i], targets[i], times[i]
+            if sources[i] is None:
+                self.created.setdefault(card, at)
+            if target in self.started_keys:
+                self.started.setdefault(card, at)
+            self.last[card] = target
+            if target == self.done_key:
+                self.done[card] = at
+            else:
+                self.done.pop(card, None)
+        self.seen = stop
+
+    # Metrics
+
+    def lead_times(self):
+        """Sorted seconds from creation to done, for every done card whose creation was recorded."""
+        self.ensure()
+        done = self.done
+        cards = list(compress(done, map(self.created.__contains__, done)))
+        return sorted(map(operator.sub, map(done.__getitem__, cards), map(self.created.__getitem__, cards)))
+
+    def cycle_times(self):
+        """Sorted seconds from starting to done, for every done card that started."""
+        self.ensure()
+        done = self.done
+        cards = list(compress(done, map(self.started.__contains__, done)))
+        return sorted(map(operator.sub, map(done.__getitem__, cards), map(self.started.__getitem__, cards)))
+
+    def throughput(self, period=DAY):
+        """[(period start, cards done)] for every period with completions, oldest first."""
+        self.ensure()
+        counts = Counter(map(int, map(operator.floordiv, self.done.values(), repeat(period))))
+        return [(index * period, counts[index]) for index in sorted(counts)]
+
+    def wip(self):
+        """{column key: cards in it now}."""
+        return {key: len(column.cards) for key, column in self.model.columns.items()}
+
+    def in_progress(self):
+        """Cards in the started columns other than the done column."""
+        self.ensure()
+        return sum(count for key, count in self.wip().items() if key in self.started_keys and key != self.done_key)
+
+    def cumulative_flow(self, samples=FLOW_SAMPLES, since=None, until=None):
+        """(times, {column key: counts at those times}) from the first transition until now.
+
+        A column's count at ``t`` is its count now less what arrived after
+        ``t`` plus what left after ``t``, so the log is counted once, newest
+        segment first, with Counter doing the per-row work.
+        """
+        self.ensure()
+        times = self.times
+        until = time.time() if until is None else until
+        if since is None:
+            since = times[0] if times else until
+        step = (until - since) / max(samples - 1, 1)
+        points = [since + step * i for i in range(samples)]
+        counts = self.wip()
+        series = {key: [0] * samples for key in counts}
+        stop = len(times)
+        for j in reversed(range(samples)):
+            first = bisect_right(times, points[j], 0, stop)
+            arrived = Counter(self.targets[first:stop])
+            left = Counter(self.sources[first:stop])
+            for key in counts:
+                counts[key] += left[key] - arrived[key]
+                series[key][j] = counts[key]
+            stop = first
+        return points, series
+
+    def summary(self):
+        lead, cycle = self.lead_times(), self.cycle_times()
+        return {
+            'done': len(self.done),
+            'in_progress': self.in_progress(),
+            'lead_median_s': percentile(lead, 0.5),
+            'lead_p85_s': percentile(lead, 0.85),
+            'cycle_median_s': percentile(cycle, 0.5),
+            'cycle_p85_s': percentile(cycle, 0.85),
+            'transitions': len(self.times),
+        }
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 2 * DAY:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / DAY:.1f} d"
+
+
+class FlowChart(QWidget):
+    """Stacked area chart of a cumulative flow series, first column on top."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(480, 220)
+        self.points = []
+        self.series = {}
+        self.names = {}
+
+    def set_flow(self, points, series, names):
+        self.points, self.series, self.names = points, series, names
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = self.rect().adjusted(8, 8, -120, -8)
+        keys = list(self.series)
+        if len(self.points) < 2 or not keys:
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "No transitions recorded yet")
+            return
+        # Stack done at the bottom, the first column on top.
+        stacked = []
+        base = [0] * len(self.points)
+        for key in reversed(keys):
+            top = [b + v for b, v in zip(base, self.series[key])]
+            stacked.append((key, base, top))
+            base = top
+        peak = max(max(base), 1)
+        n = len(self.points)
+
+        def point(i, value):
+            return QPointF(rect.left() + rect.width() * i / (n - 1), rect.bottom() - rect.height() * value / peak)
+
+        painter.setFont(QFont(self.font().family(), 8))
+        for i, (key, low, high) in enumerate(stacked):
+            color = QColor(FLOW_COLORS[(len(keys) - 1 - i) % len(FLOW_COLORS)])
+            polygon = QPolygonF([point(j, v) for j, v in enumerate(high)]
+                                + [point(j, low[j]) for j in reversed(range(n))])
+            painter.setPen(color.darker(130))
+            painter.setBrush(color)
+            painter.drawPolygon(polygon)
+            painter.fillRect(rect.right() + 12, rect.bottom() - 16 * (i + 1), 10, 10, color)
+            painter.setPen(self.palette().windowText().color())
+            painter.drawText(rect.right() + 28, rect.bottom() - 16 * i - 6, f"{self.names.get(key, key)} ({high[-1] - low[-1]})")
+
+
+class FlowPanel(QDialog):
+    """Flow analytics for a board: summary, throughput and cumulative flow."""
+
+    def __init__(self, board):
+        super().__init__(board)
+        self.setWindowTitle("Flow Analytics")
+        self.board = board
+        self.metrics = FlowMetrics(board.model)
+        # Model changes come in bursts; redraw once they settle.
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.refresh)
+        board.model.subscribe(self.on_change)
+
+        self.period = QComboBox()
+        for name, seconds in PERIODS:
+            self.period.addItem(name, seconds)
+        self.period.currentIndexChanged.connect(self.refresh)
+        self.stats = QLabel()
+        self.stats.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.throughput = QLabel()
+        self.chart = FlowChart()
+
+        top = QHBoxLayout()
+        top.addWidget(self.stats, 1)
+        period = QVBoxLayout()
+        period.addWidget(QLabel("Throughput per"))
+        period.addWidget(self.period)
+        period.addWidget(self.throughput, 1)
+        top.addLayout(period)
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.chart, 1)
+
+    def on_change(self, change):
+        if self.isVisible():
+            self.timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        metrics = self.metrics
+        model = self.board.model
+        summary = metrics.summary()
+        names = {key: column.name for key, column in model.columns.items()}
+        wip = ", ".join(f"{names[key]} {count}" for key, count in metrics.wip().items())
+        self.stats.setText(
+            f"Work in progress: {summary['in_progress']} ({wip})\n"
+            f"Done: {summary['done']} (started in {names.get(metrics.start_key, '-')}, "
+            f"done in {names.get(metrics.done_key, '-')})\n"
+            f"Lead time: median {format_duration(summary['lead_median_s'])}, "
+            f"85% {format_duration(summary['lead_p85_s'])}\n"
+            f"Cycle time: median {format_duration(summary['cycle_median_s'])}, "
+            f"85% {format_duration(summary['cycle_p85_s'])}\n"
+            f"Transitions recorded: {summary['transitions']}")
+        period = self.period.currentData()
+        recent = metrics.throughput(period)[-8:]
+        self.throughput.setText("\n".join(
+            f"{time.strftime('%Y-%m-%d', time.localtime(start))}: {count}" for start, count in recent) or "-")
+        points, series = metrics.cumulative_flow()
+        self.chart.set_flow(points, series, names)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
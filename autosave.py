@@ -0,0 +1,197 @@
+# autosave.py
+#
+# Background saving for KanbanBoard. Edits schedule a save, bursts of edits
+# are coalesced by a debounce timer, and serialization plus the file write
+# happen on a worker thread. Saves append to the board's journal (see
+# journal.py); full snapshots go through a temp file that is renamed over the
+# target, so a crash never leaves a half-written board behind.
+
+import os
+import sqlite3
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from binary_store import is_binary_path
+from journal import append_records, write_snapshot
+from sqlite_store import SqliteStore, is_sqlite_path
+from watch import record_ids
+
+AUTOSAVE_DELAY_MS = 1500
+
+
+def snapshot(model, filename=None):
+    """Convert the board to plain dicts so the GUI can keep editing while it is saved.
+
+    Binary boards take card bodies that were never read as they are.
+    """
+    return model.to_dict(lazy=filename is not None and is_binary_path(filename))
+
+
+class SaveWorker(QThread):
+    """Runs save jobs in order on a background thread.
+
+    A snapshot job supersedes every job still pending for the same file, and
+    consecutive journal appends to one file are merged into a single write.
+    """
+
+    saved = pyqtSignal(str, float)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._pending = []
+        self._stopping = False
+        self._busy = False
+        self.coalesced = 0
+
+    def submit(self, filename, data):
+        with self._cond:
+            kept = [job for job in self._pending if job[1] != filename]
+            self.coalesced += len(self._pending) - len(kept)
+            kept.append(['snapshot', filename, data])
+            self._pending = kept
+            self._cond.notify()
+
+    def submit_records(self, filename, generation, records):
+        with self._cond:
+            last = self._pending[-1] if self._pending else None
+            if last and last[0] == 'append' and last[1] == filename and last[2][0] == generation:
+                last[2][1].extend(records)
+                self.coalesced += 1
+            else:
+                self._pending.append(['append', filename, (generation, list(records))])
+            self._cond.notify()
+
+    def queued(self):
+        with self._cond:
+            return len(self._pending) + int(self._busy)
+
+    def wait_idle(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                kind, filename, payload = self._pending.pop(0)
+                self._busy = True
+            start = time.perf_counter()
+            try:
+                if is_sqlite_path(filename):
+                    with SqliteStore(filename) as store:
+                        if kind == 'snapshot':
+                            store.replace_board(payload)
+                        else:
+                            store.apply_records(payload[1])
+                elif kind == 'snapshot':
+                    write_snapshot(filename, payload)
+                else:
+                    append_records(filename, *payload)
+            except (OSError, sqlite3.Error) as e:
+                self.failed.emit(filename, str(e))
+            except Exception as e:
+                # Not a disk error, but the loop has to survive it: flush()
+                # waits for the worker to go idle.
+                self.failed.emit(filename, f"{type(e).__name__}: {e}")
+            else:
+                self.saved.emit(filename, (time.perf_counter() - start) * 1000.0)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+class AutoSaver(QObject):
+    """Debounces board edits into background saves and keeps save statistics."""
+
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, board, delay_ms=AUTOSAVE_DELAY_MS):
+        super().__init__(board)
+        self.board = board
+        self.enabled = True
+        self.last_latency_ms = None
+        self.saves = 0
+        self.errors = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.save_now)
+
+        self.worker = SaveWorker()
+        self.worker.saved.connect(self._on_saved)
+        self.worker.failed.connect(self._on_failed)
+        self.worker.start()
+
+    def schedule(self):
+        if self.enabled:
+            self.timer.start()
+
+    def save_now(self, filename=None, compact=False):
+        """Queue a save: journal appends when possible, otherwise a full snapshot."""
+        self.timer.stop()
+        filename = filename or self.board.filename
+        if filename is None:
+            # Untitled: nothing to save to until the user picks a file.
+            return
+        journal = self.board.journal
+        if not compact and journal.can_append(filename):
+            records = journal.take()
+            if records:
+                self.board.watcher.forget(record_ids(records))
+                self.worker.submit_records(filename, journal.generation, records)
+            return
+        meta = self.board.model.meta
+        meta['journal_generation'] = meta.get('journal_generation', 0) + 1
+        journal.reset(filename, meta['journal_generation'], fresh=True)
+        self.board.watcher.forget()
+        self.worker.submit(filename, snapshot(self.board.model, filename))
+
+    def flush(self, timeout=None):
+        """Write any scheduled save and wait for the worker to go idle."""
+        if self.timer.isActive():
+            self.save_now()
+        return self.worker.wait_idle(timeout)
+
+    def shutdown(self):
+        self.flush()
+        self.worker.stop()
+
+    def stats(self):
+        return {
+            'saves': self.saves,
+            'errors': self.errors,
+            'last_latency_ms': self.last_latency_ms,
+            'queued': self.worker.queued(),
+            'coalesced': self.worker.coalesced,
+        }
+
+    def _on_saved(self, filename, latency_ms):
+        self.saves += 1
+        self.last_latency_ms = latency_ms
+        self.status_changed.emit(f"Saved {os.path.basename(filename)} · {latency_ms:.0f} ms · {self.worker.queued()} queued")
+
+    def _on_failed(self, filename, message):
+        self.errors += 1
+        self.board.journal.invalidate()
+        self.status_changed.emit(f"Save failed: {message}")
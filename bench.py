@@ -0,0 +1,470 @@
+# bench.py
+#
+# Headless performance benchmarks for the board. Runs under Qt's offscreen
+# platform against generated boards and writes machine-readable JSON so runs
+# can be compared:
+#
+#     python bench.py --sizes 100,1000,10000,50000 --output bench.json
+#
+# --leak-check N runs N load/refresh/theme/edit cycles per size instead and
+# exits non-zero if the number of live widgets keeps growing.
+#
+# --sync 2,8,32 measures the sync server's broadcast path instead: one
+# headless client edits cards and the others receive the edits, over a Unix
+# socket and over TCP, for each number of clients.
+
+import argparse
+import asyncio
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QCoreApplication, QEvent, QMimeData, QPointF, Qt, QT_VERSION_STR
+from PyQt6.QtGui import QDropEvent
+from PyQt6.QtWidgets import QApplication, QDialog
+
+import column as column_module
+from analytics import FlowMetrics
+from board import KanbanBoard, read_board_file
+from card import KanbanCard, MIME_TYPE, encode_card_id
+from column import KanbanColumn, VIRTUAL_THRESHOLD
+from dialog import AddCardDialog
+from ids import migrate
+from model import BoardModel, TransitionLog
+from perf import profiler
+from search import SearchIndex
+from sync_server import HeadlessClient, SyncServer
+
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+SEARCH_QUERY = "deploy cr"
+BULK_CARDS = 500
+SYNC_OPS = 5000
+SYNC_BURST = 50
+COLUMNS = [
+    ('backlog', 'Backlog', 0.5),
+    ('todo', 'To Do', 0.2),
+    ('inprogress', 'In Progress', 0.1),
+    ('testing', 'Testing', 0.1),
+    ('done', 'Done', 0.1),
+]
+WORDS = ("fix update board column card drag drop theme save load parser index "
+         "release review deploy crash memory layout widget search filter").split()
+
+
+def generate_board(size, seed=0):
+    """A board of ``size`` cards spread over the default columns, with checklists."""
+    rnd = random.Random(seed)
+    data = {'columns': {key: {'name': name, 'items': []} for key, name, _ in COLUMNS}}
+    keys = [key for key, _, _ in COLUMNS]
+    weights = [weight for _, _, weight in COLUMNS]
+    for n in range(1, size + 1):
+        checklist = [
+            {'text': ' '.join(rnd.choices(WORDS, k=rnd.randint(2, 6))), 'done': rnd.random() < 0.5}
+            for _ in range(rnd.choice((0, 0, 1, 2, 3, 5, 8)))
+        ]
+        data['columns'][rnd.choices(keys, weights)[0]]['items'].append({
+            'id': str(n),
+            'title': ' '.join(rnd.choices(WORDS, k=rnd.randint(2, 7))).capitalize(),
+            'description': ' '.join(rnd.choices(WORDS, k=rnd.randint(0, 40))),
+            'tag': rnd.choice(('', '', 'Bug', 'Feature', 'Urgent')),
+            'priority': rnd.choice(('Low', 'Med', 'High')),
+            'checklist': checklist,
+        })
+    return migrate(data)
+
+
+def generate_history(data, seed=0, start=1.6e9):
+    """Transitions walking every card of ``data`` from the first column to its
+    current one, a few hours apart. That is about two per card on generated
+    boards, so the 50000 card size times analytics over ~100k transitions."""
+    rnd = random.Random(seed)
+    keys = list(data['columns'])
+    walks = []
+    for key, col in data['columns'].items():
+        path = keys[:keys.index(key) + 1]
+        walks.extend((item['id'], path) for item in col['items'])
+    rnd.shuffle(walks)
+    rows = []
+    at = start
+    for card_id, path in walks:
+        at += rnd.random() * 600
+        rows.append([card_id, None, path[0], at])
+        for step, (source, target) in enumerate(zip(path, path[1:])):
+            rows.append([card_id, source, target, at + (step + 1) * rnd.random() * 4 * 3600])
+    rows.sort(key=lambda row: row[3])
+    return rows
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(app, fn, repeat):
+    """Time ``fn`` ``repeat`` times, then run it once more under tracemalloc.
+
+    Pending events are drained before each run and processed inside the timed
+    region, so deferred layout and paint work is charged to the operation.
+    """
+    times = []
+    for _ in range(repeat):
+        app.processEvents()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+
+    app.processEvents()
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    fn()
+    app.processEvents()
+    py_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'seconds': times,
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'py_peak_bytes': py_peak,
+        'rss_delta_bytes': rss_bytes() - rss_before,
+    }
+
+
+class _AcceptingDialog(AddCardDialog):
+    """AddCardDialog that accepts immediately with a fixed task, for timing show_add_dialog."""
+
+    def exec(self):
+        self.title_input.setText("Benchmark task")
+        return QDialog.DialogCode.Accepted
+
+
+def simulate_drop(column, card_id):
+    # The event does not own its mime data, so both must stay alive for the call.
+    mime_data = QMimeData()
+    mime_data.setData(MIME_TYPE, encode_card_id(card_id))
+    event = QDropEvent(QPointF(10, 10), Qt.DropAction.MoveAction, mime_data,
+                       Qt.MouseButton.LeftButton, Qt.KeyboardModifier.NoModifier)
+    column.dropEvent(event)
+
+
+def bench_model(app, data, repeat):
+    """BoardModel operations on their own; none of these touch Qt."""
+    results = {}
+    models = []
+    results['BoardModel.load'] = measure(app, lambda: models.append(BoardModel(copy.deepcopy(data))), repeat)
+    model = models[0]
+    models.clear()
+    results['BoardModel.to_dict'] = measure(app, model.to_dict, repeat)
+
+    rnd = random.Random(1)
+    keys = list(model.columns)
+    ids = [card.id for card in model.cards()]
+
+    def mutate():
+        for _ in range(1000):
+            card_id = rnd.choice(ids)
+            roll = rnd.random()
+            if roll < 0.5:
+                model.move_card(card_id, rnd.choice(keys), 0)
+            elif roll < 0.9:
+                model.update_card(card_id, {'priority': rnd.choice(('Low', 'Med', 'High'))}, 'priority')
+            else:
+                model.update_card(card_id, {'title': 'Renamed'})
+    results['BoardModel 1000 mixed ops'] = measure(app, mutate, repeat)
+
+    index = SearchIndex(model)
+    results['SearchIndex.rebuild'] = measure(app, index.rebuild, repeat)
+    results['SearchIndex.query'] = measure(app, lambda: index.query("tag:bug deploy"), repeat)
+    model.unsubscribe(index.on_change)
+
+    model.transitions = TransitionLog(generate_history(data))
+    metrics = FlowMetrics(model, subscribe=False)
+    results['FlowMetrics.rebuild'] = measure(app, metrics.rebuild, repeat)
+    results['FlowMetrics.summary'] = measure(app, metrics.summary, repeat)
+    results['FlowMetrics.cumulative_flow'] = measure(app, metrics.cumulative_flow, repeat)
+    return results
+
+
+def measure_progressive_open(app, board, filename):
+    """Open ``filename`` through the background loader and report how responsive it stayed."""
+    app.processEvents()
+    start = time.perf_counter()
+    board.open_board(filename)
+    first_screen = None
+    longest = 0.0
+    while board.loader is not None or board.filler.active():
+        tick = time.perf_counter()
+        app.processEvents()
+        longest = max(longest, time.perf_counter() - tick)
+        if first_screen is None and board.loader is None:
+            first_screen = time.perf_counter() - start
+    return {
+        'first_screen_s': first_screen,
+        'total_s': time.perf_counter() - start,
+        'longest_event_loop_turn_s': longest,
+    }
+
+
+def bench_size(app, size, repeat, workdir):
+    data = generate_board(size)
+    results = bench_model(app, data, repeat)
+    boards = []
+
+    def init():
+        boards.append(KanbanBoard(copy.deepcopy(data)))
+    results['KanbanBoard.__init__'] = measure(app, init, repeat)
+    board = boards.pop()
+    # Keep the debounce timer from writing kanban_save.json into the cwd.
+    board.set_autosave(False)
+    for other in boards:
+        other.autosaver.shutdown()
+        other.deleteLater()
+    boards.clear()
+
+    results['refresh_board'] = measure(app, board.refresh_board, repeat)
+
+    themes = iter(['light', 'msu', 'dark'] * (repeat + 1))
+    results['set_theme'] = measure(app, lambda: board.set_theme(next(themes)), repeat)
+
+    col_data = max(board.model.columns.values(), key=lambda col: len(col.cards))
+    virtual = len(col_data.cards) >= VIRTUAL_THRESHOLD
+    columns = []
+    results['KanbanColumn.load_cards'] = measure(
+        app, lambda: columns.append(KanbanColumn(col_data.key, col_data.name, col_data.cards, virtual=virtual)), repeat)
+    for col in columns:
+        col.deleteLater()
+
+    ids = [card.id for card in board.model.columns['backlog'].cards]
+    moves = iter(ids[:repeat + 1])
+    target = board.columns['todo']
+    results['dropEvent'] = measure(app, lambda: simulate_drop(target, next(moves)), repeat)
+
+    # Triage: tag, then move, up to BULK_CARDS cards as one batch each.
+    bulk = [card.id for card in board.model.cards()][:BULK_CARDS]
+    tags = iter(['Bug', 'Feature'] * (repeat + 1))
+    results['bulk tag'] = measure(app, lambda: board.model.update_cards(bulk, {'tag': next(tags)}, 'tag'), repeat)
+    targets = iter(['done', 'todo'] * (repeat + 1))
+    results['bulk move'] = measure(app, lambda: board.model.move_cards(bulk, next(targets)), repeat)
+
+    original = column_module.AddCardDialog
+    column_module.AddCardDialog = _AcceptingDialog
+    try:
+        results['show_add_dialog'] = measure(app, board.columns['done'].show_add_dialog, repeat)
+    finally:
+        column_module.AddCardDialog = original
+    results['allocate_id'] = measure(app, board.model.allocate_id, repeat)
+
+    # One keystroke of typing SEARCH_QUERY into the search bar, cycling
+    # through its prefixes and back to empty.
+    board.search.rebuild()
+    keystrokes = [SEARCH_QUERY[:end] for end in range(1, len(SEARCH_QUERY) + 1)] + ['']
+    typed = iter(keystrokes * (repeat + 1))
+    results['search keystroke'] = measure(app, lambda: board.set_search(next(typed)), len(keystrokes) * repeat)
+    board.set_search('')
+
+    for suffix in ('json', 'kbb', 'db'):
+        filename = os.path.join(workdir, f"bench_{size}.{suffix}")
+        board.filename = filename
+        board.journal.reset(filename, board.model.meta.get('journal_generation', 0), has_base=False)
+        edits = iter(range(repeat + 1))
+
+        def save_snapshot():
+            board.autosaver.save_now(filename, compact=True)
+            board.autosaver.flush()
+
+        def save_edit():
+            # One title edit followed by a save: a journal append or a row update.
+            card_id = board.model.columns['todo'].cards[0].id
+            board.model.update_card(card_id, {'title': f"Edited {next(edits)}"})
+            board.save_board(filename)
+            board.autosaver.flush()
+
+        def reopen():
+            board.model.load(read_board_file(filename)[0])
+        results[f'save_snapshot[{suffix}]'] = measure(app, save_snapshot, repeat)
+        results[f'save_board[{suffix}]'] = measure(app, save_edit, repeat)
+        results[f'open_board[{suffix}]'] = measure(app, reopen, repeat)
+        results[f'open_board_progressive[{suffix}]'] = measure_progressive_open(app, board, filename)
+
+    board.autosaver.shutdown()
+    board.deleteLater()
+    app.processEvents()
+    return results
+
+
+def live_widgets(app):
+    """Live widget counts, after running the deletions deleteLater() has queued."""
+    # Deleting a widget queues the deletion of PyQt's slot proxies for its
+    # signals, which hold the lambdas and so the board; flush both rounds.
+    for _ in range(2):
+        app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+        gc.collect()
+    widgets = QApplication.allWidgets()
+    return {
+        'widgets': len(widgets),
+        'cards': sum(1 for widget in widgets if isinstance(widget, KanbanCard)),
+        'columns': sum(1 for widget in widgets if isinstance(widget, KanbanColumn)),
+        'card wrappers': sum(1 for obj in gc.get_objects() if isinstance(obj, KanbanCard)),
+    }
+
+
+def leak_check(app, size, cycles):
+    """Load, refresh, re-theme, move and delete ``cycles`` times; widget counts must stay flat.
+
+    The first cycle is a warm-up (it fills the card pool); every later one
+    must end with no more live widgets than it did.
+    """
+    data = generate_board(size)
+    board = KanbanBoard()
+    board.set_autosave(False)
+    board.show()
+    counts = []
+    for cycle in range(cycles):
+        board.model.load(copy.deepcopy(data))
+        for col in board.columns.values():
+            col.materialize()
+            col.fill(col.pending())
+        board.refresh_board()
+        for theme in ('light', 'msu', 'dark'):
+            board.set_theme(theme)
+        ids = [card.id for card in board.model.columns['backlog'].cards[:20]]
+        for card_id in ids[:10]:
+            board.model.move_card(card_id, 'done', 0)
+        for card_id in ids[10:]:
+            board.model.delete_card(card_id)
+        board.undo()
+        counts.append(live_widgets(app))
+    board.autosaver.shutdown()
+    board.deleteLater()
+    warm = counts[min(1, len(counts) - 1)]
+    grew = {key: counts[-1][key] - warm[key] for key in warm if counts[-1][key] > warm[key]}
+    return {'cycles': counts, 'grew': grew}
+
+
+async def _broadcast(data, address, clients, ops, burst):
+    server = await SyncServer(copy.deepcopy(data)).start(address)
+    peers = [await HeadlessClient().connect(server.address) for _ in range(clients)]
+    writer, readers = peers[0], peers[1:]
+    latencies = []
+
+    def on_ops(received):
+        now = time.perf_counter()
+        latencies.extend(now - float(op['fields']['title']) for op in received if op['op'] == 'edit')
+
+    for reader in readers:
+        reader.listeners.append(on_ops)
+    card_ids = [card.id for card in writer.model.cards()]
+    expected = ops * len(readers)
+    start = time.perf_counter()
+    for n in range(0, ops, burst):
+        # One frame's worth of edits, each to a different card so none coalesce.
+        for i in range(n, min(n + burst, ops)):
+            writer.model.update_card(card_ids[i % len(card_ids)], {'title': repr(time.perf_counter())})
+        await asyncio.sleep(writer.frame)
+    deadline = time.perf_counter() + 60
+    while sum(reader.received for reader in readers) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    delivered = sum(reader.received for reader in readers)
+    stats = server.stats()
+    for peer in peers:
+        await peer.close()
+    await server.close()
+    latencies.sort()
+    return {
+        'clients': clients,
+        'sent': ops,
+        'delivered': delivered,
+        'frames': stats['frames'],
+        'elapsed_s': elapsed,
+        'delivered_per_s': delivered / elapsed,
+        'latency_ms': {
+            'median': statistics.median(latencies) * 1000 if latencies else None,
+            'p95': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None,
+        },
+    }
+
+
+def bench_sync(size, client_counts, workdir, ops=SYNC_OPS, burst=SYNC_BURST):
+    """Broadcast throughput and latency of the sync server, one sender and N - 1 receivers."""
+    data = generate_board(size)
+    results = {}
+    for transport, address in (('unix', os.path.join(workdir, 'sync.sock')), ('tcp', '127.0.0.1:0')):
+        results[transport] = [asyncio.run(_broadcast(data, address, clients, ops, burst))
+                              for clients in client_counts]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Kanban performance benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated board sizes in cards")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--trace", help="instrument hot paths and write a Chrome trace here")
+    parser.add_argument("--leak-check", type=int, metavar="CYCLES",
+                        help="check that live widget counts stay flat over CYCLES cycles instead of timing")
+    parser.add_argument("--sync", metavar="CLIENTS",
+                        help="comma-separated client counts: benchmark sync broadcasts instead of timing")
+    args = parser.parse_args(argv)
+    if args.trace:
+        profiler.enable()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'platform': platform.platform(),
+            'qpa': os.environ.get("QT_QPA_PLATFORM"),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    leaked = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            if args.sync:
+                counts = [int(n) for n in args.sync.split(",") if n.strip()]
+                report['results'][str(size)] = bench_sync(size, counts, workdir)
+            elif args.leak_check:
+                result = report['results'][str(size)] = leak_check(app, size, args.leak_check)
+                leaked = leaked or bool(result['grew'])
+            else:
+                report['results'][str(size)] = bench_size(app, size, args.repeat, workdir)
+            print(f"{size} cards done", file=sys.stderr)
+    if args.trace:
+        report['profile'] = profiler.snapshot()
+        profiler.export_trace(args.trace)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if leaked:
+        sys.exit("live widget counts grew during --leak-check")
+
+
+if __name__ == "__main__":
+    main()
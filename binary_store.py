@@ -0,0 +1,277 @@
+# binary_store.py
+#
+# Compact binary board files (.kbb). A card needs only its id, title, tag,
+# priority and checklist counts to be shown, so those live in a fixed-size
+# card index and a small strings segment, and each card's description and
+# checklist (its "body") is a separate blob in one body segment:
+#
+#     header | bodies | card index | strings | meta (JSON)
+#
+# Opening a board memory-maps the file and reads the index and strings only;
+# a card's body stays a Body reference into the mapping until it is needed
+# (see model.Card). Saving copies bodies that were never read straight from
+# the old mapping. Edits after a save go to the same journal as JSON boards
+# (see journal.py), which dispatches on is_binary_path().
+#
+# A file's mapping is a BodyFile shared by its Bodies. A save (on the
+# autosave thread) moves the bodies it copied over to a mapping of the new
+# file and closes the old one once no Body is left in it; the old file of the
+# same name is closed before the rename, which Windows refuses while a
+# mapping is open. Body reads and that swap hold _LOCK.
+
+import json
+import mmap
+import os
+import struct
+import threading
+import weakref
+
+from fileio import atomic_write
+
+BINARY_SUFFIXES = ('.kbb',)
+MAGIC = b'KBBOARD\0'
+VERSION = 1
+# magic, version, card count, then offset/length of each segment: bodies,
+# index (offset only; count * INDEX.size long), strings, meta.
+HEADER = struct.Struct('<8sIIQQQQQQQ')
+# column, tag, priority (indices into the meta tables), flags, then
+# offset/length of the id and title in strings and of the body in bodies,
+# then the checklist's done and total counts.
+INDEX = struct.Struct('<HHHHQIQIQIII')
+HAS_DESCRIPTION = 1
+ITEM_KEYS = ('id', 'title', 'description', 'tag', 'priority', 'checklist', '_body')
+
+_LOCK = threading.Lock()
+_files = weakref.WeakSet()
+
+
+def is_binary_path(filename):
+    return filename.lower().endswith(BINARY_SUFFIXES)
+
+
+def _map(filename):
+    with open(filename, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BodyFile:
+    """A board file's mapping, open while Bodies still point into it."""
+
+    __slots__ = ('path', 'data', 'bodies', '__weakref__')
+
+    def __init__(self, path, data):
+        self.path = os.path.abspath(path)
+        self.data = data
+        self.bodies = weakref.WeakSet()
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def reopen(self):
+        if self.data is None:
+            self.data = _map(self.path)
+
+
+class Body:
+    """A card's description and checklist, still in a board file's mapping."""
+
+    __slots__ = ('file', 'offset', 'length', 'done', 'total', 'has_description', '__weakref__')
+
+    def __init__(self, file, offset, length, done, total, has_description=True):
+        self.file = file
+        self.offset = offset
+        self.length = length
+        self.done = done
+        self.total = total
+        self.has_description = has_description
+        file.bodies.add(self)
+
+    def raw(self):
+        with _LOCK:
+            return self.file.data[self.offset:self.offset + self.length]
+
+    def read(self):
+        """(description, checklist as dicts)."""
+        description, checklist = json.loads(self.raw())
+        return description, [{'text': text, 'done': bool(done)} for text, done in checklist]
+
+    def counts(self):
+        return self.done, self.total
+
+
+def encode_body(description, checklist):
+    """The body blob for a card; empty for a card with neither."""
+    if not description and not checklist:
+        return b''
+    entries = [[entry.get('text', ''), int(bool(entry.get('done')))] if isinstance(entry, dict) else [str(entry), 0]
+               for entry in checklist]
+    return json.dumps([description, entries], separators=(',', ':')).encode('utf-8')
+
+
+def read_binary(filename):
+    """Load a .kbb board as dict-format data whose items carry their body as ``_body``."""
+    try:
+        data = _map(filename)
+    except ValueError:
+        raise ValueError(f"{filename} is empty") from None
+    try:
+        return _read(filename, data)
+    except BaseException:
+        data.close()
+        raise
+
+
+def _read(filename, data):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{filename} is not a binary board")
+    (magic, version, count, bodies_off, _, index_off,
+     strings_off, strings_len, meta_off, meta_len) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a binary board")
+    if version > VERSION:
+        raise ValueError(f"{filename} needs a newer version (format {version})")
+    meta = json.loads(data[meta_off:meta_off + meta_len])
+    strings = data[strings_off:strings_off + strings_len]
+    columns = [{'name': name, 'items': []} for _, name in meta['columns']]
+    tags, priorities, extras = meta['tags'], meta['priorities'], meta['extras']
+    items = [column['items'] for column in columns]
+    file = BodyFile(filename, data)
+    index = data[index_off:index_off + count * INDEX.size]
+    for (column, tag, priority, flags, id_off, id_len, title_off, title_len,
+         body_off, body_len, done, total) in INDEX.iter_unpack(index):
+        item = {
+            'id': strings[id_off:id_off + id_len].decode('utf-8'),
+            'title': strings[title_off:title_off + title_len].decode('utf-8'),
+            'tag': tags[tag],
+            'priority': priorities[priority],
+        }
+        if body_len:
+            item['_body'] = Body(file, bodies_off + body_off, body_len, done, total, bool(flags & HAS_DESCRIPTION))
+        else:
+            item['description'] = ''
+            item['checklist'] = []
+        if extras and item['id'] in extras:
+            item.update(extras[item['id']])
+        items[column].append(item)
+    with _LOCK:
+        _files.add(file)
+    board = meta['board']
+    board['columns'] = {key: column for (key, _), column in zip(meta['columns'], columns)}
+    return board
+
+
+def write_binary(filename, data):
+    """Write dict-format ``data`` (items may carry ``_body``) as a .kbb file, atomically.
+
+    The bodies copied from a mapping are moved over to the new file's.
+    """
+    copied = []
+    atomic_write(filename, lambda f: _write(f, data, copied), binary=True,
+                 replace=lambda tmp_path, target: _replace(tmp_path, target, copied))
+
+
+def _replace(tmp_path, filename, copied):
+    """os.replace for write_binary: rebind the ``copied`` (body, offset) pairs to the new file."""
+    path = os.path.abspath(filename)
+    bodies = {body for body, _ in copied}
+    with _LOCK:
+        # Every Body in the file being replaced was copied, or it has to stay.
+        closed = [file for file in list(_files)
+                  if file.path == path and file.data is not None and set(file.bodies) <= bodies]
+        for file in closed:
+            file.close()
+        try:
+            os.replace(tmp_path, filename)
+        except BaseException:
+            for file in closed:
+                file.reopen()
+            raise
+        if not copied:
+            return
+        new = BodyFile(filename, _map(filename))
+        _files.add(new)
+        old = set()
+        for body, offset in copied:
+            old.add(body.file)
+            body.file.bodies.discard(body)
+            body.file = new
+            body.offset = offset
+            new.bodies.add(body)
+        for file in old:
+            if not file.bodies:
+                file.close()
+
+
+def _write(f, data, copied):
+    f.write(bytes(HEADER.size))
+    records = []
+    strings = bytearray()
+    tags = {}
+    priorities = {}
+    extras = {}
+    position = 0
+    for column, col in enumerate(data['columns'].values()):
+        for item in col['items']:
+            body = item.get('_body')
+            description, checklist = item.get('description'), item.get('checklist')
+            if body is not None and description is None and checklist is None:
+                raw = body.raw()
+                copied.append((body, HEADER.size + position))
+                done, total = body.counts()
+                described = body.has_description
+            else:
+                if body is not None:
+                    stored, entries = body.read()
+                    description = stored if description is None else description
+                    checklist = entries if checklist is None else checklist
+                checklist = checklist or []
+                raw = encode_body(description or '', checklist)
+                done = sum(1 for entry in checklist if isinstance(entry, dict) and entry.get('done'))
+                total = len(checklist)
+                described = bool(description)
+            f.write(raw)
+            card_id = item['id'].encode('utf-8')
+            title = (item.get('title') or '').encode('utf-8')
+            records.append(INDEX.pack(
+                column, tags.setdefault(item.get('tag') or '', len(tags)),
+                priorities.setdefault(item.get('priority') or 'Low', len(priorities)),
+                HAS_DESCRIPTION if described else 0,
+                len(strings), len(card_id), len(strings) + len(card_id), len(title),
+                position, len(raw), done, total))
+            strings += card_id
+            strings += title
+            position += len(raw)
+            extra = {key: value for key, value in item.items() if key not in ITEM_KEYS}
+            if extra:
+                extras[item['id']] = extra
+    index_off = HEADER.size + position
+    f.write(b''.join(records))
+    strings_off = index_off + len(records) * INDEX.size
+    f.write(strings)
+    meta = json.dumps({
+        'columns': [[key, col.get('name', key)] for key, col in data['columns'].items()],
+        'tags': list(tags),
+        'priorities': list(priorities),
+        'extras': extras,
+        'board': {key: value for key, value in data.items() if key != 'columns'},
+    }, separators=(',', ':')).encode('utf-8')
+    meta_off = strings_off + len(strings)
+    f.write(meta)
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, len(records), HEADER.size, position, index_off,
+                        strings_off, len(strings), meta_off, len(meta)))
+
+
+def unpack_item(item):
+    """``item`` with its body read in, for code that wants plain dicts."""
+    body = item.get('_body')
+    if body is None:
+        return item
+    item = dict(item)
+    del item['_body']
+    description, checklist = body.read()
+    item.setdefault('description', description)
+    item.setdefault('checklist', checklist)
+    return item
@@ -1,142 +1,753 @@
-import json
-import copy
 import os
+import time
+from collections import Counter, defaultdict
 from PyQt6.QtWidgets import (
-    QWidget, QHBoxLayout, QVBoxLayout, QMenuBar, QFileDialog, QFrame
+    QWidget, QHBoxLayout, QVBoxLayout, QMenuBar, QFileDialog, QFrame, QLabel, QProgressBar, QLineEdit,
+    QScrollArea, QRubberBand, QInputDialog
 )
-from PyQt6.QtGui import QPalette, QColor
-from column import KanbanColumn
-
-# Default structure
-initial_data = {
-    'columns': {
-        'backlog': {'name': 'Backlog', 'items': []},
-        'todo': {'name': 'To Do', 'items': []},
-        'inprogress': {'name': 'In Progress', 'items': []},
-        'testing': {'name': 'Testing', 'items': []},
-        'done': {'name': 'Done', 'items': []}
-    }
-}
+from PyQt6.QtCore import Qt, QTimer, QRect, pyqtSignal
+from PyQt6.QtGui import QKeySequence, QShortcut
+from card import CardPool
+from column import KanbanColumn, VIRTUAL_THRESHOLD, COLUMN_WIDTH
+from model import BoardModel, empty_board
+from analytics import FlowPanel
+from autosave import AutoSaver
+from history import History
+from ids import migrate
+from journal import Journal, load_board
+from loader import BoardLoader, CardFiller, FIRST_SCREEN_CARDS, READ_ERRORS
+from sqlite_store import SqliteStore, is_sqlite_path
+from theme import apply_dark_palette, board_stylesheet, board_palette
+from watch import BoardWatcher
+from perf import PerfOverlay, profiler
+from search import SearchIndex
+from sync_client import SyncClient
+
+DEFAULT_FILENAME = "kanban_save.json"
+BOARD_FILTER = "Kanban Boards (*.json *.kbb *.db *.sqlite *.sqlite3)"
+# Card widgets of columns that have been off screen (or collapsed) this long
+# are released; the column keeps its header and card count.
+RELEASE_AFTER_S = 30
+
+def read_board_file(filename):
+    """Load a board from a JSON or binary (with journal) or SQLite file. Returns (data, clean)."""
+    if is_sqlite_path(filename):
+        with SqliteStore(filename) as store:
+            return store.load(), True
+    return load_board(filename)
+
 
 class KanbanBoard(QWidget):
-    def __init__(self):
+    filename_changed = pyqtSignal(object)
+
+    def __init__(self, data=None, lazy=False):
+        """With ``lazy`` the column widgets are only built when the board is first shown."""
         super().__init__()
         self.setWindowTitle("Kanban")
         self.resize(1600, 800)
         self.theme = 'dark'
-        self.data = copy.deepcopy(initial_data)
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
+        self.setStyleSheet(board_stylesheet(self.theme))
+        self.model = BoardModel(data if data is not None else empty_board())
+        # Subscribed first, so the index and the undo stack are current when
+        # on_model_change runs.
+        self.search = SearchIndex(self.model)
+        self.history = History(self.model)
+        self.search_text = ''
+        self.search_result = None
+        self.model.subscribe(self.on_model_change)
         self.columns = {}
+        # None until the board is opened from or saved to a file the user
+        # picked; an untitled board is never autosaved.
+        self.filename = None
+        self.journal = Journal()
+        self.autosaver = AutoSaver(self)
+        self.watcher = BoardWatcher(self, read_board_file)
+        self.autosaver.worker.saved.connect(self.on_board_saved)
+        self.loader = None
+        self.loaders = []
+        self.fill_limit = None
+        self.filler = CardFiller(self)
+        self.collapsed = set()
+        self.card_pool = CardPool(self)
+        # Ids of the selected cards, shared with the columns; only ever
+        # changed in place (see set_selection).
+        self.selection = set()
+        self.selection_anchor = None
+        self.rubber_band = QRubberBand(QRubberBand.Shape.Rectangle, self)
+        self.band_origin = None
+        self.band_base = set()
 
         self.layout = QHBoxLayout()
         self.layout.setContentsMargins(20, 20, 20, 20)
         self.layout.setSpacing(0)
+        self.board_scroll = QScrollArea(self)
+        self.board_scroll.setObjectName("boardScroll")
+        self.board_scroll.setWidgetResizable(True)
+        self.board_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.board_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        # Columns are created as children of columns_area: reparenting a
+        # column later would re-polish every card in it.
+        self.columns_area = QWidget()
+        self.columns_area.setObjectName("columnsArea")
+        self.columns_area.setLayout(self.layout)
+        self.board_scroll.setWidget(self.columns_area)
 
-        for idx, (key, col_data) in enumerate(self.data['columns'].items()):
-            col_widget = KanbanColumn(key, col_data['name'], col_data['items'], self)
-            col_widget.set_theme(self.theme)
-            self.columns[key] = col_widget
-            self.layout.addWidget(col_widget)
+        # Columns are materialized once the layout shows where they are.
+        self.visibility_timer = QTimer(self)
+        self.visibility_timer.setSingleShot(True)
+        self.visibility_timer.timeout.connect(self.update_column_visibility)
+        scroll_bar = self.board_scroll.horizontalScrollBar()
+        scroll_bar.valueChanged.connect(self.schedule_visibility)
+        scroll_bar.rangeChanged.connect(self.schedule_visibility)
+        self.release_timer = QTimer(self)
+        self.release_timer.setInterval(RELEASE_AFTER_S * 1000 // 4)
+        self.release_timer.timeout.connect(self.release_hidden_columns)
+        self.release_timer.start()
 
-            if idx < len(self.data['columns']) - 1:
-                separator = QFrame()
-                separator.setFrameShape(QFrame.Shape.VLine)
-                separator.setFrameShadow(QFrame.Shadow.Sunken)
-                separator.setLineWidth(2)
-                separator.setStyleSheet("color: #ffffff; background-color: #ffffff;")
-                self.layout.addWidget(separator)
+        self.separators = []
+        self.built = False
+        if not lazy:
+            self.refresh_board()
+            self.built = True
 
         self.menubar = QMenuBar(self)
         self.menu_layout = QVBoxLayout()
         self.menu_layout.setContentsMargins(0, 0, 0, 0)
         self.menu_layout.setSpacing(0)
         self.menu_layout.addWidget(self.menubar)
-        self.menu_layout.addLayout(self.layout)
+        self.search_bar = QLineEdit()
+        self.search_bar.setObjectName("searchBar")
+        self.search_bar.setPlaceholderText("Search cards (e.g. login tag:bug priority:high)")
+        self.search_bar.setClearButtonEnabled(True)
+        self.search_bar.textChanged.connect(self.set_search)
+        self.menu_layout.addWidget(self.search_bar)
+        self.menu_layout.addWidget(self.board_scroll)
+        QShortcut(QKeySequence.StandardKey.Find, self, self.search_bar.setFocus)
+        QShortcut(QKeySequence(Qt.Key.Key_Escape), self.search_bar, self.search_bar.clear,
+                  context=Qt.ShortcutContext.WidgetShortcut)
         self.setLayout(self.menu_layout)
 
-        file_menu = self.menubar.addMenu("File")
+        file_menu = self.file_menu = self.menubar.addMenu("File")
         file_menu.addAction("New", self.new_board)
         file_menu.addAction("Open...", self.open_board_dialog)
+        file_menu.addAction("Merge...", self.merge_board_dialog)
         file_menu.addAction("Save", self.save_board)
         file_menu.addAction("Save As...", self.save_as_board)
+        autosave_action = file_menu.addAction("Autosave")
+        autosave_action.setCheckable(True)
+        autosave_action.setChecked(self.autosaver.enabled)
+        autosave_action.toggled.connect(self.set_autosave)
+        file_menu.addSeparator()
+        file_menu.addAction("Connect to Sync Server...", self.connect_sync_dialog)
+        file_menu.addAction("Disconnect from Sync Server", self.disconnect_sync)
+        self.sync = None
+        # Set by the Workspace holding this board, to keep one file in one tab.
+        self.workspace = None
+
+        status = QWidget()
+        status_layout = QHBoxLayout(status)
+        status_layout.setContentsMargins(0, 0, 6, 0)
+        self.load_progress = QProgressBar()
+        self.load_progress.setFixedWidth(180)
+        self.load_progress.setFormat("Loading %v/%m cards")
+        self.load_progress.hide()
+        self.save_status = QLabel()
+        status_layout.addWidget(self.load_progress)
+        status_layout.addWidget(self.save_status)
+        self.menubar.setCornerWidget(status)
+        self.autosaver.status_changed.connect(self.save_status.setText)
+        self.watcher.status_changed.connect(self.save_status.setText)
+        self.filler.progress.connect(self.show_load_progress)
+        self.filler.finished.connect(self.load_progress.hide)
 
-        theme_menu = self.menubar.addMenu("Edit").addMenu("Theme")
+        edit_menu = self.menubar.addMenu("Edit")
+        self.undo_action = edit_menu.addAction("Undo", self.undo)
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        self.redo_action = edit_menu.addAction("Redo", self.redo)
+        self.redo_action.setShortcuts([QKeySequence.StandardKey.Redo, QKeySequence("Ctrl+Y")])
+        self.update_undo_actions()
+        edit_menu.addSeparator()
+        select_all_action = edit_menu.addAction("Select All", self.select_all)
+        select_all_action.setShortcut(QKeySequence.StandardKey.SelectAll)
+        edit_menu.addAction("Clear Selection", self.clear_selection)
+        delete_action = edit_menu.addAction("Delete Selected", self.delete_selected)
+        delete_action.setShortcut(QKeySequence.StandardKey.Delete)
+        edit_menu.addSeparator()
+        theme_menu = edit_menu.addMenu("Theme")
         theme_menu.addAction("Light", lambda: self.set_theme('light'))
         theme_menu.addAction("Dark", lambda: self.set_theme('dark'))
         theme_menu.addAction("MSU", lambda: self.set_theme('msu'))
 
+        self.perf_overlay = PerfOverlay(self)
+        view_menu = self.menubar.addMenu("View")
+        overlay_action = view_menu.addAction("Performance Overlay")
+        overlay_action.setCheckable(True)
+        overlay_action.toggled.connect(self.perf_overlay.set_active)
+        view_menu.addAction("Reset Performance Stats", profiler.reset)
+        view_menu.addAction("Export Trace...", self.export_trace)
+        view_menu.addSeparator()
+        view_menu.addAction("Flow Analytics...", self.show_flow_panel)
+        self.flow_panel = None
+
     def new_board(self):
-        self.data = copy.deepcopy(initial_data)
-        self.refresh_board()
+        self.cancel_loading()
+        self.autosaver.flush()
+        self.watcher.stop()
+        self.set_filename(None)
+        self.journal.invalidate()
+        self.model.load(empty_board())
+
+    def on_model_change(self, change):
+        """Journal a model change and show it in the affected columns."""
+        if change.op == 'reset':
+            self.filler.stop()
+            limit, self.fill_limit = self.fill_limit, None
+            self.selection.clear()
+            self.selection_anchor = None
+            if self.built:
+                self.refresh_board(limit)
+                self.set_search(self.search_text)
+                if limit is not None:
+                    self.filler.start(list(self.columns.values()))
+            self.update_undo_actions()
+            return
+        changes = change.changes if change.op == 'batch' else (change,)
+        for sub in changes:
+            self.journal.record(**sub.record())
+            if sub.op == 'delete':
+                self.selection.discard(sub.card.id)
+            elif self.search_result is not None and sub.op != 'move':
+                # Keep the active filter's result current for this one card.
+                self.search_result.update(sub.card, self.search.matches(sub.card, self.search_text))
+        if self.built:
+            if change.op == 'batch':
+                self.show_batch(changes)
+            else:
+                self.show_change(change)
+        self.update_undo_actions()
+        self.mark_dirty()
+
+    def show_change(self, change):
+        """Show a card change in the affected column widgets."""
+        if change.op == 'create':
+            self.columns[change.column].insert_card(change.index, change.card)
+        elif change.op == 'move':
+            widget = self.columns[change.source].take_card(change.source_index)
+            self.columns[change.column].insert_card(change.index, change.card, widget)
+        elif change.op == 'delete':
+            widget = self.columns[change.column].take_card(change.index)
+            if widget is not None:
+                self.card_pool.release(widget)
+        else:
+            self.columns[change.column].card_changed(self.model.index_of(change.card.id), change.card)
+
+    def show_batch(self, changes):
+        """Show a batch of changes with one reconcile, so one relayout, per affected column."""
+        grown = Counter()
+        edited = defaultdict(list)
+        for change in changes:
+            if change.op == 'create':
+                grown[change.column] += 1
+            elif change.op == 'move':
+                grown[change.column] += 1
+                grown[change.source] -= 1
+            elif change.op == 'delete':
+                grown[change.column] -= 1
+            else:
+                edited[change.column].append(change.card)
+        # Shrinking columns first, so the cards they give up are in the pool
+        # for the ones that grow.
+        keys = sorted(grown, key=lambda key: grown[key])
+        self.columns_area.setUpdatesEnabled(False)
+        try:
+            for key in keys:
+                col = self.columns[key]
+                # A column keeps at most as many card widgets as it had; the
+                # filler builds the rest of a column that grew a slice at a time.
+                complete = len(col.items) - grown[key] <= len(col.cards)
+                col.reconcile(None if complete and grown[key] <= 0 else len(col.cards), edited.get(key, ()))
+            for key, cards in edited.items():
+                if key in grown:
+                    continue
+                # Only edits: update those cards in place, nothing moves.
+                col = self.columns[key]
+                positions = {card.id: i for i, card in enumerate(col.items)}
+                for card in cards:
+                    if card.id in positions:
+                        col.card_changed(positions[card.id], card)
+        finally:
+            self.columns_area.setUpdatesEnabled(True)
+        self.filler.add([self.columns[key] for key in keys])
+
+    # Selection
+
+    def set_selection(self, card_ids):
+        card_ids = set(card_ids)
+        changed = self.selection ^ card_ids
+        if not changed:
+            return
+        self.selection.clear()
+        self.selection.update(card_ids)
+        if self.built:
+            for col in self.columns.values():
+                col.show_selection(changed)
+
+    def clear_selection(self):
+        self.set_selection(())
+
+    def select_all(self):
+        self.set_selection(card.id for card in self.model.cards()
+                           if self.search_result is None or card in self.search_result)
+
+    def selected_ids(self):
+        """The selected card ids in board order."""
+        if not self.selection:
+            return []
+        return [card.id for card in self.model.cards() if card.id in self.selection]
+
+    def card_ids_for(self, card_id):
+        """The cards an action on ``card_id`` applies to: the selection if it has the card, else the card."""
+        return self.selected_ids() if card_id in self.selection else [card_id]
+
+    def click_card(self, card_id, modifiers):
+        """Update the selection for a click on ``card_id``; returns whether it may start a drag.
+
+        Ctrl toggles the card, Shift selects the shown cards from the last
+        clicked card to this one in the same column, a plain click on an
+        unselected card selects just that card.
+        """
+        if modifiers & Qt.KeyboardModifier.ControlModifier:
+            self.set_selection(self.selection ^ {card_id})
+            self.selection_anchor = card_id
+            return False
+        if modifiers & Qt.KeyboardModifier.ShiftModifier:
+            anchor = self.selection_anchor
+            selection = set(self.selection)
+            if anchor in self.model and self.model.column_of(anchor) == self.model.column_of(card_id):
+                start, end = sorted((self.model.index_of(anchor), self.model.index_of(card_id)))
+                cards = self.model.columns[self.model.column_of(card_id)].cards[start:end + 1]
+                selection.update(card.id for card in cards
+                                 if self.search_result is None or card in self.search_result)
+            else:
+                selection.add(card_id)
+                self.selection_anchor = card_id
+            self.set_selection(selection)
+            return False
+        if card_id not in self.selection:
+            self.set_selection((card_id,))
+        self.selection_anchor = card_id
+        return True
+
+    def expand_card(self, card_id):
+        """Read in the description and checklist of a card from a binary board and show them."""
+        card = self.model.card(card_id)
+        if card is None or card.body_loaded:
+            return
+        card.load_body()
+        column = self.columns.get(self.model.column_of(card_id))
+        if column is not None:
+            column.card_changed(self.model.index_of(card_id), card)
+
+    def delete_selected(self):
+        self.model.delete_cards(self.selected_ids())
+
+    def update_selected(self, fields, op='edit'):
+        self.model.update_cards(self.selected_ids(), fields, op)
+
+    def move_selected(self, column_key, before=None):
+        self.model.move_cards(self.selected_ids(), column_key, before)
+
+    # Rubber-band selection, started by presses that no card or column took.
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.MouseButton.LeftButton or not self.built:
+            super().mousePressEvent(event)
+            return
+        self.band_origin = event.position().toPoint()
+        extend = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+        self.band_base = set(self.selection) if extend else set()
+        if not extend:
+            self.clear_selection()
+        self.rubber_band.setGeometry(QRect(self.band_origin, self.band_origin))
+        self.rubber_band.show()
+        self.grabMouse()
+
+    def mouseMoveEvent(self, event):
+        if self.band_origin is None:
+            super().mouseMoveEvent(event)
+            return
+        rect = QRect(self.band_origin, event.position().toPoint()).normalized()
+        self.rubber_band.setGeometry(rect)
+        band = QRect(self.mapToGlobal(rect.topLeft()), rect.size())
+        selection = set(self.band_base)
+        for col in self.columns.values():
+            selection.update(col.ids_in(band))
+        self.set_selection(selection)
+
+    def mouseReleaseEvent(self, event):
+        if self.band_origin is None:
+            super().mouseReleaseEvent(event)
+            return
+        self.band_origin = None
+        self.rubber_band.hide()
+        self.releaseMouse()
+
+    def showEvent(self, event):
+        if not self.built:
+            self.build_widgets()
+        super().showEvent(event)
+
+    def build_widgets(self):
+        """Build the column widgets: the first screenful now, the rest through the CardFiller."""
+        self.built = True
+        self.refresh_board(self.screen_cards())
+        self.set_search(self.search_text)
+        self.filler.start(list(self.columns.values()))
+
+    def screen_cards(self):
+        """About how many cards fit in a column on screen."""
+        return max(FIRST_SCREEN_CARDS, self.height() // 60)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_visibility()
+
+    def schedule_visibility(self):
+        self.visibility_timer.start(0)
+
+    def update_column_visibility(self):
+        """Materialize the columns in view; note when the others went out of view."""
+        if not self.built:
+            return
+        left = self.board_scroll.horizontalScrollBar().value()
+        right = left + self.board_scroll.viewport().width()
+        now = time.monotonic()
+        shown = []
+        for col in self.columns.values():
+            geometry = col.geometry()
+            if not col.collapsed and geometry.right() >= left and geometry.left() <= right:
+                col.hidden_since = None
+                if not col.materialized:
+                    col.materialize(self.screen_cards())
+                    shown.append(col)
+            elif col.hidden_since is None:
+                col.hidden_since = now
+        if shown:
+            self.filler.add(shown)
+
+    def release_hidden_columns(self):
+        now = time.monotonic()
+        for col in self.columns.values():
+            if col.hidden_since is not None and col.materialized and now - col.hidden_since >= RELEASE_AFTER_S:
+                col.release_cards()
+
+    def set_column_collapsed(self, key, collapsed):
+        if collapsed:
+            self.collapsed.add(key)
+        else:
+            self.collapsed.discard(key)
+        col = self.columns.get(key)
+        if col is not None:
+            col.set_collapsed(collapsed)
+            self.schedule_visibility()
+
+    def release_widgets(self):
+        """Drop the column and card widgets, keeping the model, history and journal.
 
-    def save_board(self, filename="kanban_save.json"):
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2)
+        They are rebuilt by build_widgets() the next time the board is shown.
+        """
+        if not self.built:
+            return
+        self.filler.stop()
+        self.load_progress.hide()
+        for key in list(self.columns):
+            self.remove_column_widget(key)
+        for separator in self.separators:
+            self.layout.removeWidget(separator)
+            separator.deleteLater()
+        self.separators = []
+        # Spare cards count against the workspace budget too.
+        self.card_pool.clear()
+        self.built = False
+
+    def set_filename(self, filename):
+        self.filename = filename
+        self.filename_changed.emit(filename)
+
+    def undo(self):
+        self.history.undo()
+        self.update_undo_actions()
+
+    def redo(self):
+        self.history.redo()
+        self.update_undo_actions()
+
+    def update_undo_actions(self):
+        label = self.history.undo_label()
+        self.undo_action.setEnabled(label is not None)
+        self.undo_action.setText(f"Undo {label}" if label else "Undo")
+        label = self.history.redo_label()
+        self.redo_action.setEnabled(label is not None)
+        self.redo_action.setText(f"Redo {label}" if label else "Redo")
+
+    def set_search(self, text):
+        """Filter every column down to the cards matching ``text`` (see search.py)."""
+        self.search_text = text
+        self.search_result = self.search.query(text, self.search_result)
+        for col in self.columns.values():
+            col.set_filter(self.search_result)
+        if self.search_result is not None and self.selection:
+            # Bulk actions only apply to cards you can see.
+            self.set_selection(card_id for card_id in self.selection if self.model.card(card_id) in self.search_result)
+
+    def mark_dirty(self):
+        if self.filename is None:
+            self.save_status.setText("Unsaved - use Save As to keep this board")
+            return
+        self.autosaver.schedule()
+
+    def on_board_saved(self, filename, latency_ms):
+        # The file now holds this board, so follow changes others make to it.
+        if filename == self.filename:
+            self.watcher.watch(filename)
+
+    def set_autosave(self, enabled):
+        self.autosaver.enabled = enabled
+        if not enabled:
+            self.autosaver.timer.stop()
+
+    def save_board(self, filename=None):
+        if filename is None and self.filename is None:
+            self.save_as_board()
+            return
+        self.autosaver.save_now(filename or self.filename)
 
     def save_as_board(self):
         file_dialog = QFileDialog(self)
         file_dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
-        file_dialog.setNameFilter("Kanban Boards (*.json)")
+        file_dialog.setNameFilter(BOARD_FILTER)
         file_dialog.setDefaultSuffix("json")
+        file_dialog.selectFile(self.filename or DEFAULT_FILENAME)
         if file_dialog.exec():
             filename = file_dialog.selectedFiles()[0]
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2)
+            if self.open_elsewhere(filename):
+                return
+            self.set_filename(filename)
+            self.autosaver.save_now(self.filename)
 
     def open_board_dialog(self):
         file_dialog = QFileDialog(self)
-        file_dialog.setNameFilter("Kanban Boards (*.json)")
+        file_dialog.setNameFilter(BOARD_FILTER)
         file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
         if file_dialog.exec():
             filename = file_dialog.selectedFiles()[0]
             if os.path.exists(filename):
-                with open(filename, "r", encoding="utf-8") as f:
-                    self.data = json.load(f)
-                self.refresh_board()
-
-    def refresh_board(self):
-        while self.layout.count():
-            item = self.layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
-
-        self.columns.clear()
-
-        for idx, (key, col_data) in enumerate(self.data['columns'].items()):
-            col_widget = KanbanColumn(key, col_data['name'], col_data['items'], self)
-            col_widget.set_theme(self.theme)
-            self.columns[key] = col_widget
-            self.layout.addWidget(col_widget)
-
-            if idx < len(self.data['columns']) - 1:
-                separator = QFrame()
-                separator.setFrameShape(QFrame.Shape.VLine)
-                separator.setFrameShadow(QFrame.Shadow.Sunken)
-                separator.setLineWidth(2)
-                separator.setStyleSheet("color: #ffffff; background-color: #ffffff;")
-                self.layout.addWidget(separator)
+                self.open_board(filename)
 
-    def set_theme(self, theme):
-        self.theme = theme
+    def open_board(self, filename):
+        """Load ``filename`` on a worker thread, then show it progressively.
+
+        Opening another board (or starting a new one) before this one is
+        shown cancels it.
+        """
+        if self.open_elsewhere(filename):
+            return
+        self.cancel_loading()
+        self.autosaver.flush()
+        loader = BoardLoader(filename, read_board_file, self)
+        loader.loaded.connect(self.on_board_loaded)
+        loader.indexed.connect(self.search.adopt)
+        loader.failed.connect(self.on_board_load_failed)
+        loader.finished.connect(self.on_loader_finished)
+        self.loader = loader
+        self.loaders.append(loader)
+        self.load_progress.setRange(0, 0)
+        self.load_progress.show()
+        self.save_status.setText(f"Opening {os.path.basename(filename)}")
+        loader.start()
+
+    def open_elsewhere(self, filename):
+        """Whether another tab has ``filename`` open; if so, switch to it."""
+        other = self.workspace.board_for(filename) if self.workspace is not None else None
+        if other is None or other is self:
+            return False
+        self.workspace.setCurrentWidget(other)
+        other.save_status.setText(f"{os.path.basename(filename)} is already open here")
+        return True
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+        self.filler.stop()
+        self.load_progress.hide()
 
-        bg_color = {
-            'light': '#f5f5f5',
-            'dark': '#121212',
-            'msu': '#18453B'
-        }.get(theme, '#121212')
+    def on_board_loaded(self, model, clean):
+        loader = self.sender()
+        if loader is not self.loader:
+            return
+        self.loader = None
+        self.autosaver.flush()
+        self.set_filename(loader.filename)
+        self.journal.reset(loader.filename, model.meta.get('journal_generation', 0), has_base=clean)
+        self.save_status.setText(f"Opened {os.path.basename(loader.filename)}")
+        self.fill_limit = self.screen_cards()
+        self.model.replace(model)
+        self.watcher.watch(loader.filename)
 
-        self.setStyleSheet(f"background-color: {bg_color};")
+    def on_board_load_failed(self, message):
+        if self.sender() is not self.loader:
+            return
+        self.loader = None
+        self.load_progress.hide()
+        self.save_status.setText(f"Open failed: {message}")
+
+    def on_loader_finished(self):
+        loader = self.sender()
+        if loader in self.loaders:
+            self.loaders.remove(loader)
+        loader.deleteLater()
+
+    def show_load_progress(self, shown, total):
+        self.load_progress.setRange(0, total)
+        self.load_progress.setValue(shown)
+        self.load_progress.show()
+
+    def merge_board_dialog(self):
+        file_dialog = QFileDialog(self)
+        file_dialog.setNameFilter(BOARD_FILTER)
+        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
+        if file_dialog.exec():
+            filename = file_dialog.selectedFiles()[0]
+            if os.path.exists(filename):
+                self.cancel_loading()
+                try:
+                    other = migrate(read_board_file(filename)[0], verify=True)
+                    # Checks every card before any of them is merged.
+                    BoardModel(other)
+                except READ_ERRORS as e:
+                    self.save_status.setText(f"Merge failed: {e}")
+                    return
+                self.journal.invalidate()
+                self.model.merge(other)
+                self.mark_dirty()
+
+    def refresh_board(self, limit=None):
+        """Reconcile the widget tree with the model.
+
+        Columns and cards are matched by key and id, so only what changed is
+        added, removed, reordered or restyled. With ``limit`` widget columns
+        only build their first ``limit`` cards (see CardFiller).
+        """
+        columns = self.model.columns
+        for key in list(self.columns):
+            if key not in columns:
+                self.remove_column_widget(key)
+
+        new_columns = {}
+        # Until the layout runs, guess which columns will be in view; the
+        # rest start dormant and update_column_visibility() sorts it out.
+        in_view = self.width() // COLUMN_WIDTH + 1
+        for idx, (key, col_data) in enumerate(columns.items()):
+            virtual = len(col_data.cards) >= VIRTUAL_THRESHOLD
+            col_widget = self.columns.get(key)
+            if col_widget is not None and col_widget.virtual != virtual:
+                self.remove_column_widget(key)
+                col_widget = None
+            if col_widget is None:
+                collapsed = key in self.collapsed
+                col_widget = KanbanColumn(key, col_data.name, col_data.cards, self.columns_area, virtual=virtual, limit=limit,
+                                          dormant=collapsed or idx >= in_view)
+                col_widget.set_collapsed(collapsed)
+                col_widget.set_theme(self.theme)
+            else:
+                col_widget.sync(col_data.name, col_data.cards, limit)
+            new_columns[key] = col_widget
+        self.columns = new_columns
+
+        while len(self.separators) < len(columns) - 1:
+            self.separators.append(self.create_separator())
+        while len(self.separators) > max(len(columns) - 1, 0):
+            separator = self.separators.pop()
+            self.layout.removeWidget(separator)
+            separator.deleteLater()
+
+        wanted = []
+        for idx, col_widget in enumerate(self.columns.values()):
+            wanted.append(col_widget)
+            if idx < len(self.separators):
+                wanted.append(self.separators[idx])
+        current = [self.layout.itemAt(i).widget() for i in range(self.layout.count())]
+        if current != wanted:
+            while self.layout.count():
+                self.layout.takeAt(0)
+            for widget in wanted:
+                self.layout.addWidget(widget)
+        self.schedule_visibility()
+
+    def remove_column_widget(self, key):
+        col_widget = self.columns.pop(key)
+        self.layout.removeWidget(col_widget)
+        # Its cards go back to the pool; the rest goes with the column.
+        col_widget.release_cards()
+        col_widget.hide()
+        col_widget.deleteLater()
+
+    def create_separator(self):
+        separator = QFrame()
+        separator.setFrameShape(QFrame.Shape.VLine)
+        separator.setFrameShadow(QFrame.Shadow.Sunken)
+        separator.setLineWidth(2)
+        separator.setObjectName("separator")
+        return separator
+
+    def set_theme(self, theme):
+        """Switch themes with one stylesheet and palette update at the board level."""
+        self.theme = theme
+        self.setStyleSheet(board_stylesheet(theme))
+        self.setPalette(board_palette(apply_dark_palette(), theme))
 
         for col in self.columns.values():
             col.set_theme(theme)
 
-        self.refresh_board()
+    def export_trace(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Trace", "kanban_trace.json", "Trace Files (*.json)")
+        if filename:
+            profiler.export_trace(filename)
+
+    def show_flow_panel(self):
+        if self.flow_panel is None:
+            self.flow_panel = FlowPanel(self)
+        self.flow_panel.show()
+        self.flow_panel.raise_()
+
+    def connect_sync_dialog(self):
+        address, ok = QInputDialog.getText(self, "Connect to Sync Server",
+                                           "Socket path or host:port (see sync_server.py):",
+                                           text=self.sync.address if self.sync and self.sync.address else "")
+        if ok and address.strip():
+            self.connect_sync(address.strip())
+
+    def connect_sync(self, address):
+        """Share this board with the other clients of the sync server at ``address``."""
+        if self.sync is None:
+            self.sync = SyncClient(self)
+            self.sync.status_changed.connect(self.save_status.setText)
+        self.sync.connect_to(address)
+
+    def disconnect_sync(self):
+        if self.sync is not None and self.sync.connected:
+            self.sync.shutdown()
+            self.save_status.setText("Disconnected from sync server")
 
-        palette = self.palette()
-        highlight = QColor("#00aaff") if theme != 'msu' else QColor("#18453B")
-        fg = QColor("#222222") if theme == 'light' else QColor("#ffffff")
-        palette.setColor(QPalette.ColorRole.WindowText, fg)
-        palette.setColor(QPalette.ColorRole.ButtonText, fg)
-        palette.setColor(QPalette.ColorRole.Highlight, highlight)
-        palette.setColor(QPalette.ColorRole.HighlightedText, QColor("#ffffff"))
-        self.setPalette(palette)
+    def closeEvent(self, event):
+        if self.sync is not None:
+            self.sync.shutdown()
+        self.cancel_loading()
+        for loader in self.loaders:
+            loader.cancel()
+            loader.wait()
+        self.watcher.shutdown()
+        self.autosaver.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,346 @@
+# bulk.py
+#
+# Headless bulk import/export between boards and CSV or JSON Lines files. It
+# never starts a QApplication (or imports PyQt), and records are streamed one
+# at a time, so memory does not grow with the size of the input:
+#
+#     python bulk.py import issues.csv kanban_save.json --column backlog
+#     python bulk.py export kanban_save.db cards.jsonl
+#
+# Imports into a JSON or binary board are written as 'create' records on its
+# journal (see journal.py); imports into a SQLite board are row inserts.
+# Cards always get fresh ids from the board's next_id; an ``id`` in the input
+# is kept as ``source_id``.
+#
+# Without --skip-invalid an import stops at the first invalid record, and the
+# records before it stay imported: check a file with --dry-run first when a
+# partial import is not wanted. A dry run never writes, or creates, the board.
+#
+# CSV columns are those of FIELDS. In CSV the checklist is one cell of
+# entries separated by "; ", each optionally prefixed with "[x] " (done) or
+# "[ ] ". In JSON Lines it is a list of strings or {"text", "done"} objects.
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from binary_store import is_binary_path, unpack_item
+from journal import append_records, load_board, write_snapshot
+from model import PRIORITIES, TAGS, empty_board
+from sqlite_store import SqliteStore, is_sqlite_path
+
+FIELDS = ['column', 'id', 'title', 'description', 'tag', 'priority', 'checklist']
+BATCH_SIZE = 1000
+CHECKLIST_SEPARATOR = "; "
+PRIORITY_ALIASES = {'medium': 'Med', 'normal': 'Med', 'critical': 'High'}
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+# Reading and writing records
+
+def read_records(f, fmt):
+    """Yield (line_number, record dict) from a CSV or JSON Lines stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, InvalidRecord(f"invalid JSON: {e.msg}")
+            continue
+        yield line_number, record
+
+
+def parse_checklist(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        entries = []
+        for part in value.split(CHECKLIST_SEPARATOR.strip()):
+            part = part.strip()
+            done = part.lower().startswith('[x]')
+            if part.startswith('[') and part[2:3] == ']':
+                part = part[3:].strip()
+            if part:
+                entries.append({'text': part, 'done': done})
+        return entries
+    if not isinstance(value, list):
+        raise InvalidRecord("checklist must be a list")
+    entries = []
+    for entry in value:
+        if isinstance(entry, str):
+            entries.append({'text': entry, 'done': False})
+        elif isinstance(entry, dict) and isinstance(entry.get('text'), str):
+            entries.append({'text': entry['text'], 'done': bool(entry.get('done', False))})
+        else:
+            raise InvalidRecord(f"bad checklist entry {entry!r}")
+    return entries
+
+
+def format_checklist(checklist):
+    return CHECKLIST_SEPARATOR.join(
+        f"[{'x' if entry.get('done') else ' '}] {entry.get('text', '')}" for entry in checklist)
+
+
+def _text(record, key):
+    value = record.get(key)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise InvalidRecord(f"{key} must be a string")
+    return value.strip()
+
+
+def validate(record, columns, default_column):
+    """Turn an input record into (column_key, item fields), or raise InvalidRecord."""
+    if not isinstance(record, dict):
+        raise InvalidRecord("record must be an object")
+    title = record.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise InvalidRecord("missing title")
+    description = record.get('description') or ''
+    if not isinstance(description, str):
+        raise InvalidRecord("description must be a string")
+
+    tag = _text(record, 'tag')
+    if tag:
+        matches = [known for known in TAGS if known.lower() == tag.lower()]
+        if not matches:
+            raise InvalidRecord(f"unknown tag {tag!r}")
+        tag = matches[0]
+
+    priority = _text(record, 'priority') or 'Low'
+    matches = [known for known in PRIORITIES if known.lower() == priority.lower()]
+    if matches:
+        priority = matches[0]
+    elif priority.lower() in PRIORITY_ALIASES:
+        priority = PRIORITY_ALIASES[priority.lower()]
+    else:
+        raise InvalidRecord(f"unknown priority {priority!r}")
+
+    column = _text(record, 'column') or default_column or ''
+    key = columns.get(column) or columns.get(column.lower())
+    if key is None:
+        raise InvalidRecord(f"unknown column {column!r}")
+
+    item = {
+        'title': title.strip(),
+        'description': description,
+        'tag': tag,
+        'priority': priority,
+        'checklist': parse_checklist(record.get('checklist')),
+    }
+    if record.get('id') not in (None, ''):
+        item['source_id'] = str(record['id'])
+    return key, item
+
+
+def column_lookup(pairs):
+    """Map column keys and lower-cased display names to keys."""
+    lookup = {}
+    for key, name in pairs:
+        lookup[key] = key
+        lookup.setdefault(name.lower(), key)
+    return lookup
+
+
+def write_records(f, fmt, cards):
+    """Write (column_key, item) pairs as CSV or JSON Lines; returns the count."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for key, item in cards:
+            row = dict(item, column=key, checklist=format_checklist(item.get('checklist') or []))
+            writer.writerow(row)
+            count += 1
+        return count
+    for key, item in cards:
+        record = {'column': key}
+        record.update(item)
+        f.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+# Board targets
+
+class JsonTarget:
+    """Appends 'create' records to a JSON board's journal."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        if os.path.exists(filename):
+            self.data, _ = load_board(filename)
+        else:
+            self.data = empty_board()
+        self.generation = self.data.get('journal_generation', 0) + 1
+        self.next_id = self.data['next_id']
+        self.columns = column_lookup((key, col['name']) for key, col in self.data['columns'].items())
+
+    def allocate_id(self):
+        card_id = self.next_id
+        self.next_id += 1
+        return str(card_id)
+
+    def write(self, records):
+        if self.data is not None:
+            # Start from a fresh snapshot so the new records can't land on a
+            # stale or half-written journal.
+            self.data['journal_generation'] = self.generation
+            write_snapshot(self.filename, self.data)
+            self.data = None
+        append_records(self.filename, self.generation, records)
+
+    def close(self):
+        pass
+
+
+class SqliteTarget:
+    """Inserts cards into a SQLite board; a missing board is created by the first write."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.store = SqliteStore(filename) if os.path.exists(filename) else None
+        self.new = self.store is None or not self.store.columns()
+        if self.new:
+            self.next_id = 1
+            self.columns = column_lookup((key, col['name']) for key, col in empty_board()['columns'].items())
+        else:
+            self.next_id = max(self.store.get_meta('next_id', 1), self.store.max_numeric_id() + 1)
+            self.columns = column_lookup(self.store.columns())
+
+    def allocate_id(self):
+        card_id = self.next_id
+        self.next_id += 1
+        return str(card_id)
+
+    def write(self, records):
+        if self.store is None:
+            self.store = SqliteStore(self.filename)
+        if self.new:
+            self.store.replace_board(empty_board())
+            self.new = False
+        self.store.apply_records(records)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def import_records(source, fmt, board_file, default_column=None, skip_invalid=False, dry_run=False, log=sys.stderr):
+    """Stream records from ``source`` into ``board_file``. Returns (imported, invalid).
+
+    Unless ``skip_invalid``, an invalid record ends the import after the
+    records before it are written.
+    """
+    target = SqliteTarget(board_file) if is_sqlite_path(board_file) else JsonTarget(board_file)
+    imported = invalid = 0
+    batch = []
+    try:
+        for line_number, record in read_records(source, fmt):
+            try:
+                if isinstance(record, InvalidRecord):
+                    raise record
+                key, item = validate(record, target.columns, default_column)
+            except InvalidRecord as e:
+                invalid += 1
+                print(f"line {line_number}: {e}", file=log)
+                if not skip_invalid:
+                    break
+                continue
+            if dry_run:
+                imported += 1
+                continue
+            item['id'] = target.allocate_id()
+            batch.append({'op': 'create', 'column': key, 'item': item})
+            if len(batch) >= BATCH_SIZE:
+                target.write(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            target.write(batch)
+            imported += len(batch)
+    finally:
+        target.close()
+    return imported, invalid
+
+
+def iter_board(board_file, column=None):
+    """Yield (column_key, item) for every card of a board file."""
+    if is_sqlite_path(board_file):
+        with SqliteStore(board_file) as store:
+            for key, item in store.iter_cards():
+                if column is None or key == column:
+                    yield key, item
+        return
+    # JSON boards are one document, so this one has to be read whole; binary
+    # boards read each card's body as it is yielded.
+    data, _ = load_board(board_file)
+    for key, col in data['columns'].items():
+        if column is None or key == column:
+            for item in col['items']:
+                yield key, unpack_item(item) if is_binary_path(board_file) else item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of Kanban cards")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="add cards from a CSV or JSON Lines file to a board")
+    importer.add_argument("input", help="CSV or JSON Lines file, or - for stdin")
+    importer.add_argument("board", help="board file (.json, .kbb for binary, or .db/.sqlite for SQLite); created if missing")
+    importer.add_argument("--format", choices=("csv", "jsonl"))
+    importer.add_argument("--column", default="backlog", help="column for records without one")
+    importer.add_argument("--skip-invalid", action="store_true", help="report bad records and keep going")
+    importer.add_argument("--dry-run", action="store_true", help="validate only, don't write the board")
+
+    exporter = commands.add_parser("export", help="write a board's cards to a CSV or JSON Lines file")
+    exporter.add_argument("board")
+    exporter.add_argument("output", help="CSV or JSON Lines file, or - for stdout")
+    exporter.add_argument("--format", choices=("csv", "jsonl"))
+    exporter.add_argument("--column", help="only export this column")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        fmt = detect_format(args.input, args.format)
+        if args.input == "-":
+            imported, invalid = import_records(sys.stdin, fmt, args.board, args.column, args.skip_invalid, args.dry_run)
+        else:
+            with open(args.input, "r", encoding="utf-8", newline="") as f:
+                imported, invalid = import_records(f, fmt, args.board, args.column, args.skip_invalid, args.dry_run)
+        verb = "validated" if args.dry_run else "imported"
+        print(f"{imported} cards {verb}, {invalid} invalid", file=sys.stderr)
+        if invalid and not args.skip_invalid and imported:
+            print(f"stopped at the first invalid record; the {imported} cards before it were {verb}", file=sys.stderr)
+        return 1 if invalid and not args.skip_invalid else 0
+
+    fmt = detect_format(args.output, args.format)
+    if args.output == "-":
+        count = write_records(sys.stdout, fmt, iter_board(args.board, args.column))
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            count = write_records(f, fmt, iter_board(args.board, args.column))
+    print(f"{count} cards exported", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
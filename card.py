@@ -1,23 +1,149 @@
-import json
-from PyQt6.QtWidgets import QLabel, QMenu, QDialog, QVBoxLayout, QDialogButtonBox
-from PyQt6.QtCore import Qt, QMimeData, QByteArray, QDataStream, QIODevice
-from PyQt6.QtGui import QDrag
+from PyQt6.QtWidgets import QWidget, QLabel, QMenu, QDialog, QVBoxLayout, QDialogButtonBox
+from PyQt6.QtCore import Qt, QEvent, QMimeData, QByteArray, QRectF
+from PyQt6.QtGui import QDrag, QPainter, QPen, QColor
 
+from checklist import ChecklistEditor
 from dialog import AddCardDialog
+from model import TAGS, PRIORITIES
+from theme import TAG_COLORS, theme_colors
 
 MIME_TYPE = 'application/x-kanbancarddata'
+# Spare card widgets a board keeps for reuse.
+CARD_POOL_LIMIT = 500
+
+
+def find_ancestor(widget, attr):
+    """Walk up the parent chain to the first widget that has ``attr``."""
+    while widget is not None and not hasattr(widget, attr):
+        widget = widget.parent()
+    return widget
+
+
+def exec_card_menu(parent, global_pos, count=1, expandable=False):
+    """Show the card context menu for ``count`` cards and return the chosen action text, or None.
+
+    ``expandable`` offers "Expand" for a card whose body is still on disk.
+    """
+    menu = QMenu(parent)
+    if count > 1:
+        menu.addAction(f"{count} cards selected").setEnabled(False)
+        menu.addSeparator()
+    elif expandable:
+        menu.addAction("Expand")
+    menu.addAction("Edit").setEnabled(count == 1)
+    menu.addAction("Delete")
+    tag_menu = menu.addMenu("Set Tag")
+    for tag in TAGS + ["None"]:
+        tag_menu.addAction(tag)
+    prio_menu = menu.addMenu("Set Priority")
+    for level in PRIORITIES:
+        prio_menu.addAction(level)
+    action = menu.exec(global_pos)
+    return action.text() if action else None
+
+
+def apply_card_action(model, card_ids, text):
+    """Apply a card menu choice other than Edit to all of ``card_ids`` as one batch."""
+    if text == "Delete":
+        model.delete_cards(card_ids)
+    elif text in TAGS + ["None"]:
+        model.update_cards(card_ids, {'tag': '' if text == "None" else text}, 'tag')
+    elif text in PRIORITIES:
+        model.update_cards(card_ids, {'priority': text}, 'priority')
+
+
+def show_subtasks_dialog(parent, checklist):
+    """Show and edit a card's subtasks; returns the new checklist, or None if nothing changed."""
+    dlg = QDialog(parent)
+    dlg.setWindowTitle("Subtasks")
+    layout = QVBoxLayout()
+    editor = ChecklistEditor(checklist)
+    layout.addWidget(editor)
+    buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+    buttons.accepted.connect(dlg.accept)
+    buttons.rejected.connect(dlg.reject)
+    layout.addWidget(buttons)
+    dlg.setLayout(layout)
+    if dlg.exec() and editor.model.changed:
+        return editor.model.checklist()
+    return None
+
+
+def encode_card_ids(card_ids):
+    """Drag payload: just the card ids, one per line; the board model knows the rest."""
+    return QByteArray("\n".join(card_ids).encode('utf-8'))
+
+
+def encode_card_id(card_id):
+    return encode_card_ids([card_id])
+
+
+def decode_card_ids(data):
+    return bytes(data).decode('utf-8').split("\n")
+
+
+class CardPool:
+    """Recycles KanbanCard widgets across refreshes, moves and deletes.
+
+    Released cards wait, hidden, under a holder widget, so Qt still owns
+    them and they go away with the board. Past ``limit`` spare cards they
+    are deleted with deleteLater() instead.
+    """
+
+    def __init__(self, parent=None, limit=CARD_POOL_LIMIT):
+        self.holder = QWidget(parent)
+        self.holder.hide()
+        self.limit = limit
+        self.free = []
+
+    def acquire(self, card, parent, theme):
+        if not self.free:
+            widget = KanbanCard(card, parent=parent)
+        else:
+            widget = self.free.pop()
+            widget.setParent(parent)
+            # Back to how a new child starts out: shown by the layout it joins.
+            widget.setAttribute(Qt.WidgetAttribute.WA_WState_ExplicitShowHide, False)
+            widget.reset(card)
+        widget.set_theme(theme)
+        return widget
+
+    def release(self, widget):
+        """Take back ``widget``, already removed from its layout."""
+        if len(self.free) >= self.limit:
+            widget.hide()
+            widget.deleteLater()
+            return
+        widget.setParent(self.holder)
+        self.free.append(widget)
+
+    def clear(self):
+        for widget in self.free:
+            widget.deleteLater()
+        self.free = []
+
+
+def dispose_card(widget, pool=None):
+    """Hand a card widget that left its layout back to ``pool``, or delete it."""
+    if pool is not None:
+        pool.release(widget)
+    else:
+        widget.hide()
+        widget.deleteLater()
+
 
 class KanbanCard(QLabel):
-    def __init__(self, card_id, title, description, parent=None, tag=None, priority=None, checklist=None):
+    """Widget for one model Card. It renders the card and forwards edits to the BoardModel."""
+
+    def __init__(self, card, parent=None):
         super().__init__(parent)
-        self.card_id = card_id
-        self.title = title
-        self.description = description
-        self.tag = tag or ''
-        self.priority = priority or 'Low'
-        self.checklist = checklist if checklist is not None else []
+        self.card_id = card.id
+        self.card = card
         self.theme = 'dark'
-        self.update_card_text()
+        self.rendered = None
+        self.heights = {}
+        self.selected = False
+        self.setProperty('priority', card.priority)
 
         self.setWordWrap(True)
         self.setMargin(10)
@@ -25,65 +151,96 @@ class KanbanCard(QLabel):
         self.setMaximumWidth(280)
         self.setCursor(Qt.CursorShape.OpenHandCursor)
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, False)
+        self.sync(card)
 
     def set_theme(self, theme):
         self.theme = theme
-        self.update_card_text()
+
+    def reset(self, card):
+        """Reuse this widget for ``card``; see CardPool."""
+        self.rendered = None
+        self.selected = False
+        self.setCursor(Qt.CursorShape.OpenHandCursor)
+        self.sync(card)
+
+    def set_selected(self, selected):
+        if selected != self.selected:
+            self.selected = selected
+            self.update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.selected:
+            painter = QPainter(self)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(QPen(QColor(theme_colors(self.theme)['highlight']), 2))
+            painter.drawRoundedRect(QRectF(self.rect()).adjusted(1, 1, -1, -1), 10, 10)
+
+    def sync(self, card):
+        """Show ``card``, re-rendering only if something visible changed."""
+        self.card = card
+        self.card_id = card.id
+        state = (card.title, card.shown_description(), card.tag, card.priority, card.checklist_counts())
+        if state != self.rendered:
+            self.rendered = state
+            self.update_card_text()
 
     def update_card_text(self):
+        card = self.card
         tag_html = ''
-        if self.tag:
-            color = {'Bug': '#e74c3c', 'Feature': '#2980b9', 'Urgent': '#f39c12'}.get(self.tag, '#888888')
-            tag_html = f'<span style="background:{color};color:white;padding:2px 8px;border-radius:8px;font-size:12px;margin-bottom:4px;">{self.tag}</span><br>'
+        if card.tag:
+            color = TAG_COLORS.get(card.tag, '#888888')
+            tag_html = f'<span style="background:{color};color:white;padding:2px 8px;border-radius:8px;font-size:12px;margin-bottom:4px;">{card.tag}</span><br>'
 
         checklist_html = self.checklist_summary()
 
-        self.setText(f"{tag_html}{checklist_html}<b>{self.title}</b><br><small>{self.description}</small>")
-
-        # Theme-based styles
-        bg, fg = (
-            ('#f5f5f5', '#222222') if self.theme == 'light' else
-            ('#ffffff', '#18453B') if self.theme == 'msu' else
-            ('#1e1e1e', '#d6d6d6')
-        )
-
-        self.setStyleSheet(f"""
-            QLabel {{
-                background-color: {bg};
-                color: {fg};
-                border-radius: 10px;
-                padding: 12px;
-                border-left: 10px solid {self.priority_color()};
-            }}
-            QLabel:hover {{
-                background-color: {'#eeeeee' if self.theme == 'msu' else '#333333'};
-            }}
-        """)
+        self.heights.clear()
+        self.setText(f"{tag_html}{checklist_html}<b>{card.title}</b><br><small>{card.shown_description()}</small>")
+
+        self.update_style()
+
+    def heightForWidth(self, width):
+        # Laying out the rich text is expensive and the column's scroll area
+        # asks for every card on each layout pass, so remember the answer.
+        height = self.heights.get(width)
+        if height is None:
+            if len(self.heights) > 4:
+                self.heights.clear()
+            height = self.heights[width] = super().heightForWidth(width)
+        return height
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.Type.FontChange, QEvent.Type.StyleChange):
+            self.heights.clear()
+        super().changeEvent(event)
+
+    def update_style(self):
+        """Re-polish the card if its priority changed; colors come from the board stylesheet."""
+        if self.property('priority') == self.card.priority:
+            return
+        self.setProperty('priority', self.card.priority)
+        style = self.style()
+        style.unpolish(self)
+        style.polish(self)
 
     def checklist_summary(self):
-        if not self.checklist:
+        done, total = self.card.checklist_counts()
+        if not total:
             return ''
-        done = sum(1 for item in self.checklist if item.get('done'))
-        total = len(self.checklist)
         return f'<span style="font-size:12px;color:#888;">{done}/{total} done</span><br>'
 
-    def priority_color(self):
-        return {'Low': '#27ae60', 'Med': '#f39c12', 'High': '#e74c3c'}.get(self.priority, '#888888')
-
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            board = find_ancestor(self, 'model')
+            card_ids = [self.card_id]
+            if board is not None:
+                if not board.click_card(self.card_id, event.modifiers()):
+                    return
+                card_ids = board.card_ids_for(self.card_id)
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
             drag = QDrag(self)
             mime_data = QMimeData()
-            data = QByteArray()
-            stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
-            stream.writeQString(self.card_id)
-            stream.writeQString(self.title)
-            stream.writeQString(self.description)
-            stream.writeQString(self.tag)
-            stream.writeQString(self.priority)
-            stream.writeQString(json.dumps(self.checklist))
-            mime_data.setData(MIME_TYPE, data)
+            mime_data.setData(MIME_TYPE, encode_card_ids(card_ids))
             drag.setMimeData(mime_data)
             drag.setPixmap(self.grab())
             drag.setHotSpot(event.pos())
@@ -93,98 +250,64 @@ class KanbanCard(QLabel):
             self.contextMenuEvent(event)
 
     def contextMenuEvent(self, event):
-        menu = QMenu(self)
-        edit_action = menu.addAction("Edit")
-        delete_action = menu.addAction("Delete")
-        tag_menu = menu.addMenu("Set Tag")
-        for tag in ["Bug", "Feature", "Urgent", "None"]:
-            tag_menu.addAction(tag)
-        prio_menu = menu.addMenu("Set Priority")
-        for level in ["Low", "Med", "High"]:
-            prio_menu.addAction(level)
-
-        action = menu.exec(event.globalPosition().toPoint())
-        if action:
-            text = action.text()
-            if text == "Edit":
-                self.edit_card()
-            elif text == "Delete":
-                self.remove_card()
-            elif text in ["Bug", "Feature", "Urgent", "None"]:
-                self.set_tag('' if text == "None" else text)
-            elif text in ["Low", "Med", "High"]:
-                self.set_priority(text)
+        board = find_ancestor(self, 'model')
+        if board is None:
+            return
+        board.click_card(self.card_id, Qt.KeyboardModifier.NoModifier)
+        card_ids = board.card_ids_for(self.card_id)
+        text = exec_card_menu(self, event.globalPosition().toPoint(), len(card_ids),
+                              expandable=not self.card.body_loaded)
+        if text == "Expand":
+            board.expand_card(self.card_id)
+        elif text == "Edit":
+            self.edit_card()
+        elif text:
+            apply_card_action(board.model, card_ids, text)
+
+    def board_model(self):
+        board = find_ancestor(self, 'model')
+        return board.model if board else None
 
     def set_tag(self, tag):
-        self.tag = tag
-        self.update_card_text()
         self.update_model("tag", tag)
 
     def set_priority(self, priority):
-        self.priority = priority
-        self.update_card_text()
         self.update_model("priority", priority)
 
     def update_model(self, key, value):
-        column = self.parent()
-        while column and not hasattr(column, 'key'):
-            column = column.parent()
-        board = column
-        while board and not hasattr(board, 'data'):
-            board = board.parent()
-        if board and column:
-            for item in board.data['columns'][column.key]['items']:
-                if item['id'] == self.card_id:
-                    item[key] = value
-                    break
+        self.update_fields({key: value}, op=key if key in ('tag', 'priority') else 'edit')
+
+    def update_fields(self, fields, op='edit', card_id=None):
+        # The model notifies the board, which calls sync() on this widget.
+        # Pass ``card_id`` when it was read before a modal dialog: the pool
+        # can rebind this widget to another card while the dialog is open.
+        model = self.board_model()
+        if model:
+            model.update_card(self.card_id if card_id is None else card_id, fields, op)
 
     def edit_card(self):
-        dialog = AddCardDialog(self, priority=self.priority, checklist=self.checklist)
-        dialog.title_input.setText(self.title)
-        dialog.desc_input.setText(self.description)
-        dialog.priority_select.setCurrentText(self.priority)
+        card = self.card
+        card_id = card.id
+        dialog = AddCardDialog(self, priority=card.priority, checklist=card.checklist)
+        dialog.title_input.setText(card.title)
+        dialog.desc_input.setText(card.description)
+        dialog.priority_select.setCurrentText(card.priority)
         if dialog.exec():
             new_title, new_desc, new_priority, new_checklist = dialog.get_data()
-            self.title = new_title
-            self.description = new_desc
-            self.priority = new_priority
-            self.checklist = new_checklist
-            self.update_card_text()
-            self.update_model('title', new_title)
-            self.update_model('description', new_desc)
-            self.update_model('priority', new_priority)
-            self.update_model('checklist', new_checklist)
+            self.update_fields({
+                'title': new_title,
+                'description': new_desc,
+                'priority': new_priority,
+                'checklist': new_checklist,
+            }, card_id=card_id)
 
     def remove_card(self):
-        column = self.parent()
-        while column and not hasattr(column, 'key'):
-            column = column.parent()
-        board = column
-        while board and not hasattr(board, 'data'):
-            board = board.parent()
-        if column and hasattr(column, 'cards') and self in column.cards:
-            column.cards.remove(self)
-        if column and hasattr(column, 'scroll_layout'):
-            column.scroll_layout.removeWidget(self)
-        self.setParent(None)
-        if board and column:
-            items = board.data['columns'][column.key]['items']
-            board.data['columns'][column.key]['items'] = [item for item in items if item['id'] != self.card_id]
+        model = self.board_model()
+        if model:
+            model.delete_card(self.card_id)
 
     def mouseDoubleClickEvent(self, event):
-        dlg = QDialog(self)
-        dlg.setWindowTitle("Subtasks")
-        layout = QVBoxLayout()
-        if self.checklist:
-            for item in self.checklist:
-                text = item.get('text', str(item))
-                done = item.get('done', False)
-                label = QLabel(f"{'✅' if done else '⬜'} {text}")
-                layout.addWidget(label)
-        else:
-            layout.addWidget(QLabel("No subtasks"))
-        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok)
-        buttons.accepted.connect(dlg.accept)
-        layout.addWidget(buttons)
-        dlg.setLayout(layout)
-        dlg.exec()
+        card_id = self.card_id
+        checklist = show_subtasks_dialog(self, self.card.checklist)
+        if checklist is not None:
+            self.update_fields({'checklist': checklist}, card_id=card_id)
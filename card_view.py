@@ -0,0 +1,371 @@
+# card_view.py
+#
+# Virtualized card list used by columns that hold a lot of cards. Instead of
+# one KanbanCard widget per item, the column's items are exposed through a
+# list model and painted by a delegate, so only the visible rows cost anything.
+
+from bisect import bisect_left
+
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QMimeData, QRect, QRectF, QSize, QPoint
+)
+from PyQt6.QtGui import QDrag, QPainter, QPainterPath, QColor, QFont, QFontMetrics, QPixmap
+
+from card import (
+    MIME_TYPE, exec_card_menu, apply_card_action, show_subtasks_dialog, encode_card_ids
+)
+from dialog import AddCardDialog
+from theme import TAG_COLORS, PRIORITY_COLORS, theme_colors
+
+ITEM_ROLE = Qt.ItemDataRole.UserRole
+
+CARD_WIDTH = 280
+CARD_MARGIN = 6
+CARD_PADDING = 12
+PRIORITY_BAR = 10
+
+
+class CardListModel(QAbstractListModel):
+    """List model over a column's Card list, shared with the BoardModel.
+
+    The BoardModel changes the list itself; the column then reports the change
+    through rows_inserted/rows_removed/item_changed, which take item indices.
+
+    With a filter (a search.SearchResult) only matching items are rows;
+    ``rows`` then maps each row to its item index, kept sorted.
+    """
+
+    def __init__(self, items, parent=None):
+        super().__init__(parent)
+        self.items = items
+        self.filter = None
+        self.rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.items) if self.rows is None else len(self.rows)
+
+    def item_index(self, row):
+        """Item index shown at ``row``; ``row`` may be rowCount() (the end)."""
+        if self.rows is None:
+            return row
+        if row < len(self.rows):
+            return self.rows[row]
+        return self.rows[-1] + 1 if self.rows else len(self.items)
+
+    def item(self, row):
+        return self.items[self.item_index(row)]
+
+    def _filter_rows(self):
+        if self.filter is None:
+            return None
+        return self.filter.positions(self.items)
+
+    def set_filter(self, result):
+        self.beginResetModel()
+        if result is not None and result.narrows is self.filter and self.rows is not None:
+            rows = result.positions(self.items, self.rows)
+        else:
+            rows = None
+        self.filter = result
+        self.rows = rows if rows is not None else self._filter_rows()
+        self.endResetModel()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item(index.row())
+        if role == ITEM_ROLE:
+            return item
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.title
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            flags |= Qt.ItemFlag.ItemIsDragEnabled
+        return flags
+
+    def set_items(self, items):
+        self.beginResetModel()
+        self.items = items
+        self.rows = self._filter_rows()
+        self.endResetModel()
+
+    def _insert_row(self, row, index):
+        self.beginInsertRows(QModelIndex(), row, row)
+        if self.rows is not None:
+            self.rows.insert(row, index)
+        self.endInsertRows()
+
+    def _remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        if self.rows is not None:
+            del self.rows[row]
+        self.endRemoveRows()
+
+    def rows_inserted(self, index):
+        rows = self.rows
+        if rows is None:
+            self._insert_row(index, index)
+            return
+        row = bisect_left(rows, index)
+        for i in range(row, len(rows)):
+            rows[i] += 1
+        if self.items[index] in self.filter:
+            self._insert_row(row, index)
+
+    def rows_removed(self, index):
+        rows = self.rows
+        if rows is None:
+            self._remove_row(index)
+            return
+        row = bisect_left(rows, index)
+        if row < len(rows) and rows[row] == index:
+            self._remove_row(row)
+        for i in range(row, len(rows)):
+            rows[i] -= 1
+
+    def item_changed(self, index):
+        rows = self.rows
+        row = index if rows is None else bisect_left(rows, index)
+        if rows is not None:
+            shown = row < len(rows) and rows[row] == index
+            wanted = self.items[index] in self.filter
+            if shown != wanted:
+                if wanted:
+                    self._insert_row(row, index)
+                else:
+                    self._remove_row(row)
+                return
+            if not shown:
+                return
+        model_index = self.index(row)
+        self.dataChanged.emit(model_index, model_index)
+
+
+class CardDelegate(QStyledItemDelegate):
+    """Paints a card the way KanbanCard renders itself, without a widget."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.theme = 'dark'
+        self.title_font = QFont()
+        self.title_font.setBold(True)
+        self.small_font = QFont()
+        self.small_font.setPointSizeF(max(self.small_font.pointSizeF() * 0.85, 7))
+        self._heights = {}
+        self._width = CARD_WIDTH
+
+    def set_theme(self, theme):
+        self.theme = theme
+
+    def invalidate(self, card_id=None):
+        if card_id is None:
+            self._heights.clear()
+        else:
+            self._heights.pop(card_id, None)
+
+    def _text_width(self, width):
+        return width - 2 * CARD_MARGIN - 2 * CARD_PADDING - PRIORITY_BAR
+
+    def _blocks(self, item):
+        """Yield (font, text, color) for each text block of the card, top to bottom."""
+        blocks = []
+        done, total = item.checklist_counts()
+        if total:
+            blocks.append((self.small_font, f"{done}/{total} done", '#888888'))
+        blocks.append((self.title_font, item.title, None))
+        description = item.shown_description()
+        if description:
+            blocks.append((self.small_font, description, None))
+        return blocks
+
+    def sizeHint(self, option, index):
+        item = index.data(ITEM_ROLE)
+        view = self.parent()
+        width = view.viewport().width() if view is not None else CARD_WIDTH
+        if width != self._width:
+            self._width = width
+            self._heights.clear()
+        height = self._heights.get(item.id)
+        if height is None:
+            width = self._text_width(self._width)
+            height = 2 * CARD_MARGIN + 2 * CARD_PADDING
+            if item.tag:
+                height += QFontMetrics(self.small_font).height() + 8
+            for font, text, _ in self._blocks(item):
+                rect = QFontMetrics(font).boundingRect(
+                    QRect(0, 0, width, 100000), Qt.TextFlag.TextWordWrap, text)
+                height += rect.height()
+            self._heights[item.id] = height
+        return QSize(self._width, height)
+
+    def paint(self, painter, option, index):
+        item = index.data(ITEM_ROLE)
+        colors = theme_colors(self.theme)
+        bg, fg, hover = colors['card_bg'], colors['card_fg'], colors['card_hover']
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        # Selection belongs to the board (it spans columns), not to the view.
+        selected = item.id in self.parent().column.selection
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = option.rect.adjusted(CARD_MARGIN, CARD_MARGIN, -CARD_MARGIN, -CARD_MARGIN)
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(rect), 10, 10)
+        painter.setClipPath(path)
+        painter.fillRect(rect, QColor(hover if hovered else bg))
+        priority_color = PRIORITY_COLORS.get(item.priority, '#888888')
+        painter.fillRect(QRect(rect.left(), rect.top(), PRIORITY_BAR, rect.height()), QColor(priority_color))
+        if selected:
+            painter.setPen(QColor(colors['highlight']))
+            painter.drawRoundedRect(QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5), 10, 10)
+
+        x = rect.left() + PRIORITY_BAR + CARD_PADDING
+        y = rect.top() + CARD_PADDING
+        width = self._text_width(option.rect.width())
+
+        tag = item.tag
+        if tag:
+            fm = QFontMetrics(self.small_font)
+            pill = QRect(x, y, fm.horizontalAdvance(tag) + 16, fm.height() + 4)
+            pill_path = QPainterPath()
+            pill_path.addRoundedRect(QRectF(pill), 8, 8)
+            painter.fillPath(pill_path, QColor(TAG_COLORS.get(tag, '#888888')))
+            painter.setFont(self.small_font)
+            painter.setPen(QColor('white'))
+            painter.drawText(pill, Qt.AlignmentFlag.AlignCenter, tag)
+            y += fm.height() + 8
+
+        for font, text, color in self._blocks(item):
+            painter.setFont(font)
+            painter.setPen(QColor(color or fg))
+            bounds = QFontMetrics(font).boundingRect(
+                QRect(0, 0, width, 100000), Qt.TextFlag.TextWordWrap, text)
+            painter.drawText(QRect(x, y, width, bounds.height()), Qt.TextFlag.TextWordWrap, text)
+            y += bounds.height()
+        painter.restore()
+
+
+class CardListView(QListView):
+    """List view that behaves like a column of KanbanCard widgets."""
+
+    def __init__(self, column):
+        super().__init__(column)
+        self.column = column
+        self.setItemDelegate(CardDelegate(self))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setMouseTracking(True)
+        self.setDragEnabled(True)
+        # Drops are handled by the owning KanbanColumn, like for widget cards.
+        self.setAcceptDrops(False)
+        self.viewport().setAcceptDrops(False)
+        self.setMinimumWidth(CARD_WIDTH)
+        self.setCursor(Qt.CursorShape.OpenHandCursor)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.DefaultContextMenu)
+
+    def set_theme(self, theme):
+        self.itemDelegate().set_theme(theme)
+        self.viewport().update()
+
+    def drop_row(self, pos: QPoint) -> int:
+        """Row a card dropped at ``pos`` (viewport coordinates) should be inserted at."""
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return self.model().rowCount()
+        rect = self.visualRect(index)
+        if pos.y() < rect.center().y():
+            return index.row()
+        return index.row() + 1
+
+    def mousePressEvent(self, event):
+        index = self.indexAt(event.position().toPoint())
+        if not index.isValid():
+            # Empty space: let the board start a rubber band.
+            event.ignore()
+            return
+        board = self.column.board()
+        if (event.button() == Qt.MouseButton.LeftButton and board is not None
+                and not board.click_card(index.data(ITEM_ROLE).id, event.modifiers())):
+            return
+        super().mousePressEvent(event)
+
+    def startDrag(self, supported_actions):
+        index = self.currentIndex()
+        if not index.isValid():
+            return
+        item = index.data(ITEM_ROLE)
+        board = self.column.board()
+        card_ids = board.card_ids_for(item.id) if board is not None else [item.id]
+        drag = QDrag(self)
+        mime_data = QMimeData()
+        mime_data.setData(MIME_TYPE, encode_card_ids(card_ids))
+        drag.setMimeData(mime_data)
+        rect = self.visualRect(index)
+        pixmap = QPixmap(rect.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        self.viewport().render(pixmap, QPoint(), rect)
+        drag.setPixmap(pixmap)
+        drag.setHotSpot(self.viewport().mapFromGlobal(self.cursor().pos()) - rect.topLeft())
+        self.setCursor(Qt.CursorShape.ClosedHandCursor)
+        drag.exec(Qt.DropAction.MoveAction)
+        self.setCursor(Qt.CursorShape.OpenHandCursor)
+
+    def contextMenuEvent(self, event):
+        index = self.indexAt(event.pos())
+        if not index.isValid():
+            self.column.show_column_context_menu(self.column.mapFromGlobal(event.globalPos()))
+            return
+        board = self.column.board()
+        if board is None:
+            return
+        item = index.data(ITEM_ROLE)
+        card_id = item.id
+        board.click_card(card_id, Qt.KeyboardModifier.NoModifier)
+        card_ids = board.card_ids_for(card_id)
+        text = exec_card_menu(self, event.globalPos(), len(card_ids), expandable=not item.body_loaded)
+        if text == "Expand":
+            board.expand_card(card_id)
+        elif text == "Edit":
+            self.edit_card(card_id)
+        elif text:
+            apply_card_action(board.model, card_ids, text)
+
+    # The dialogs are modal but the board isn't frozen while they are open: a
+    # reload, a sync op or a filter change can move the card to another row,
+    # so results are applied by card id, and dropped if the card is gone.
+
+    def edit_card(self, card_id):
+        board = self.column.board()
+        item = board.model.card(card_id) if board is not None else None
+        if item is None:
+            return
+        dialog = AddCardDialog(self, priority=item.priority, checklist=item.checklist)
+        dialog.title_input.setText(item.title)
+        dialog.desc_input.setText(item.description)
+        if dialog.exec():
+            new_title, new_desc, new_priority, new_checklist = dialog.get_data()
+            board.model.update_card(card_id, {
+                'title': new_title,
+                'description': new_desc,
+                'priority': new_priority,
+                'checklist': new_checklist,
+            })
+
+    def mouseDoubleClickEvent(self, event):
+        index = self.indexAt(event.pos())
+        board = self.column.board()
+        if index.isValid() and board is not None:
+            card_id = index.data(ITEM_ROLE).id
+            checklist = show_subtasks_dialog(self, index.data(ITEM_ROLE).checklist)
+            if checklist is not None:
+                board.model.update_card(card_id, {'checklist': checklist})
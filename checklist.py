@@ -0,0 +1,209 @@
+# checklist.py
+#
+# Checklist editing for the card dialogs. The entries live in a list model
+# shown by one QListView with uniform row heights, so a checklist of any
+# length opens with the same handful of widgets and only the visible rows are
+# ever painted; the line edit for a row exists only while it is edited.
+#
+# Entries are ChecklistItem records shared with the card they came from
+# (history.py keeps old checklists by reference), so an edit replaces an
+# entry instead of changing it.
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QListView, QPushButton, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QItemSelectionModel
+
+from model import ChecklistItem
+
+
+def contiguous_ranges(rows):
+    """(first, last) row ranges covering ``rows``, first range first."""
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in ranges]
+
+
+class ChecklistModel(QAbstractListModel):
+    def __init__(self, checklist=(), parent=None):
+        super().__init__(parent)
+        self.entries = [entry if isinstance(entry, ChecklistItem) else ChecklistItem.from_dict(entry)
+                        for entry in checklist]
+        self.changed = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return entry.text
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if entry.done else Qt.CheckState.Unchecked
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            flags |= Qt.ItemFlag.ItemIsEditable | Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid():
+            return False
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.EditRole:
+            replacement = ChecklistItem(str(value), entry.done)
+        elif role == Qt.ItemDataRole.CheckStateRole:
+            replacement = ChecklistItem(entry.text, Qt.CheckState(value) == Qt.CheckState.Checked)
+        else:
+            return False
+        self.entries[index.row()] = replacement
+        self.changed = True
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def append(self, text='', done=False):
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(ChecklistItem(text, done))
+        self.endInsertRows()
+        self.changed = True
+        return self.index(row)
+
+    def remove_rows(self, rows):
+        for first, last in reversed(contiguous_ranges(rows)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.entries[first:last + 1]
+            self.endRemoveRows()
+            self.changed = True
+
+    def set_done(self, rows, done):
+        """Check or uncheck ``rows`` with one dataChanged per contiguous range."""
+        entries = self.entries
+        for first, last in contiguous_ranges(rows):
+            for row in range(first, last + 1):
+                if entries[row].done != done:
+                    entries[row] = ChecklistItem(entries[row].text, done)
+                    self.changed = True
+            self.dataChanged.emit(self.index(first), self.index(last), [Qt.ItemDataRole.CheckStateRole])
+
+    def moveRows(self, source_parent, source, count, destination_parent, destination):
+        """Move ``count`` rows from ``source`` to before row ``destination`` (the Qt convention)."""
+        if count <= 0 or source < 0 or source + count > len(self.entries) or source <= destination <= source + count:
+            return False
+        self.beginMoveRows(QModelIndex(), source, source + count - 1, QModelIndex(), destination)
+        moved = self.entries[source:source + count]
+        del self.entries[source:source + count]
+        at = destination if destination < source else destination - count
+        self.entries[at:at] = moved
+        self.endMoveRows()
+        self.changed = True
+        return True
+
+    def checklist(self):
+        """The entries with text, as dicts for BoardModel.update_card."""
+        return [{'text': entry.text.strip(), 'done': entry.done} for entry in self.entries if entry.text.strip()]
+
+
+class ChecklistView(QListView):
+    """Checklist rows: Space checks or unchecks the selection, Ctrl+Up/Down move it, Delete removes it."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        # Qt still visits every row to place it; do that a batch per event
+        # loop pass so a long checklist shows its first rows right away.
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked
+                             | QAbstractItemView.EditTrigger.EditKeyPressed
+                             | QAbstractItemView.EditTrigger.SelectedClicked)
+
+    def selected_rows(self):
+        return sorted(index.row() for index in self.selectionModel().selectedIndexes())
+
+    def toggle_selected(self):
+        rows = self.selected_rows()
+        if rows:
+            entries = self.model().entries
+            self.model().set_done(rows, not all(entries[row].done for row in rows))
+
+    def set_selected_done(self, done):
+        """Check or uncheck the selected rows, or every row if none is selected."""
+        rows = self.selected_rows() or range(self.model().rowCount())
+        self.model().set_done(rows, done)
+
+    def remove_selected(self):
+        rows = self.selected_rows()
+        self.model().remove_rows(rows)
+        if rows:
+            row = min(rows[0], self.model().rowCount() - 1)
+            if row >= 0:
+                self.setCurrentIndex(self.model().index(row))
+
+    def move_selected(self, delta):
+        """Move the selected rows up (-1) or down (+1) one place, keeping them selected."""
+        model = self.model()
+        rows = self.selected_rows()
+        if not rows or rows[0] + delta < 0 or rows[-1] + delta >= model.rowCount():
+            return
+        ranges = contiguous_ranges(rows)
+        for first, last in (ranges if delta < 0 else reversed(ranges)):
+            if delta < 0:
+                model.moveRows(QModelIndex(), first, last - first + 1, QModelIndex(), first - 1)
+            else:
+                model.moveRows(QModelIndex(), first, last - first + 1, QModelIndex(), last + 2)
+        selection = self.selectionModel()
+        selection.clearSelection()
+        for row in rows:
+            selection.select(model.index(row + delta), QItemSelectionModel.SelectionFlag.Select)
+        selection.setCurrentIndex(model.index(rows[0] + delta), QItemSelectionModel.SelectionFlag.NoUpdate)
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        ctrl = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+        if key == Qt.Key.Key_Space and self.state() != QAbstractItemView.State.EditingState:
+            self.toggle_selected()
+        elif ctrl and key in (Qt.Key.Key_Up, Qt.Key.Key_Down):
+            self.move_selected(-1 if key == Qt.Key.Key_Up else 1)
+        elif key == Qt.Key.Key_Delete:
+            self.remove_selected()
+        else:
+            super().keyPressEvent(event)
+
+
+class ChecklistEditor(QWidget):
+    """A ChecklistView with buttons for adding, removing, reordering and bulk checking."""
+
+    def __init__(self, checklist=(), parent=None):
+        super().__init__(parent)
+        self.model = ChecklistModel(checklist, self)
+        self.view = ChecklistView()
+        self.view.setModel(self.model)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.view)
+        buttons = QHBoxLayout()
+        for text, slot in (("+ Add Subtask", lambda: self.add_item()),
+                           ("Remove", lambda: self.view.remove_selected()),
+                           ("Up", lambda: self.view.move_selected(-1)),
+                           ("Down", lambda: self.view.move_selected(1)),
+                           ("Check", lambda: self.view.set_selected_done(True)),
+                           ("Uncheck", lambda: self.view.set_selected_done(False))):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+    def add_item(self, text='', done=False):
+        index = self.model.append(text, done)
+        self.view.setCurrentIndex(index)
+        if not text:
+            self.view.edit(index)
@@ -1,22 +1,47 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QScrollArea, QMenu
+    QWidget, QVBoxLayout, QLabel, QScrollArea, QMenu, QWIDGETSIZE_MAX
 )
-from PyQt6.QtCore import Qt, QMimeData, QByteArray, QDataStream, QIODevice, QPoint
+from PyQt6.QtCore import Qt, QPoint, QRect
 from PyQt6.QtGui import QFont
-from card import KanbanCard, MIME_TYPE
+from card import KanbanCard, MIME_TYPE, find_ancestor, decode_card_ids, dispose_card
+from card_view import CardListModel, CardListView, ITEM_ROLE
 from dialog import AddCardDialog
-import json
+
+# Columns with at least this many cards are shown through a virtualized
+# list view instead of one KanbanCard widget per item.
+VIRTUAL_THRESHOLD = 200
+COLUMN_WIDTH = 300
+COLLAPSED_WIDTH = 120
 
 class KanbanColumn(QWidget):
-    def __init__(self, key, name, items, parent=None):
+    """One board column.
+
+    A widget column can be dormant: it has no card widgets and shows only
+    its header and card count until materialize() is called (the board does
+    that when it scrolls into view). Collapsed columns show the same, narrowed.
+    """
+
+    def __init__(self, key, name, items, parent=None, virtual=False, limit=None, dormant=False):
         super().__init__(parent)
         self.key = key
         self.name = name
         self.items = items
         self.cards = []
         self.theme = 'dark'
+        self.virtual = virtual
+        self.filter = None
+        self.materialized = virtual or not dormant
+        self.collapsed = False
+        # When the column last went off screen (time.monotonic()), or None.
+        self.hidden_since = None
+        # The board's CardPool and selected card ids, if the column is on a board.
+        board = find_ancestor(parent, 'card_pool')
+        self.pool = board.card_pool if board else None
+        self.selection = board.selection if board else set()
+        self.setMinimumWidth(COLUMN_WIDTH)
 
         self.setAcceptDrops(True)
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_column_context_menu)
 
@@ -25,72 +50,257 @@ class KanbanColumn(QWidget):
         self.layout.setSpacing(12)
 
         self.header = QLabel(name)
+        self.header.setObjectName("columnHeader")
         self.header.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.header.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
+        self.header.setWordWrap(True)
         self.layout.addWidget(self.header)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setStyleSheet("QScrollArea { border: none; }")
+        self.placeholder = QLabel()
+        self.placeholder.setObjectName("columnPlaceholder")
+        self.placeholder.setAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop)
+        self.layout.addWidget(self.placeholder, 1)
+
+        if virtual:
+            self.list_model = CardListModel(items, self)
+            self.view = CardListView(self)
+            self.view.setModel(self.list_model)
+            self.layout.addWidget(self.view)
+        else:
+            self.scroll = QScrollArea()
+            self.scroll.setWidgetResizable(True)
 
-        self.scroll_content = QWidget()
-        self.scroll_layout = QVBoxLayout()
-        self.scroll_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.scroll_content.setLayout(self.scroll_layout)
+            self.scroll_content = QWidget()
+            self.scroll_content.setObjectName("scrollContent")
+            self.scroll_layout = QVBoxLayout()
+            self.scroll_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+            self.scroll_content.setLayout(self.scroll_layout)
 
-        self.scroll.setWidget(self.scroll_content)
-        self.layout.addWidget(self.scroll)
+            self.scroll.setWidget(self.scroll_content)
+            self.layout.addWidget(self.scroll)
 
         self.setLayout(self.layout)
-        self.load_cards()
+        self.load_cards(limit if self.materialized else 0)
+        self.update_body()
 
     def set_theme(self, theme):
         self.theme = theme
-        if theme == 'light':
-            self.setStyleSheet("background-color: #f5f5f5; border-radius: 15px;")
-            self.header.setStyleSheet("color: #222222; font-weight: bold;")
-        elif theme == 'msu':
-            self.setStyleSheet("""
-                background-color: #ffffff;
-                border: 1px solid #ccc;
-                border-radius: 15px;
-                padding: 8px;
-            """)
-            self.header.setStyleSheet("color: #18453B; font-weight: bold;")
-        else:
-            self.setStyleSheet("""
-                background-color: #1c1c1c;
-                border: 1px solid #333;
-                border-radius: 15px;
-                padding: 8px;
-            """)
-            self.header.setStyleSheet("color: #00aaff; font-weight: bold;")
-
         for card in self.cards:
             card.set_theme(theme)
+        if self.virtual:
+            self.view.set_theme(theme)
 
-    def load_cards(self):
-        for card_data in self.items:
-            card = KanbanCard(
-                card_id=card_data['id'],
-                title=card_data['title'],
-                description=card_data['description'],
-                parent=self,
-                tag=card_data.get('tag', ''),
-                priority=card_data.get('priority', 'Low'),
-                checklist=card_data.get('checklist', [])
-            )
-            card.set_theme(self.theme)
+    def load_cards(self, limit=None):
+        """Build card widgets for the first ``limit`` items (all if None); fill() adds the rest."""
+        if self.virtual:
+            self.list_model.set_items(self.items)
+            return
+        for card_data in self.items[:limit]:
+            card = self.create_card(card_data)
             self.cards.append(card)
             self.scroll_layout.addWidget(card)
         self.scroll_layout.addStretch()
 
+    def pending(self):
+        """Items that don't have a widget yet. ``cards`` always mirrors a prefix of ``items``."""
+        if self.virtual or not self.materialized:
+            return 0
+        return len(self.items) - len(self.cards)
+
+    def body(self):
+        return self.view if self.virtual else self.scroll
+
+    def update_body(self):
+        """Show the cards, or just the card count when dormant or collapsed."""
+        shown = self.materialized and not self.collapsed
+        self.body().setVisible(shown)
+        self.placeholder.setVisible(not shown)
+        self.update_count()
+
+    def update_count(self):
+        if not self.placeholder.isHidden():
+            count = len(self.items)
+            self.placeholder.setText(f"{count} card{'' if count == 1 else 's'}")
+
+    def materialize(self, limit=None):
+        """Build the first ``limit`` card widgets (all if None) of a dormant column."""
+        if self.materialized:
+            return
+        self.materialized = True
+        self.fill(len(self.items) if limit is None else limit)
+        self.update_body()
+
+    def release_cards(self):
+        """Give up the card widgets of a widget column and go dormant."""
+        if self.virtual or not self.materialized:
+            return
+        self.materialized = False
+        for card in self.cards:
+            self.scroll_layout.removeWidget(card)
+            dispose_card(card, self.pool)
+        self.cards = []
+        self.update_body()
+
+    def set_collapsed(self, collapsed):
+        if collapsed == self.collapsed:
+            return
+        self.collapsed = collapsed
+        if collapsed:
+            self.setFixedWidth(COLLAPSED_WIDTH)
+        else:
+            self.setMinimumWidth(COLUMN_WIDTH)
+            self.setMaximumWidth(QWIDGETSIZE_MAX)
+        self.update_body()
+
+    def fill(self, count):
+        """Build widgets for up to ``count`` more items; returns how many were added."""
+        start = len(self.cards)
+        for card_data in self.items[start:start + count]:
+            card = self.create_card(card_data)
+            # Polish now rather than on the next show, so the caller's time
+            # slice pays for the stylesheet work too.
+            card.ensurePolished()
+            self.scroll_layout.insertWidget(len(self.cards), card)
+            self.cards.append(card)
+        return len(self.cards) - start
+
+    def create_card(self, card_data):
+        if self.pool is not None:
+            card = self.pool.acquire(card_data, self, self.theme)
+        else:
+            card = KanbanCard(card_data, parent=self)
+            card.set_theme(self.theme)
+        if card_data.id in self.selection:
+            card.set_selected(True)
+        if not self.shows(card_data):
+            card.hide()
+        return card
+
+    def shows(self, card_data):
+        return self.filter is None or card_data in self.filter
+
+    def show_card(self, card):
+        """Show or hide ``card`` for the filter; setVisible() isn't cheap even when nothing changes."""
+        shown = self.shows(card.card)
+        if card.isHidden() == shown:
+            card.setVisible(shown)
+
+    def set_filter(self, result):
+        """Show only the cards in ``result`` (a search.SearchResult; all cards if None).
+
+        Widgets are hidden, not rebuilt; virtual columns filter their rows.
+        """
+        if result is None and self.filter is None:
+            return
+        self.filter = result
+        if self.virtual:
+            self.list_model.set_filter(result)
+            return
+        for card in self.cards:
+            self.show_card(card)
+
+    def sync(self, name, items, limit=None):
+        """Reconcile the column with ``items``, reusing card widgets by id.
+
+        Only the first ``limit`` items get widgets; see fill().
+        """
+        if name != self.name:
+            self.name = name
+            self.header.setText(name)
+        self.items = items
+        self.update_count()
+        if self.virtual:
+            self.list_model.set_items(items)
+            return
+        if not self.materialized:
+            limit = 0
+
+        existing = {}
+        for card in self.cards:
+            existing.setdefault(card.card_id, card)
+        cards = []
+        for card_data in items[:limit]:
+            card = existing.pop(card_data.id, None)
+            if card is None:
+                card = self.create_card(card_data)
+            else:
+                card.sync(card_data)
+                self.show_card(card)
+            cards.append(card)
+
+        for card in self.cards:
+            if existing.get(card.card_id) is card:
+                self.scroll_layout.removeWidget(card)
+                dispose_card(card, self.pool)
+
+        for i, card in enumerate(cards):
+            item = self.scroll_layout.itemAt(i)
+            if item is None or item.widget() is not card:
+                self.scroll_layout.removeWidget(card)
+                self.scroll_layout.insertWidget(i, card)
+        self.cards = cards
+
+    def reconcile(self, limit=None, edited=()):
+        """Catch up with a batch of model changes in one pass; see KanbanBoard.show_batch."""
+        if self.virtual:
+            delegate = self.view.itemDelegate()
+            for card_data in edited:
+                delegate.invalidate(card_data.id)
+        self.sync(self.name, self.items, limit)
+
+    def show_selection(self, changed):
+        """Repaint the cards whose ids in ``changed`` were selected or deselected."""
+        if self.virtual:
+            self.view.viewport().update()
+            return
+        for card in self.cards:
+            if card.card_id in changed:
+                card.set_selected(card.card_id in self.selection)
+
+    def ids_in(self, rect):
+        """Ids of the shown cards that intersect ``rect``, in global coordinates."""
+        if self.collapsed or not self.materialized or not self.isVisible():
+            return []
+        body = self.view.viewport() if self.virtual else self.scroll.viewport()
+        area = QRect(body.mapToGlobal(QPoint(0, 0)), body.size()).intersected(rect)
+        if area.isEmpty():
+            return []
+        if self.virtual:
+            top = body.mapFromGlobal(area.topLeft())
+            bottom = top.y() + area.height()
+            index = self.view.indexAt(top)
+            ids = []
+            row = index.row()
+            while index.isValid() and self.view.visualRect(index).top() < bottom:
+                ids.append(index.data(ITEM_ROLE).id)
+                row += 1
+                index = self.list_model.index(row)
+            return ids
+        area = QRect(self.scroll_content.mapFromGlobal(area.topLeft()), area.size())
+        return [card.card_id for card in self.cards if not card.isHidden() and card.geometry().intersects(area)]
+
     def show_column_context_menu(self, pos):
         menu = QMenu(self)
         add_task_action = menu.addAction("New Task")
+        collapse_action = menu.addAction("Expand Column" if self.collapsed else "Collapse Column")
         action = menu.exec(self.mapToGlobal(pos))
         if action == add_task_action:
             self.show_add_dialog()
+        elif action == collapse_action:
+            self.toggle_collapsed()
+
+    def toggle_collapsed(self):
+        board = self.board()
+        if board is not None:
+            board.set_column_collapsed(self.key, not self.collapsed)
+        else:
+            self.set_collapsed(not self.collapsed)
+
+    def mouseDoubleClickEvent(self, event):
+        if self.header.geometry().contains(event.position().toPoint()):
+            self.toggle_collapsed()
+        else:
+            super().mouseDoubleClickEvent(event)
 
     def show_add_dialog(self):
         dialog = AddCardDialog(self)
@@ -99,28 +309,11 @@ class KanbanColumn(QWidget):
             if not title.strip():
                 return
 
-            parent = self.parent()
-            while parent is not None and not hasattr(parent, 'data'):
-                parent = parent.parent()
-            if parent is None:
+            board = self.board()
+            if board is None:
                 return
 
-            max_id = 0
-            for col in parent.data['columns'].values():
-                for item in col['items']:
-                    try:
-                        max_id = max(max_id, int(item['id']))
-                    except:
-                        pass
-            new_id = str(max_id + 1)
-
-            new_card = KanbanCard(new_id, title, desc, self, '', priority, checklist)
-            new_card.set_theme(self.theme)
-            self.cards.append(new_card)
-            self.scroll_layout.insertWidget(self.scroll_layout.count() - 1, new_card)
-
-            parent.data['columns'][self.key]['items'].append({
-                'id': new_id,
+            board.model.add_card(self.key, {
                 'title': title,
                 'description': desc,
                 'tag': '',
@@ -128,6 +321,67 @@ class KanbanColumn(QWidget):
                 'checklist': checklist
             })
 
+    def board(self):
+        return find_ancestor(self, 'model')
+
+    def update_row(self, row, key, value):
+        self.update_row_fields(row, {key: value}, op=key if key in ('tag', 'priority') else 'edit')
+
+    def update_row_fields(self, row, fields, op='edit'):
+        board = self.board()
+        if board:
+            board.model.update_card(self.row_item(row).id, fields, op)
+
+    def delete_row(self, row):
+        board = self.board()
+        if board:
+            board.model.delete_card(self.row_item(row).id)
+
+    def row_item(self, row):
+        return self.list_model.item(row) if self.virtual else self.items[row]
+
+    # Called by the board for each model change touching this column. The
+    # column's ``items`` is the model's list, so it is already up to date.
+
+    def insert_card(self, index, card_data, widget=None):
+        """Show the card now at ``index``, reusing ``widget`` when it came from another widget column."""
+        self.update_count()
+        if self.virtual or not self.materialized or index > len(self.cards):
+            if self.virtual:
+                self.list_model.rows_inserted(index)
+            if widget is not None:
+                dispose_card(widget, self.pool)
+            return
+        if widget is None:
+            widget = self.create_card(card_data)
+        else:
+            widget.sync(card_data)
+            if widget.theme != self.theme:
+                widget.set_theme(self.theme)
+        self.cards.insert(index, widget)
+        self.scroll_layout.insertWidget(index, widget)
+        widget.setVisible(self.shows(card_data))
+
+    def take_card(self, index):
+        """Drop the card that was at ``index``; return its widget, if any."""
+        self.update_count()
+        if self.virtual:
+            self.list_model.rows_removed(index)
+            return None
+        if index >= len(self.cards):
+            return None
+        card = self.cards.pop(index)
+        self.scroll_layout.removeWidget(card)
+        return card
+
+    def card_changed(self, index, card_data):
+        if self.virtual:
+            self.view.itemDelegate().invalidate(card_data.id)
+            self.list_model.item_changed(index)
+        elif index < len(self.cards):
+            self.cards[index].sync(card_data)
+            self.show_card(self.cards[index])
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasFormat(MIME_TYPE):
             event.acceptProposedAction()
@@ -141,60 +395,57 @@ class KanbanColumn(QWidget):
             event.ignore()
 
     def dropEvent(self, event):
-        if event.mimeData().hasFormat(MIME_TYPE):
-            data = event.mimeData().data(MIME_TYPE)
-            stream = QDataStream(data, QIODevice.OpenModeFlag.ReadOnly)
-            card_id = stream.readQString()
-            title = stream.readQString()
-            description = stream.readQString()
-            tag = stream.readQString()
-            priority = stream.readQString()
-            checklist = json.loads(stream.readQString())
-
-            parent = self.parent()
-            while parent and not hasattr(parent, 'columns'):
-                parent = parent.parent()
-            if not parent:
-                return
-
-            source_column = None
-            card_to_remove = None
-            for col_key, col_widget in parent.columns.items():
-                for card in col_widget.cards:
-                    if card.card_id == card_id:
-                        source_column = col_widget
-                        card_to_remove = card
-                        break
-
-            if card_to_remove and source_column:
-                source_column.cards.remove(card_to_remove)
-                source_column.scroll_layout.removeWidget(card_to_remove)
-                card_to_remove.setParent(None)
-                for item in parent.data['columns'][source_column.key]['items']:
-                    if item['id'] == card_id:
-                        parent.data['columns'][source_column.key]['items'].remove(item)
-                        parent.data['columns'][self.key]['items'].append(item)
-                        break
-
-            new_card = KanbanCard(card_id, title, description, self, tag, priority, checklist)
-            new_card.set_theme(self.theme)
-            self.cards.append(new_card)
-
-            insert_index = self.get_drop_index(event.position().toPoint())
-            self.scroll_layout.insertWidget(insert_index, new_card)
+        if not event.mimeData().hasFormat(MIME_TYPE):
+            event.ignore()
+            return
+        board = self.board()
+        card_ids = [] if board is None else [
+            card_id for card_id in decode_card_ids(event.mimeData().data(MIME_TYPE)) if card_id in board.model]
+        if not card_ids:
+            event.ignore()
+            return
 
-            event.acceptProposedAction()
+        if self.collapsed or not self.materialized:
+            index = len(self.items)
+        elif self.virtual:
+            row = self.view.drop_row(self.view.viewport().mapFrom(self, event.position().toPoint()))
+            index = self.list_model.item_index(row)
         else:
-            event.ignore()
+            index = self.get_drop_index(event.position().toPoint())
+        if len(card_ids) == 1:
+            card_id = card_ids[0]
+            if board.model.column_of(card_id) == self.key and index > board.model.index_of(card_id):
+                index -= 1
+            board.model.move_card(card_id, self.key, index)
+        else:
+            # Land in front of the first card at the drop point that isn't being moved.
+            moving = set(card_ids)
+            before = next((card.id for card in self.items[index:] if card.id not in moving), None)
+            board.model.move_cards(card_ids, self.key, before)
+        event.acceptProposedAction()
 
     def get_drop_index(self, pos: QPoint) -> int:
-        for i in range(self.scroll_layout.count() - 1):
-            item = self.scroll_layout.itemAt(i)
-            if item and item.widget():
-                widget = item.widget()
-                if pos.y() < widget.y() + widget.height() // 2:
-                    return i
-        return self.scroll_layout.count() - 1
+        """Card index a drop at ``pos`` (column coordinates) lands on."""
+        y = self.scroll_content.mapFrom(self, pos).y()
+        if self.filter is None:
+            cards = self.cards
+        else:
+            # Hidden cards keep stale geometry, so only search the shown ones.
+            shown = [i for i, card in enumerate(self.cards) if not card.isHidden()]
+            cards = [self.cards[i] for i in shown]
+        lo, hi = 0, len(cards)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            card = cards[mid]
+            if y < card.y() + card.height() // 2:
+                hi = mid
+            else:
+                lo = mid + 1
+        if self.filter is None:
+            return lo
+        if lo < len(shown):
+            return shown[lo]
+        return shown[-1] + 1 if shown else len(self.items)
 
     def dragLeaveEvent(self, event):
         event.accept()
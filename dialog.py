@@ -1,10 +1,10 @@
 # dialog.py
 
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QLineEdit, QTextEdit, QComboBox,
-    QPushButton, QLabel, QDialogButtonBox, QCheckBox, QHBoxLayout
+    QDialog, QVBoxLayout, QLineEdit, QTextEdit, QComboBox, QLabel, QDialogButtonBox
 )
-from PyQt6.QtCore import Qt
+
+from checklist import ChecklistEditor, ChecklistModel
 
 
 class AddCardDialog(QDialog):
@@ -18,7 +18,7 @@ class AddCardDialog(QDialog):
                 color: #d6d6d6;
                 font-size: 14px;
             }
-            QLineEdit, QTextEdit, QComboBox {
+            QLineEdit, QTextEdit, QComboBox, QListView {
                 background-color: #121212;
                 border: 1px solid #005577;
                 border-radius: 6px;
@@ -60,18 +60,9 @@ class AddCardDialog(QDialog):
         # Checklist label
         self.layout.addWidget(QLabel("Checklist:"))
 
-        # Checklist layout
-        self.checklist_items = []
-        self.checklist_rows = []
-        self.checklist_layout = QVBoxLayout()
-        self.layout.addLayout(self.checklist_layout)
-
-        self.set_checklist(checklist or [])
-
-        # Add checklist item button
-        self.add_checklist_button = QPushButton("+ Add Subtask")
-        self.add_checklist_button.clicked.connect(self.add_checklist_item)
-        self.layout.addWidget(self.add_checklist_button)
+        # Checklist editor
+        self.checklist_editor = ChecklistEditor(checklist or [])
+        self.layout.addWidget(self.checklist_editor)
 
         # OK/Cancel buttons
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -80,65 +71,18 @@ class AddCardDialog(QDialog):
         self.layout.addWidget(buttons)
 
     def set_checklist(self, checklist):
-        self.clear_checklist()
-        for item in checklist:
-            if isinstance(item, dict):
-                self.add_checklist_item(item.get('text', ''), item.get('done', False))
-            else:
-                self.add_checklist_item(str(item), False)
+        editor = self.checklist_editor
+        editor.model = ChecklistModel(checklist, editor)
+        editor.view.setModel(editor.model)
 
     def clear_checklist(self):
-        for row in self.checklist_rows:
-            while row.count():
-                item = row.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-            self.checklist_layout.removeItem(row)
-        self.checklist_items.clear()
-        self.checklist_rows.clear()
+        self.set_checklist([])
 
     def add_checklist_item(self, text='', done=False):
-        row = QHBoxLayout()
-        checkbox = QCheckBox()
-        checkbox.setChecked(done)
-
-        line_edit = QLineEdit()
-        line_edit.setText(str(text))
-
-        remove_button = QPushButton("Remove")
-        remove_button.setFixedWidth(70)
-
-        def remove():
-            checkbox.deleteLater()
-            line_edit.deleteLater()
-            remove_button.deleteLater()
-            self.checklist_items.remove((checkbox, line_edit, remove_button))
-            self.checklist_rows.remove(row)
-            while row.count():
-                item = row.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.deleteLater()
-            self.checklist_layout.removeItem(row)
-
-        remove_button.clicked.connect(remove)
-
-        row.addWidget(checkbox)
-        row.addWidget(line_edit)
-        row.addWidget(remove_button)
-
-        self.checklist_layout.addLayout(row)
-        self.checklist_items.append((checkbox, line_edit, remove_button))
-        self.checklist_rows.append(row)
+        self.checklist_editor.add_item(str(text), done)
 
     def get_data(self):
         title = self.title_input.text().strip()
         description = self.desc_input.toPlainText().strip()
         priority = self.priority_select.currentText()
-        checklist = []
-        for checkbox, line_edit, _ in self.checklist_items:
-            text = line_edit.text().strip()
-            if text:
-                checklist.append({'text': text, 'done': checkbox.isChecked()})
-        return title, description, priority, checklist
+        return title, description, priority, self.checklist_editor.model.checklist()
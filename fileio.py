@@ -0,0 +1,53 @@
+# fileio.py
+#
+# Crash-safe file helpers shared by the storage formats.
+
+import json
+import os
+import stat
+import tempfile
+
+
+def _umask():
+    # The umask can only be read by setting it, which isn't safe once saves
+    # run on worker threads, so it is read once at import.
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _umask()
+
+
+def atomic_write_json(filename, data, indent=2):
+    """Write ``data`` as JSON to ``filename`` via a temp file and os.replace."""
+    atomic_write(filename, lambda f: json.dump(data, f, indent=indent))
+
+
+def atomic_write(filename, write, binary=False, replace=os.replace):
+    """Call ``write(f)`` on a temp file next to ``filename``, then os.replace it into place.
+
+    The file keeps its permissions; a new one gets the umask default.
+    ``replace(tmp_path, filename)`` does the rename, for a caller that has to
+    let go of the old file around it.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=".kanban-", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates the file 0600, and os.replace would keep that.
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "wb") if binary else os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,149 @@
+# history.py
+#
+# Undo/redo for a BoardModel. Every model change is recorded as the operation
+# that reverses it (delete a created card, move a card back, restore the
+# previous field values, re-create a deleted card), so a step costs about as
+# much as the change itself and nothing ever copies the board. Old field
+# values are kept by reference: the model replaces values (a new checklist
+# list on every edit) instead of mutating them, so they can be shared.
+#
+# Undoing is itself a model change; while a step is being undone its changes
+# are recorded onto the redo stack, and vice versa. A batch of changes (see
+# BoardModel.batch) is one step, and is undone as one batch.
+#
+# Changes made inside untracked() (another client's edits, see
+# sync_client.py) are not undoable; steps that touch cards those changes
+# deleted or re-created skip them.
+
+from collections import deque
+from contextlib import contextmanager
+
+HISTORY_LIMIT = 1000
+
+LABELS = {
+    'create': 'Add',
+    'delete': 'Delete',
+    'move': 'Move',
+    'edit': 'Edit',
+    'tag': 'Tag',
+    'priority': 'Priority',
+}
+
+
+def inverse(change):
+    """The operation that reverts ``change``, as a tuple for History.apply_op."""
+    card = change.card
+    if change.op == 'create':
+        return ('delete', card.id)
+    if change.op == 'delete':
+        fields = card.to_dict()
+        del fields['id']
+        return ('create', change.column, change.index, card.id, fields)
+    if change.op == 'move':
+        return ('move', card.id, change.source, change.source_index)
+    return ('update', card.id, change.previous, change.op)
+
+
+def batch_label(changes):
+    ops = {change.op for change in changes}
+    label = LABELS.get(ops.pop(), 'Edit') if len(ops) == 1 else 'Edit'
+    return label if len(changes) == 1 else f"{label} {len(changes)} Cards"
+
+
+class Step:
+    """One undoable user action: the inverse ops of its changes, newest last."""
+
+    __slots__ = ('label', 'ops')
+
+    def __init__(self, label):
+        self.label = label
+        self.ops = []
+
+
+class History:
+    def __init__(self, model, limit=HISTORY_LIMIT):
+        self.model = model
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+        self._recording = None
+        self._untracked = 0
+        model.subscribe(self.on_change)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    @contextmanager
+    def untracked(self):
+        """Don't make the changes notified inside the block undoable."""
+        self._untracked += 1
+        try:
+            yield
+        finally:
+            self._untracked -= 1
+
+    def on_change(self, change):
+        if change.op == 'reset':
+            self.clear()
+            return
+        if self._untracked:
+            return
+        changes = change.changes if change.op == 'batch' else (change,)
+        if self._recording is not None:
+            self._recording.ops.extend(inverse(c) for c in changes)
+            return
+        step = Step(batch_label(changes))
+        step.ops.extend(inverse(c) for c in changes)
+        self.undo_stack.append(step)
+        self.redo_stack.clear()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo_label(self):
+        return self.undo_stack[-1].label if self.undo_stack else None
+
+    def redo_label(self):
+        return self.redo_stack[-1].label if self.redo_stack else None
+
+    def undo(self):
+        return self._replay(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        return self._replay(self.redo_stack, self.undo_stack)
+
+    def _replay(self, source, target):
+        if not source:
+            return False
+        step = source.pop()
+        # Record what replaying does, so it can be replayed back.
+        self._recording = Step(step.label)
+        try:
+            with self.model.batch():
+                for op in reversed(step.ops):
+                    self.apply_op(op)
+        finally:
+            recorded, self._recording = self._recording, None
+        if recorded.ops:
+            target.append(recorded)
+        return True
+
+    def apply_op(self, op):
+        model = self.model
+        kind = op[0]
+        if kind == 'delete':
+            model.delete_card(op[1])
+        elif kind == 'create':
+            _, column, index, card_id, fields = op
+            if card_id not in model:
+                model.add_card(column, fields, index, card_id=card_id)
+        elif kind == 'move':
+            _, card_id, column, index = op
+            if card_id in model:
+                model.move_card(card_id, column, index)
+        else:
+            _, card_id, fields, change_op = op
+            model.update_card(card_id, fields, change_op)
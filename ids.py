@@ -0,0 +1,36 @@
+# ids.py
+#
+# Card id bookkeeping for board files. Boards store a monotonic ``next_id``
+# counter so that new cards get an id in O(1) instead of rescanning every
+# item on the board; BoardModel.allocate_id hands the ids out, and this
+# module only checks and repairs the stored counter.
+
+
+def _numeric(card_id):
+    try:
+        return int(card_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def max_numeric_id(data):
+    highest = 0
+    for col in data['columns'].values():
+        for item in col['items']:
+            value = _numeric(item.get('id'))
+            if value is not None and value > highest:
+                highest = value
+    return highest
+
+
+def migrate(data, verify=False):
+    """Give boards saved before ``next_id`` existed a counter past their highest id.
+
+    With ``verify`` the stored counter is also checked against the items, which
+    catches files whose cards were edited by hand or by another tool.
+    """
+    next_id = _numeric(data.get('next_id'))
+    if next_id is None or next_id < 1 or verify:
+        next_id = max(next_id or 1, max_numeric_id(data) + 1)
+    data['next_id'] = next_id
+    return data
@@ -0,0 +1,207 @@
+# journal.py
+#
+# Journaled board storage: the board file is a base snapshot and every edit
+# after it is appended to ``<board>.journal`` as one JSON line, so saving a
+# single change costs O(change) instead of rewriting the whole board.
+#
+# Record shapes:
+#   {"op": "create", "column": key, "index": i, "item": {...}, "at": t}
+#   {"op": "move", "id": id, "column": key, "index": i, "at": t}
+#   {"op": "edit" | "tag" | "priority", "id": id, "fields": {...}}
+#   {"op": "delete", "id": id, "at": t}
+#
+# ``at`` (time.time(), None for a move within a column) is replayed into the
+# board's ``transitions`` (see model.TransitionLog); older records lack it.
+#
+# Binary boards (see binary_store.py) use the same journal next to their
+# .kbb snapshot.
+#
+# The first line of a journal is a header carrying the snapshot generation it
+# belongs to. Compaction bumps ``journal_generation`` in the snapshot, so a
+# journal left behind by a crash mid-compaction is recognised as stale.
+
+import json
+import os
+
+from binary_store import is_binary_path, read_binary, write_binary
+from fileio import atomic_write_json
+from ids import migrate
+from sqlite_store import is_sqlite_path
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_BYTES = 1 << 20
+
+
+def journal_path(filename):
+    return filename + JOURNAL_SUFFIX
+
+
+def apply_records(data, records):
+    """Replay journal records onto board ``data`` in place."""
+    where = {}
+    for key, col in data['columns'].items():
+        for item in col['items']:
+            where[item['id']] = key
+
+    def log(card_id, source, target, at):
+        if at is not None:
+            data.setdefault('transitions', []).append([card_id, source, target, at])
+
+    def take(card_id):
+        key = where.pop(card_id, None)
+        if key is None:
+            return None
+        items = data['columns'][key]['items']
+        for i, item in enumerate(items):
+            if item['id'] == card_id:
+                return items.pop(i)
+        return None
+
+    for record in records:
+        op = record['op']
+        if op == 'create':
+            item = dict(record['item'])
+            items = data['columns'][record['column']]['items']
+            items.insert(record.get('index', len(items)), item)
+            where[item['id']] = record['column']
+            log(item['id'], None, record['column'], record.get('at'))
+        elif op == 'move':
+            source = where.get(record['id'])
+            item = take(record['id'])
+            if item is not None:
+                items = data['columns'][record['column']]['items']
+                items.insert(record.get('index', len(items)), item)
+                where[item['id']] = record['column']
+                log(item['id'], source, record['column'], record.get('at'))
+        elif op in ('edit', 'tag', 'priority'):
+            key = where.get(record['id'])
+            if key is not None:
+                for item in data['columns'][key]['items']:
+                    if item['id'] == record['id']:
+                        item.update(record['fields'])
+                        break
+        elif op == 'delete':
+            source = where.get(record['id'])
+            if take(record['id']) is not None:
+                log(record['id'], source, None, record.get('at'))
+    return data
+
+
+def read_journal(filename, generation):
+    """Return (records, clean) for the journal of ``filename``.
+
+    Records from a journal of another generation are ignored. ``clean`` is
+    False if the last line was cut short, in which case the next save must
+    compact rather than append after the broken line.
+    """
+    path = journal_path(filename)
+    if not os.path.exists(path):
+        return [], True
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    clean = lines[-1] == ""
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return [], clean
+    try:
+        header = json.loads(lines[0])
+    except json.JSONDecodeError:
+        return [], False
+    if header.get('generation') != generation:
+        return [], True
+    for n, line in enumerate(lines[1:], 1):
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            if n == len(lines) - 1:
+                return records, False
+            raise
+    return records, clean
+
+
+def load_board(filename):
+    """Load a board snapshot and replay its journal. Returns (data, clean)."""
+    if is_binary_path(filename):
+        data = read_binary(filename)
+    else:
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    records, clean = read_journal(filename, data.get('journal_generation', 0))
+    apply_records(data, records)
+    if records:
+        # The snapshot's next_id predates the cards the journal created.
+        migrate(data, verify=True)
+    return data, clean
+
+
+def append_records(filename, generation, records):
+    path = journal_path(filename)
+    lines = []
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        lines.append(json.dumps({'generation': generation}))
+    lines.extend(json.dumps(record) for record in records)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_snapshot(filename, data):
+    """Write a compacted snapshot and drop the journal it supersedes."""
+    if is_binary_path(filename):
+        write_binary(filename, data)
+    else:
+        atomic_write_json(filename, data)
+    try:
+        os.remove(journal_path(filename))
+    except FileNotFoundError:
+        pass
+
+
+class Journal:
+    """Pending journal records for the board file currently being edited."""
+
+    def __init__(self):
+        self.pending = []
+        self.filename = None
+        self.generation = 0
+        self.has_base = False
+        self.size = 0
+
+    def record(self, op, **fields):
+        record = {'op': op}
+        record.update(fields)
+        self.pending.append(record)
+        self.size += len(json.dumps(record))
+
+    def reset(self, filename, generation, has_base=True, fresh=False):
+        """Start journaling against the snapshot of ``filename``.
+
+        ``size`` starts at what the journal already holds on disk, so a board
+        reopened every session still gets compacted; ``fresh`` is for a new
+        snapshot that is about to replace the journal.
+        """
+        self.pending = []
+        self.filename = filename
+        self.generation = generation
+        self.has_base = has_base
+        try:
+            self.size = os.path.getsize(journal_path(filename)) if has_base and not fresh else 0
+        except (OSError, TypeError):
+            self.size = 0
+
+    def invalidate(self):
+        """Force the next save to write a full snapshot."""
+        self.pending = []
+        self.has_base = False
+
+    def can_append(self, filename):
+        if not self.has_base or filename != self.filename:
+            return False
+        # SQLite applies records as row writes, so it never needs compacting.
+        return is_sqlite_path(filename) or self.size < COMPACT_BYTES
+
+    def take(self):
+        records, self.pending = self.pending, []
+        return records
@@ -0,0 +1,122 @@
+# loader.py
+#
+# Progressive board loading. A BoardLoader thread reads and converts the file
+# into a BoardModel off the GUI thread; the board then shows the first
+# screenful of every column and a CardFiller builds the remaining card widgets
+# in short time slices, so the window keeps repainting and accepting input.
+# The search index is built on the same thread once the board is shown.
+
+import sqlite3
+import struct
+import time
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from ids import migrate
+from model import BoardModel
+from search import SearchIndex
+
+FIRST_SCREEN_CARDS = 12
+FILL_SLICE_MS = 20
+FILL_BATCH = 2
+# What reading a board file raises when it is unreadable, corrupt, locked by
+# another writer or not a board at all.
+READ_ERRORS = (OSError, ValueError, LookupError, TypeError, AttributeError,
+               struct.error, sqlite3.Error)
+
+
+class BoardLoader(QThread):
+    """Reads ``filename`` with ``reader`` and builds a BoardModel from it.
+
+    After ``loaded`` it also builds a SearchIndex over the model and emits
+    ``indexed``; see SearchIndex.adopt.
+    """
+
+    loaded = pyqtSignal(object, bool)
+    indexed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, reader, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.reader = reader
+        self.cancelled = False
+
+    def cancel(self):
+        # The parse itself can't be interrupted; a cancelled result is dropped.
+        self.cancelled = True
+
+    def run(self):
+        try:
+            data, clean = self.reader(self.filename)
+            migrate(data, verify=True)
+            model = BoardModel(data)
+        except READ_ERRORS as e:
+            if not self.cancelled:
+                self.failed.emit(str(e))
+            return
+        if self.cancelled:
+            return
+        self.loaded.emit(model, clean)
+        index = SearchIndex(model, subscribe=False)
+        index.rebuild()
+        if not self.cancelled:
+            self.indexed.emit(index)
+
+
+class CardFiller(QObject):
+    """Builds the not-yet-shown card widgets of columns a slice at a time."""
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = []
+        self.total = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.fill_slice)
+
+    def active(self):
+        return self.timer.isActive()
+
+    def start(self, columns):
+        self.columns = [col for col in columns if col.pending()]
+        self.total = sum(len(col.items) for col in columns)
+        if self.columns:
+            self.timer.start()
+            self.progress.emit(self.shown(), self.total)
+        else:
+            self.finished.emit()
+
+    def add(self, columns):
+        """Also fill ``columns``, e.g. ones that just scrolled into view."""
+        if not self.active():
+            self.columns = []
+            self.total = 0
+        for col in columns:
+            if col.pending() and col not in self.columns:
+                self.columns.append(col)
+                self.total += len(col.items)
+        if self.columns and not self.active():
+            self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.columns = []
+
+    def shown(self):
+        return self.total - sum(col.pending() for col in self.columns)
+
+    def fill_slice(self):
+        deadline = time.perf_counter() + FILL_SLICE_MS / 1000.0
+        while self.columns and time.perf_counter() < deadline:
+            # Round-robin so every column grows at the same pace.
+            for col in list(self.columns):
+                if not col.fill(FILL_BATCH) or not col.pending():
+                    self.columns.remove(col)
+        self.progress.emit(self.shown(), self.total)
+        if not self.columns:
+            self.timer.stop()
+            self.finished.emit()
@@ -1,12 +1,24 @@
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
-from board import KanbanBoard
 from theme import apply_dark_palette
+from workspace import Workspace, DEFAULT_BUDGET_MB
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Kanban")
+    parser.add_argument("boards", nargs="*", help="board files to open, one tab each")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_BUDGET_MB, metavar="MB",
+                        help="widget memory for all open boards before hidden ones are released")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setPalette(apply_dark_palette())
-    window = KanbanBoard()
+    window = Workspace(args.memory_budget)
+    for filename in args.boards:
+        window.open_tab(filename, show=False)
+    if not args.boards:
+        window.new_tab()
+    window.setCurrentIndex(0)
     window.show()
     sys.exit(app.exec())
 
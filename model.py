@@ -0,0 +1,553 @@
+# model.py
+#
+# The board's state, independent of Qt. Cards and checklist entries are
+# compact __slots__ records kept in per-column lists, and every mutation goes
+# through one BoardModel method that updates the lookup table and notifies
+# subscribers with a Change. The widgets, the journal and anything else that
+# needs to follow the board subscribe instead of poking at shared dicts.
+#
+# The on-disk format is still the plain dict contract ({'columns': {key:
+# {'name', 'items'}}, 'next_id', ...}); load() and to_dict() convert.
+#
+# Every card creation, move and deletion is also stamped into a
+# TransitionLog, saved as the board's ``transitions``: [card id, from column,
+# to column, time.time()] rows, with None for "not on the board".
+
+import time
+from array import array
+from contextlib import contextmanager
+
+from ids import migrate
+
+CARD_FIELDS = ('title', 'description', 'tag', 'priority', 'checklist')
+TAGS = ["Bug", "Feature", "Urgent"]
+PRIORITIES = ["Low", "Med", "High"]
+DEFAULT_COLUMNS = [
+    ('backlog', 'Backlog'),
+    ('todo', 'To Do'),
+    ('inprogress', 'In Progress'),
+    ('testing', 'Testing'),
+    ('done', 'Done'),
+]
+
+
+def empty_board():
+    """A new board in the dict format, with the default columns."""
+    return {
+        'columns': {key: {'name': name, 'items': []} for key, name in DEFAULT_COLUMNS},
+        'next_id': 1,
+    }
+
+
+class ChecklistItem:
+    __slots__ = ('text', 'done')
+
+    def __init__(self, text='', done=False):
+        self.text = text
+        self.done = done
+
+    @classmethod
+    def from_dict(cls, entry):
+        if isinstance(entry, ChecklistItem):
+            return cls(entry.text, entry.done)
+        if isinstance(entry, dict):
+            return cls(entry.get('text', ''), bool(entry.get('done', False)))
+        return cls(str(entry), False)
+
+    def to_dict(self):
+        return {'text': self.text, 'done': self.done}
+
+
+def checklist_from_dicts(entries):
+    return [ChecklistItem.from_dict(entry) for entry in entries or []]
+
+
+def checklist_to_dicts(checklist):
+    return [entry.to_dict() for entry in checklist]
+
+
+class Card:
+    # ``extra`` keeps keys this version doesn't know about, so they survive a save.
+    # ``seq`` is a dense number the BoardModel gives each card it holds, so
+    # indexes can keep per-card flags in arrays (see search.py).
+    # ``body`` is set for cards loaded from a binary board whose description
+    # and checklist are still on disk (see binary_store.Body); the first
+    # access to either reads both in.
+    __slots__ = ('id', 'title', '_description', 'tag', 'priority', '_checklist', 'extra', 'seq', 'body')
+
+    def __init__(self, card_id, title='', description=None, tag='', priority='Low', checklist=None, extra=None,
+                 body=None):
+        self.id = card_id
+        self.title = title
+        self.tag = tag or ''
+        self.priority = priority or 'Low'
+        self.extra = extra
+        self.seq = 0
+        if description is not None and checklist is not None:
+            body = None
+        self.body = body
+        self._description = description if description is not None or body is not None else ''
+        self._checklist = checklist if checklist is not None or body is not None else []
+
+    @property
+    def description(self):
+        if self._description is None:
+            self.load_body()
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        self._description = value
+
+    @property
+    def checklist(self):
+        if self._checklist is None:
+            self.load_body()
+        return self._checklist
+
+    @checklist.setter
+    def checklist(self, value):
+        self._checklist = value
+
+    @property
+    def body_loaded(self):
+        return self.body is None
+
+    def shown_description(self):
+        """The description if it is in memory; a card whose body is still on
+        disk is shown compact, with "…" if it has a description."""
+        if self._description is not None:
+            return self._description
+        return "…" if self.body.has_description else ''
+
+    def load_body(self):
+        if self.body is not None:
+            description, checklist = self.peek_body()
+            self._description, self._checklist = description, checklist
+            self.body = None
+
+    def peek_body(self):
+        """(description, checklist) without keeping what had to be read from disk."""
+        description, checklist = self._description, self._checklist
+        if self.body is not None:
+            stored, entries = self.body.read()
+            if description is None:
+                description = stored
+            if checklist is None:
+                checklist = checklist_from_dicts(entries)
+        return description, checklist
+
+    def checklist_counts(self):
+        """(done, total) of the checklist, from the body's index entry if it is still on disk."""
+        if self._checklist is None:
+            return self.body.counts()
+        return sum(1 for item in self._checklist if item.done), len(self._checklist)
+
+    @classmethod
+    def from_dict(cls, item):
+        extra = {key: value for key, value in item.items() if key != 'id' and key not in CARD_FIELDS}
+        body = extra.pop('_body', None)
+        checklist = item.get('checklist')
+        return cls(item['id'], item.get('title', ''), item.get('description'), item.get('tag', ''),
+                   item.get('priority', 'Low'),
+                   checklist_from_dicts(checklist) if checklist is not None or body is None else None,
+                   extra or None, body)
+
+    def to_dict(self, lazy=False):
+        """The card in the dict format. With ``lazy`` a body still on disk is
+        passed on as ``_body`` (see binary_store.write_binary) instead of read."""
+        if lazy and self.body is not None:
+            item = {'id': self.id, 'title': self.title, 'tag': self.tag, 'priority': self.priority,
+                    '_body': self.body}
+            if self._description is not None:
+                item['description'] = self._description
+            if self._checklist is not None:
+                item['checklist'] = checklist_to_dicts(self._checklist)
+        else:
+            description, checklist = self.peek_body()
+            item = {
+                'id': self.id,
+                'title': self.title,
+                'description': description,
+                'tag': self.tag,
+                'priority': self.priority,
+                'checklist': checklist_to_dicts(checklist),
+            }
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+
+class Column:
+    __slots__ = ('key', 'name', 'cards')
+
+    def __init__(self, key, name, cards=None):
+        self.key = key
+        self.name = name
+        self.cards = cards if cards is not None else []
+
+
+class TransitionLog:
+    """Column transitions as parallel columns in the order they were logged:
+    ``cards``, ``sources``, ``targets`` (column keys, None for created/deleted)
+    and ``times``. ``ordered`` is False once a row was older than the one
+    before it (merged boards, clock changes)."""
+
+    __slots__ = ('cards', 'sources', 'targets', 'times', 'ordered')
+
+    def __init__(self, rows=()):
+        self.cards = []
+        self.sources = []
+        self.targets = []
+        self.times = array('d')
+        self.ordered = True
+        for card_id, source, target, at in rows:
+            self.append(card_id, source, target, at)
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, card_id, source, target, at):
+        if self.times and at < self.times[-1]:
+            self.ordered = False
+        self.cards.append(card_id)
+        self.sources.append(source)
+        self.targets.append(target)
+        self.times.append(at)
+
+    def rows(self):
+        return [list(row) for row in zip(self.cards, self.sources, self.targets, self.times)]
+
+
+class Change:
+    """What a BoardModel mutation did, passed to every subscriber.
+
+    ``op`` is one of the journal ops ('create', 'move', 'edit', 'tag',
+    'priority', 'delete') or 'reset' after load(). ``column``/``index`` are
+    where the card is now (where it was, for 'delete'); moves also carry
+    ``source``/``source_index``. Field updates carry the new ``fields`` and
+    the ``previous`` values they replaced. Creates, moves and deletes carry
+    the time ``at`` they were logged in the TransitionLog.
+
+    A 'batch' change (see BoardModel.batch) only has ``changes``, the
+    changes made inside the batch in order.
+    """
+
+    __slots__ = ('op', 'card', 'column', 'index', 'source', 'source_index', 'fields', 'previous', 'changes', 'at')
+
+    def __init__(self, op, card=None, column=None, index=None, source=None, source_index=None, fields=None,
+                 previous=None, changes=None, at=None):
+        self.op = op
+        self.card = card
+        self.column = column
+        self.index = index
+        self.source = source
+        self.source_index = source_index
+        self.fields = fields
+        self.previous = previous
+        self.changes = changes
+        self.at = at
+
+    def record(self):
+        """The journal record for this change (see journal.py)."""
+        if self.op == 'create':
+            return {'op': 'create', 'column': self.column, 'index': self.index, 'item': self.card.to_dict(),
+                    'at': self.at}
+        if self.op == 'move':
+            return {'op': 'move', 'id': self.card.id, 'column': self.column, 'index': self.index, 'at': self.at}
+        if self.op == 'delete':
+            return {'op': 'delete', 'id': self.card.id, 'at': self.at}
+        return {'op': self.op, 'id': self.card.id, 'fields': self.fields}
+
+
+class BoardModel:
+    def __init__(self, data=None):
+        self.columns = {}
+        self.next_id = 1
+        self.next_seq = 0
+        self.meta = {}
+        self.transitions = TransitionLog()
+        self._cards = {}
+        self._where = {}
+        self._listeners = []
+        self._batch = None
+        if data is not None:
+            self.load(data, notify=False)
+
+    # Subscribers
+
+    def subscribe(self, listener):
+        """Call ``listener(change)`` after every mutation."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, change):
+        if self._batch is not None:
+            self._batch.append(change)
+            return
+        for listener in self._listeners:
+            listener(change)
+
+    @contextmanager
+    def batch(self):
+        """Notify the changes made inside the block as one 'batch' Change at the end.
+
+        Subscribers can then apply them all at once, e.g. one relayout per
+        column for a bulk move. A batch of a single change is notified as
+        that change. Batches nest; the outermost one notifies.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = changes = []
+        try:
+            yield
+        finally:
+            self._batch = None
+            if len(changes) == 1:
+                self._notify(changes[0])
+            elif changes:
+                self._notify(Change('batch', changes=changes))
+
+    # Whole-board conversion
+
+    def load(self, data, notify=True):
+        """Replace the board with the dict-format ``data``."""
+        migrate(data)
+        self.columns = {}
+        self._cards = {}
+        self._where = {}
+        seq = 0
+        for key, col in data['columns'].items():
+            column = Column(key, col.get('name', key), [Card.from_dict(item) for item in col.get('items', [])])
+            self.columns[key] = column
+            for card in column.cards:
+                card.seq = seq
+                seq += 1
+                self._cards[card.id] = card
+                self._where[card.id] = column
+        self.next_seq = seq
+        self.next_id = data['next_id']
+        self.transitions = TransitionLog(data.get('transitions', ()))
+        self.meta = {key: value for key, value in data.items() if key not in ('columns', 'next_id', 'transitions')}
+        if notify:
+            self._notify(Change('reset'))
+
+    def replace(self, other):
+        """Take over the state of ``other`` (e.g. a model built on a loader thread)."""
+        self.columns = other.columns
+        self._cards = other._cards
+        self._where = other._where
+        self.next_id = other.next_id
+        self.next_seq = other.next_seq
+        self.meta = other.meta
+        self.transitions = other.transitions
+        self._notify(Change('reset'))
+
+    def to_dict(self, lazy=False):
+        """The board in the dict format; see Card.to_dict for ``lazy``."""
+        data = dict(self.meta)
+        data['columns'] = {
+            key: {'name': column.name, 'items': [card.to_dict(lazy) for card in column.cards]}
+            for key, column in self.columns.items()
+        }
+        data['next_id'] = self.next_id
+        if self.transitions:
+            data['transitions'] = self.transitions.rows()
+        return data
+
+    # Lookups
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, card_id):
+        return card_id in self._where
+
+    def cards(self):
+        for column in self.columns.values():
+            yield from column.cards
+
+    def card(self, card_id):
+        return self._cards.get(card_id)
+
+    def column_of(self, card_id):
+        """Key of the column holding ``card_id``, or None."""
+        column = self._where.get(card_id)
+        return column.key if column is not None else None
+
+    def index_of(self, card_id):
+        # Cards compare by identity, so this is a C-level scan of one column.
+        return self._where[card_id].cards.index(self._cards[card_id])
+
+    # Ids
+
+    def allocate_id(self):
+        """A fresh card id; skips ids in use, in case the stored counter was behind."""
+        card_id = str(self.next_id)
+        while card_id in self._cards:
+            self.next_id += 1
+            card_id = str(self.next_id)
+        self.next_id += 1
+        return card_id
+
+    def reserve_id(self, card_id):
+        try:
+            value = int(card_id)
+        except (TypeError, ValueError):
+            return
+        if value >= self.next_id:
+            self.next_id = value + 1
+
+    def merge(self, other):
+        """Add the cards of dict-format board ``other``, and any columns it has that this one lacks.
+
+        Cards whose id is already used here get a new one. Notifies a reset;
+        returns {old id: new id} for every renamed card.
+        """
+        renamed = {}
+        for key, col in other['columns'].items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = Column(key, col.get('name', key))
+            for item in col['items']:
+                card = Card.from_dict(item)
+                if card.id in self._cards:
+                    renamed[card.id] = card.id = self.allocate_id()
+                else:
+                    self.reserve_id(card.id)
+                card.seq = self.next_seq
+                self.next_seq += 1
+                column.cards.append(card)
+                self._cards[card.id] = card
+                self._where[card.id] = column
+        for card_id, source, target, at in other.get('transitions', ()):
+            self.transitions.append(renamed.get(card_id, card_id), source, target, at)
+        self._notify(Change('reset'))
+        return renamed
+
+    # Mutations
+
+    def add_card(self, column_key, fields, index=None, card_id=None, at=None):
+        """Create a card from ``fields`` in ``column_key``; returns the new Card.
+
+        ``at`` is the time to log the creation at (now if None); moves and
+        deletes take it too, for replaying a journal. Raises ValueError if
+        ``card_id`` is already on the board.
+        """
+        if card_id is None:
+            card_id = self.allocate_id()
+        elif card_id in self._where:
+            raise ValueError(f"card {card_id} already exists")
+        else:
+            self.reserve_id(card_id)
+        card = Card.from_dict(dict(fields, id=card_id))
+        card.seq = self.next_seq
+        self.next_seq += 1
+        column = self.columns[column_key]
+        index = len(column.cards) if index is None else max(0, min(index, len(column.cards)))
+        column.cards.insert(index, card)
+        self._cards[card_id] = card
+        self._where[card_id] = column
+        at = time.time() if at is None else at
+        self.transitions.append(card_id, None, column_key, at)
+        self._notify(Change('create', card, column_key, index, at=at))
+        return card
+
+    def update_card(self, card_id, fields, op='edit'):
+        """Set ``fields`` on a card. ``op`` names the journal record ('edit', 'tag' or 'priority')."""
+        card = self.card(card_id)
+        if card is None:
+            return None
+        previous = {key: getattr(card, key) for key in fields}
+        for key, value in fields.items():
+            if key == 'checklist':
+                value = checklist_from_dicts(value)
+            setattr(card, key, value)
+        record = dict(fields)
+        if 'checklist' in record:
+            record['checklist'] = checklist_to_dicts(card.checklist)
+        self._notify(Change(op, card, self._where[card_id].key, fields=record, previous=previous))
+        return card
+
+    def move_card(self, card_id, column_key, index=None, at=None):
+        """Move a card to ``index`` of ``column_key`` (the end if None).
+
+        ``index`` counts positions after the card has been taken out, so
+        moving within a column is the same as moving between columns.
+        """
+        source = self._where[card_id]
+        source_index = self.index_of(card_id)
+        target = self.columns[column_key]
+        if index is None:
+            index = len(target.cards) - (target is source)
+        if target is source and index == source_index:
+            return False
+        card = source.cards.pop(source_index)
+        index = max(0, min(index, len(target.cards)))
+        target.cards.insert(index, card)
+        self._where[card_id] = target
+        if target is not source:
+            at = time.time() if at is None else at
+            self.transitions.append(card_id, source.key, column_key, at)
+        self._notify(Change('move', card, column_key, index, source.key, source_index, at=at))
+        return True
+
+    def delete_card(self, card_id, at=None):
+        column = self._where.pop(card_id, None)
+        if column is None:
+            return None
+        card = self._cards.pop(card_id)
+        index = column.cards.index(card)
+        del column.cards[index]
+        at = time.time() if at is None else at
+        self.transitions.append(card_id, column.key, None, at)
+        self._notify(Change('delete', card, column.key, index, at=at))
+        return card
+
+    # Bulk mutations, each notified as one batch
+
+    def update_cards(self, card_ids, fields, op='edit'):
+        """Set ``fields`` on every card in ``card_ids`` that doesn't have them already."""
+        with self.batch():
+            for card_id in card_ids:
+                card = self.card(card_id)
+                if card is not None and any(getattr(card, key) != value for key, value in fields.items()):
+                    self.update_card(card_id, fields, op)
+
+    def move_cards(self, card_ids, column_key, before=None):
+        """Move cards, in order, to just before card ``before`` of ``column_key`` (the end if None).
+
+        ``before`` must not be one of ``card_ids``.
+        """
+        with self.batch():
+            for card_id in card_ids:
+                if card_id not in self._where:
+                    continue
+                index = None
+                if before is not None:
+                    index = self.index_of(before)
+                    if self._where[card_id] is self._where[before] and self.index_of(card_id) < index:
+                        index -= 1
+                self.move_card(card_id, column_key, index)
+
+    def delete_cards(self, card_ids):
+        with self.batch():
+            for card_id in card_ids:
+                self.delete_card(card_id)
+
+    def apply(self, record):
+        """Replay one journal record through the mutation methods."""
+        op = record['op']
+        if op == 'create':
+            item = record['item']
+            self.add_card(record['column'], item, record.get('index'), card_id=item['id'], at=record.get('at'))
+        elif op == 'move':
+            if record['id'] in self._where:
+                self.move_card(record['id'], record['column'], record.get('index'), at=record.get('at'))
+        elif op in ('edit', 'tag', 'priority'):
+            self.update_card(record['id'], record['fields'], op)
+        elif op == 'delete':
+            self.delete_card(record['id'], at=record.get('at'))
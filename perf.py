@@ -0,0 +1,194 @@
+# perf.py
+#
+# Opt-in instrumentation of the board's hot paths. Enabling the profiler
+# wraps the methods listed in hot_paths() with timers; disabling it puts the
+# original functions back, so when it is off there is no overhead at all.
+# Collected spans can be shown in PerfOverlay or exported as a Chrome trace
+# (chrome://tracing, Perfetto).
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import QLabel
+
+MAX_EVENTS = 100000
+
+
+def hot_paths():
+    """(owner, attribute, label) for every timed call site."""
+    import autosave
+    import board
+    import card
+    import column
+    import sqlite_store
+    return [
+        (board.KanbanBoard, 'refresh_board', 'refresh_board'),
+        (board.KanbanBoard, 'setStyleSheet', 'setStyleSheet'),
+        (column.KanbanColumn, 'setStyleSheet', 'setStyleSheet'),
+        (card.KanbanCard, 'setStyleSheet', 'setStyleSheet'),
+        (column.KanbanColumn, 'load_cards', 'load_cards'),
+        (column.KanbanColumn, 'dropEvent', 'dropEvent'),
+        (column.KanbanColumn, 'get_drop_index', 'get_drop_index'),
+        (card.KanbanCard, 'update_card_text', 'update_card_text'),
+        (board, 'read_board_file', 'load'),
+        (autosave, 'write_snapshot', 'save.snapshot'),
+        (autosave, 'append_records', 'save.append'),
+        (sqlite_store.SqliteStore, 'replace_board', 'save.sqlite_snapshot'),
+        (sqlite_store.SqliteStore, 'apply_records', 'save.sqlite_records'),
+    ]
+
+
+def counted_widgets():
+    """Widget classes whose creation and destruction are counted."""
+    import card
+    import column
+    return [card.KanbanCard, column.KanbanColumn]
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.counters = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._originals = []
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+
+    def enable(self):
+        if self.enabled:
+            return
+        for owner, attr, label in hot_paths():
+            self._patch(owner, attr, self._timed(getattr(owner, attr), label))
+        for cls in counted_widgets():
+            self._patch(cls, '__init__', self._counted(cls.__init__, cls.__name__))
+        self.enabled = True
+
+    def disable(self):
+        for owner, attr, original in reversed(self._originals):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+        self._originals = []
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.counters.clear()
+            self.events.clear()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, label, start, end):
+        duration = end - start
+        with self._lock:
+            stat = self.stats.get(label)
+            if stat is None:
+                stat = self.stats[label] = {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'last_s': 0.0}
+            stat['calls'] += 1
+            stat['total_s'] += duration
+            stat['last_s'] = duration
+            if duration > stat['max_s']:
+                stat['max_s'] = duration
+            self.events.append((label, start, duration, threading.get_ident()))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'stats': {label: dict(stat) for label, stat in self.stats.items()},
+                'counters': dict(self.counters),
+            }
+
+    def export_trace(self, filename):
+        """Write the recorded spans in Chrome trace event format."""
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        pid = os.getpid()
+        trace = [
+            {'name': label, 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': (start - self._epoch) * 1e6, 'dur': duration * 1e6}
+            for label, start, duration, tid in events
+        ]
+        trace.append({'name': 'widgets', 'ph': 'C', 'pid': pid, 'tid': 0,
+                      'ts': (time.perf_counter() - self._epoch) * 1e6, 'args': counters})
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+    def _patch(self, owner, attr, replacement):
+        self._originals.append((owner, attr, vars(owner).get(attr)))
+        setattr(owner, attr, replacement)
+
+    def _timed(self, fn, label):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(label, start, time.perf_counter())
+        return wrapper
+
+    def _counted(self, init, name):
+        profiler = self
+
+        @functools.wraps(init)
+        def wrapper(widget, *args, **kwargs):
+            init(widget, *args, **kwargs)
+            profiler.count(f"{name} created")
+            widget.destroyed.connect(lambda *_: profiler.count(f"{name} destroyed"))
+        return wrapper
+
+
+profiler = Profiler()
+
+
+class PerfOverlay(QLabel):
+    """Live table of the profiler's timings, floating over the board."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setObjectName("perfOverlay")
+        self.setFont(QFont("monospace", 9))
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.update_stats)
+        self.hide()
+
+    def set_active(self, active):
+        if active:
+            profiler.enable()
+            self.update_stats()
+            self.show()
+            self.raise_()
+            self.timer.start()
+        else:
+            self.timer.stop()
+            self.hide()
+            profiler.disable()
+
+    def update_stats(self):
+        snap = profiler.snapshot()
+        lines = [f"{'':22}{'calls':>7}{'avg ms':>9}{'max ms':>9}{'last ms':>9}"]
+        for label, stat in sorted(snap['stats'].items()):
+            avg = stat['total_s'] / stat['calls'] * 1000.0
+            lines.append(f"{label:22}{stat['calls']:7d}{avg:9.2f}{stat['max_s'] * 1000.0:9.2f}"
+                         f"{stat['last_s'] * 1000.0:9.2f}")
+        for name, value in sorted(snap['counters'].items()):
+            lines.append(f"{name:22}{value:7d}")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - 24, 40)
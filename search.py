@@ -0,0 +1,299 @@
+# search.py
+#
+# Inverted index over the cards of a BoardModel, kept in sync through the
+# model's change notifications. Queries are whitespace-separated terms that
+# must all match (AND); every term is a prefix match so results narrow as you
+# type. Tags and priorities are also indexed as "tag:<tag>" and
+# "priority:<level>", so "tag:bug priority:h" works as a filter.
+#
+# Postings are keyed by the cards' dense ``seq`` numbers. A token's posting
+# is a set of seqs while it is rare and a bitmask int once it covers more
+# than 1/DENSE of the board, so the unions and intersections behind a query
+# on common words run in C, and the result is a flag byte per card that
+# columns can check without hashing.
+#
+# Cards of a binary board whose body is still on disk (see model.Card) are
+# indexed by title, tag and priority only, so opening or indexing a board
+# reads no bodies. The first query with a word that could be in a body reads
+# the bodies still missing from the index; bodies read in the meantime, e.g.
+# by expanding or editing a card, cost nothing then.
+
+import re
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r"\w+")
+DENSE = 64
+_FLAG_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def card_tokens(card, read=False):
+    """The card's tokens; a body still on disk is only read with ``read``."""
+    description, checklist = card.peek_body() if read or card.body_loaded else ('', ())
+    text = " ".join([card.title, description] + [entry.text for entry in checklist])
+    tokens = set(TOKEN_RE.findall(text.lower()))
+    if card.tag:
+        tag = card.tag.lower()
+        tokens.add(tag)
+        tokens.add("tag:" + tag)
+    priority = card.priority.lower()
+    tokens.add(priority)
+    tokens.add("priority:" + priority)
+    return tokens
+
+
+def query_terms(text):
+    terms = []
+    for word in text.lower().split():
+        field, sep, value = word.partition(":")
+        if sep and field in ("tag", "priority"):
+            if value:
+                terms.append(f"{field}:{value}")
+        else:
+            terms.extend(TOKEN_RE.findall(word))
+    return terms
+
+
+def body_terms(terms):
+    """Whether any of ``terms`` could match a word in a card's description or checklist."""
+    return any(not term.startswith(("tag:", "priority:")) for term in terms)
+
+
+def refines(old_terms, new_terms):
+    """Whether every card matching ``new_terms`` also matches ``old_terms``."""
+    return all(any(new.startswith(old) for new in new_terms) for old in old_terms)
+
+
+def mask_of(seqs):
+    bits = bytearray((max(seqs, default=0) >> 3) + 1)
+    for seq in seqs:
+        bits[seq >> 3] |= 1 << (seq & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class SearchResult:
+    """The cards matching a query, as one flag byte per card ``seq``.
+
+    ``narrows`` is the previous result when this one can only be a subset of
+    it (the query was extended), so a caller can rescan just those cards.
+    """
+
+    def __init__(self, terms, mask, size, narrows=None):
+        flags = bin(mask)[:1:-1].encode('ascii').translate(_FLAG_BYTES)
+        self.terms = terms
+        self.flags = bytearray(flags) + bytes(max(size - len(flags), 0))
+        self.narrows = narrows
+
+    def __contains__(self, card):
+        return card.seq < len(self.flags) and self.flags[card.seq] == 1
+
+    def __len__(self):
+        return self.flags.count(1)
+
+    def update(self, card, matched):
+        missing = card.seq + 1 - len(self.flags)
+        if missing > 0:
+            self.flags.extend(bytes(missing))
+        self.flags[card.seq] = matched
+
+    def positions(self, cards, within=None):
+        """Indices of the matching cards in ``cards``, looking only at ``within`` if given."""
+        flags = self.flags
+        if within is None:
+            return [i for i, card in enumerate(cards) if flags[card.seq]]
+        return [i for i in within if flags[cards[i].seq]]
+
+
+class SearchIndex:
+    def __init__(self, model, subscribe=True):
+        self.model = model
+        self.clear()
+        if subscribe:
+            model.subscribe(self.on_change)
+
+    def clear(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.tokens = {}
+        # {seq: card} for cards indexed without the body they have on disk.
+        self.unread = {}
+        self._terms = {}
+        self.stale = True
+        self.changes = 0
+
+    def on_change(self, change):
+        if change.op == 'reset':
+            # Rebuilt on the next query (or adopted from a loader thread), so
+            # loading a board doesn't pay for it.
+            self.clear()
+            return
+        if change.op == 'batch':
+            for sub in change.changes:
+                self.on_change(sub)
+            return
+        self.changes += 1
+        if self.stale or change.op == 'move':
+            return
+        self._remove(change.card)
+        if change.op != 'delete':
+            self._add(change.card)
+
+    def rebuild(self):
+        postings = {}
+        tokens = {}
+        unread = {}
+        for card in self.model.cards():
+            words = tokens[card.seq] = card_tokens(card)
+            if not card.body_loaded:
+                unread[card.seq] = card
+            for token in words:
+                seqs = postings.get(token)
+                if seqs is None:
+                    postings[token] = [card.seq]
+                else:
+                    seqs.append(card.seq)
+        size = self.model.next_seq
+        for token, seqs in postings.items():
+            postings[token] = mask_of(seqs) if len(seqs) * DENSE > size else set(seqs)
+        self.postings = postings
+        self.tokens = tokens
+        self.unread = unread
+        self.vocabulary = sorted(postings)
+        self._terms = {}
+        self.stale = False
+
+    def adopt(self, other):
+        """Take over ``other``, built off-thread over the model this one was reset to.
+
+        Returns False (and keeps rebuilding lazily) if the board has been
+        reset or changed since.
+        """
+        if not self.stale or self.changes or other.model.columns is not self.model.columns:
+            return False
+        self.postings = other.postings
+        self.tokens = other.tokens
+        self.unread = other.unread
+        self.vocabulary = other.vocabulary
+        self._terms = {}
+        self.stale = False
+        return True
+
+    def query(self, text, previous=None):
+        """The SearchResult for ``text``, or None for an empty query (no filter).
+
+        ``previous`` is the result shown before; it becomes the new result's
+        ``narrows`` when ``text`` only extends its query.
+        """
+        terms = query_terms(text)
+        if not terms:
+            return None
+        if self.stale:
+            self.rebuild()
+        if self.unread and body_terms(terms):
+            self.read_bodies()
+        mask = -1
+        for term in set(terms):
+            mask &= self._term_mask(term)
+            if not mask:
+                break
+        if previous is not None and not refines(previous.terms, terms):
+            previous = None
+        return SearchResult(terms, mask, self.model.next_seq, previous)
+
+    def matches(self, card, text):
+        """Whether ``card`` matches ``text``, without running a full query."""
+        if self.stale:
+            self.rebuild()
+        terms = query_terms(text)
+        if card.seq in self.unread and body_terms(terms):
+            self._remove(card)
+            self._add(card, read=True)
+        tokens = self.tokens.get(card.seq, ())
+        return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+    def read_bodies(self):
+        """Add the description and checklist words of the cards indexed without them."""
+        added = {}
+        tokens = self.tokens
+        for seq, card in self.unread.items():
+            words = card_tokens(card, read=True)
+            new = words - tokens[seq]
+            tokens[seq] = words
+            for token in new:
+                seqs = added.get(token)
+                if seqs is None:
+                    added[token] = [seq]
+                else:
+                    seqs.append(seq)
+        self.unread = {}
+        size = self.model.next_seq
+        postings = self.postings
+        fresh = False
+        for token, seqs in added.items():
+            posting = postings.get(token)
+            if posting is None:
+                fresh = True
+                postings[token] = mask_of(seqs) if len(seqs) * DENSE > size else set(seqs)
+            elif isinstance(posting, int):
+                postings[token] = posting | mask_of(seqs)
+            else:
+                posting.update(seqs)
+                if len(posting) * DENSE > size:
+                    postings[token] = mask_of(posting)
+        if fresh:
+            self.vocabulary = sorted(postings)
+        self._terms = {}
+
+    def _term_mask(self, term):
+        mask = self._terms.get(term)
+        if mask is None:
+            vocabulary = self.vocabulary
+            i = bisect_left(vocabulary, term)
+            mask = 0
+            sparse = []
+            while i < len(vocabulary) and vocabulary[i].startswith(term):
+                posting = self.postings[vocabulary[i]]
+                if isinstance(posting, int):
+                    mask |= posting
+                else:
+                    sparse.extend(posting)
+                i += 1
+            if sparse:
+                mask |= mask_of(sparse)
+            self._terms[term] = mask
+        return mask
+
+    def _add(self, card, read=False):
+        seq = card.seq
+        words = self.tokens[seq] = card_tokens(card, read)
+        if not (read or card.body_loaded):
+            self.unread[seq] = card
+        for token in words:
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = {seq}
+                insort(self.vocabulary, token)
+            elif isinstance(posting, int):
+                self.postings[token] = posting | (1 << seq)
+            else:
+                posting.add(seq)
+                if len(posting) * DENSE > self.model.next_seq:
+                    self.postings[token] = mask_of(posting)
+        self._terms.clear()
+
+    def _remove(self, card):
+        seq = card.seq
+        self.unread.pop(seq, None)
+        for token in self.tokens.pop(seq, ()):
+            posting = self.postings[token]
+            if isinstance(posting, int):
+                posting &= ~(1 << seq)
+                if posting:
+                    self.postings[token] = posting
+                    continue
+            else:
+                posting.discard(seq)
+                if posting:
+                    continue
+            del self.postings[token]
+            del self.vocabulary[bisect_left(self.vocabulary, token)]
+        self._terms.clear()
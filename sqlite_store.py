@@ -0,0 +1,302 @@
+# sqlite_store.py
+#
+# SQLite storage for boards. It speaks the same board data contract as the
+# JSON files ({'columns': {key: {'name', 'items'}}, 'next_id', ...}) and the
+# same change records as journal.py, so a single card edit is a single row
+# write. Cards keep a REAL ``position`` so inserting between two cards never
+# renumbers a column. Card keys this schema has no column for (such as
+# bulk.py's ``source_id``) are kept as a JSON object in ``extra``.
+
+import json
+import sqlite3
+
+from binary_store import ITEM_KEYS
+from fileio import atomic_write_json
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS columns (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT PRIMARY KEY,
+    column_key TEXT NOT NULL REFERENCES columns(key),
+    position REAL NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    tag TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL DEFAULT 'Low',
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS checklist_items (
+    card_id TEXT NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (card_id, position)
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    card_id TEXT NOT NULL,
+    source TEXT,
+    target TEXT,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_column_position ON cards(column_key, position);
+CREATE INDEX IF NOT EXISTS cards_tag ON cards(tag);
+CREATE INDEX IF NOT EXISTS cards_priority ON cards(priority);
+"""
+
+CARD_FIELDS = ('title', 'description', 'tag', 'priority')
+# The card columns _item() reads, in order.
+ITEM_COLUMNS = "id, title, description, tag, priority, extra"
+
+
+def is_sqlite_path(filename):
+    return filename.lower().endswith(SQLITE_SUFFIXES)
+
+
+class SqliteStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        if 'extra' not in [row[1] for row in self.conn.execute("PRAGMA table_info(cards)")]:
+            # Stores created before extra keys were kept.
+            self.conn.execute("ALTER TABLE cards ADD COLUMN extra TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Whole-board import/export
+
+    def replace_board(self, data):
+        """Replace the stored board with ``data``."""
+        with self.conn:
+            self.conn.execute("DELETE FROM checklist_items")
+            self.conn.execute("DELETE FROM cards")
+            self.conn.execute("DELETE FROM columns")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.execute("DELETE FROM transitions")
+            for key, value in data.items():
+                if key not in ('columns', 'transitions'):
+                    self.conn.execute("INSERT INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+            self.conn.executemany("INSERT INTO transitions VALUES (?, ?, ?, ?)", data.get('transitions', ()))
+            for col_pos, (key, col) in enumerate(data['columns'].items()):
+                self.conn.execute("INSERT INTO columns VALUES (?, ?, ?)", (key, col['name'], col_pos))
+                for position, item in enumerate(col['items']):
+                    self._insert_card(key, float(position), item)
+
+    def load(self):
+        """Return the whole board as a dict in the JSON board format."""
+        data = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+        checklists = {}
+        for card_id, text, done in self.conn.execute(
+                "SELECT card_id, text, done FROM checklist_items ORDER BY card_id, position"):
+            checklists.setdefault(card_id, []).append({'text': text, 'done': bool(done)})
+        data['columns'] = {}
+        for key, name in self.conn.execute("SELECT key, name FROM columns ORDER BY position"):
+            data['columns'][key] = {'name': name, 'items': []}
+        for row in self.conn.execute(
+                f"SELECT column_key, {ITEM_COLUMNS} FROM cards ORDER BY column_key, position"):
+            data['columns'][row[0]]['items'].append(self._item(row[1:], checklists.get(row[1], [])))
+        transitions = [list(row) for row in self.conn.execute(
+            "SELECT card_id, source, target, at FROM transitions ORDER BY rowid")]
+        if transitions:
+            data['transitions'] = transitions
+        return data
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def max_numeric_id(self):
+        row = self.conn.execute("SELECT MAX(CAST(id AS INTEGER)) FROM cards WHERE id != '' AND id NOT GLOB '*[^0-9]*'").fetchone()
+        return row[0] or 0
+
+    def columns(self):
+        """(key, name) of every column, in board order."""
+        return self.conn.execute("SELECT key, name FROM columns ORDER BY position").fetchall()
+
+    def iter_cards(self):
+        """Yield (column_key, item) for every card in board order, one card in memory at a time."""
+        rows = self.conn.execute(
+            "SELECT c.column_key, c.id, c.title, c.description, c.tag, c.priority, c.extra, i.text, i.done "
+            "FROM cards c JOIN columns col ON col.key = c.column_key "
+            "LEFT JOIN checklist_items i ON i.card_id = c.id "
+            "ORDER BY col.position, c.position, i.position")
+        current = None
+        for row in rows:
+            if current is None or current[1]['id'] != row[1]:
+                if current is not None:
+                    yield current
+                current = (row[0], self._item(row[1:7], []))
+            if row[7] is not None:
+                current[1]['checklist'].append({'text': row[7], 'done': bool(row[8])})
+        if current is not None:
+            yield current
+
+    # Paged queries
+
+    def count_cards(self, column_key):
+        return self.conn.execute("SELECT COUNT(*) FROM cards WHERE column_key = ?", (column_key,)).fetchone()[0]
+
+    def cards_page(self, column_key, start, stop):
+        """Cards ``start``..``stop`` (exclusive) of a column, in board order."""
+        rows = self.conn.execute(
+            f"SELECT {ITEM_COLUMNS} FROM cards WHERE column_key = ? "
+            "ORDER BY position LIMIT ? OFFSET ?",
+            (column_key, max(stop - start, 0), start)).fetchall()
+        return [self._item(row, self._checklist(row[0])) for row in rows]
+
+    def cards_where(self, tag=None, priority=None):
+        clauses, args = [], []
+        if tag is not None:
+            clauses.append("tag = ?")
+            args.append(tag)
+        if priority is not None:
+            clauses.append("priority = ?")
+            args.append(priority)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT {ITEM_COLUMNS} FROM cards {where} ORDER BY column_key, position",
+            args).fetchall()
+        return [self._item(row, self._checklist(row[0])) for row in rows]
+
+    # Change records (see journal.py)
+
+    def apply_records(self, records):
+        with self.conn:
+            for record in records:
+                self.apply(record)
+
+    def apply(self, record):
+        op = record['op']
+        if op == 'create':
+            item = record['item']
+            position = self._position_at(record['column'], record.get('index'))
+            self._insert_card(record['column'], position, item)
+            self._bump_next_id(item['id'])
+            self._log(item['id'], None, record['column'], record.get('at'))
+        elif op == 'move':
+            row = self.conn.execute("SELECT column_key FROM cards WHERE id = ?", (record['id'],)).fetchone()
+            position = self._position_at(record['column'], record.get('index'), exclude=record['id'])
+            self.conn.execute("UPDATE cards SET column_key = ?, position = ? WHERE id = ?",
+                              (record['column'], position, record['id']))
+            if row is not None:
+                self._log(record['id'], row[0], record['column'], record.get('at'))
+        elif op in ('edit', 'tag', 'priority'):
+            fields = record['fields']
+            columns = [key for key in CARD_FIELDS if key in fields]
+            if columns:
+                self.conn.execute(
+                    f"UPDATE cards SET {', '.join(f'{key} = ?' for key in columns)} WHERE id = ?",
+                    [fields[key] for key in columns] + [record['id']])
+            if 'checklist' in fields:
+                self.conn.execute("DELETE FROM checklist_items WHERE card_id = ?", (record['id'],))
+                self._insert_checklist(record['id'], fields['checklist'])
+        elif op == 'delete':
+            row = self.conn.execute("SELECT column_key FROM cards WHERE id = ?", (record['id'],)).fetchone()
+            self.conn.execute("DELETE FROM cards WHERE id = ?", (record['id'],))
+            if row is not None:
+                self._log(record['id'], row[0], None, record.get('at'))
+
+    # Helpers
+
+    def _log(self, card_id, source, target, at):
+        if at is not None:
+            self.conn.execute("INSERT INTO transitions VALUES (?, ?, ?, ?)", (card_id, source, target, at))
+
+    def _item(self, row, checklist):
+        card_id, title, description, tag, priority, extra = row
+        item = {
+            'id': card_id,
+            'title': title,
+            'description': description,
+            'tag': tag,
+            'priority': priority,
+            'checklist': checklist,
+        }
+        if extra:
+            item.update(json.loads(extra))
+        return item
+
+    def _checklist(self, card_id):
+        return [{'text': text, 'done': bool(done)} for text, done in self.conn.execute(
+            "SELECT text, done FROM checklist_items WHERE card_id = ? ORDER BY position", (card_id,))]
+
+    def _insert_card(self, column_key, position, item):
+        extra = {key: value for key, value in item.items() if key not in ITEM_KEYS}
+        self.conn.execute(
+            "INSERT INTO cards (id, column_key, position, title, description, tag, priority, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (item['id'], column_key, position, item.get('title', ''), item.get('description', ''),
+             item.get('tag', '') or '', item.get('priority', 'Low') or 'Low',
+             json.dumps(extra) if extra else None))
+        self._insert_checklist(item['id'], item.get('checklist') or [])
+
+    def _insert_checklist(self, card_id, checklist):
+        self.conn.executemany(
+            "INSERT INTO checklist_items VALUES (?, ?, ?, ?)",
+            [(card_id, i, entry.get('text', ''), int(bool(entry.get('done')))) for i, entry in enumerate(checklist)])
+
+    def _position_at(self, column_key, index, exclude=None):
+        """A position that sorts a card at ``index`` of the column (end if None)."""
+        args = (column_key, exclude or '')
+        base = "SELECT position FROM cards WHERE column_key = ? AND id != ? ORDER BY position"
+        if index is None:
+            row = self.conn.execute(base + " DESC LIMIT 1", args).fetchone()
+            return row[0] + 1.0 if row else 0.0
+        neighbours = [r[0] for r in self.conn.execute(base + " LIMIT 2 OFFSET ?", args + (max(index - 1, 0),))]
+        if index == 0:
+            return neighbours[0] - 1.0 if neighbours else 0.0
+        if not neighbours:
+            return self._position_at(column_key, None, exclude)
+        if len(neighbours) == 1:
+            return neighbours[0] + 1.0
+        if neighbours[1] - neighbours[0] < 1e-6:
+            self._renumber(column_key)
+            return self._position_at(column_key, index, exclude)
+        return (neighbours[0] + neighbours[1]) / 2.0
+
+    def _renumber(self, column_key):
+        """Spread a column's positions out again after many in-between inserts."""
+        ids = [r[0] for r in self.conn.execute(
+            "SELECT id FROM cards WHERE column_key = ? ORDER BY position", (column_key,))]
+        self.conn.executemany("UPDATE cards SET position = ? WHERE id = ?",
+                              [(float(i), card_id) for i, card_id in enumerate(ids)])
+
+    def _bump_next_id(self, card_id):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        try:
+            value = int(card_id)
+        except (TypeError, ValueError):
+            return
+        if row is None or value >= json.loads(row[0]):
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('next_id', ?)", (json.dumps(value + 1),))
+
+
+def import_json(json_path, db_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with SqliteStore(db_path) as store:
+        store.replace_board(data)
+
+
+def export_json(db_path, json_path):
+    with SqliteStore(db_path) as store:
+        atomic_write_json(json_path, store.load())
@@ -0,0 +1,161 @@
+# sync_client.py
+#
+# Connects a KanbanBoard to a sync server (see sync_server.py). Local model
+# changes are gathered for a frame and sent as coalesced ops. Ops from the
+# other clients are applied as one model batch per read, so the columns only
+# reconcile the cards they touch; they are not added to this board's undo
+# history.
+#
+# The server's board replaces the one open here, so the board is untitled
+# from then on: it is only written to a file the user saves it as, never
+# autosaved over the file it was opened from.
+
+import json
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalSocket, QTcpSocket
+
+from sync_server import FRAME_MS, apply_ops, coalesce_ops, encode, parse_address
+
+
+class SyncClient(QObject):
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, board, frame_ms=FRAME_MS):
+        super().__init__(board)
+        self.board = board
+        self.socket = None
+        self.address = None
+        self.client_id = None
+        self.seq = 0
+        self.epoch = None
+        self.outbox = []
+        self.outbox_seq = 0
+        self.applying = False
+        self.received = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(frame_ms)
+        self.timer.timeout.connect(self.flush)
+        board.model.subscribe(self.on_change)
+
+    @property
+    def connected(self):
+        return self.client_id is not None
+
+    def connect_to(self, address):
+        """Connect to a server at a Unix socket path or host:port; the board becomes its board."""
+        self.stop()
+        host, port = parse_address(address)
+        if port is None:
+            socket = QLocalSocket(self)
+            socket.errorOccurred.connect(self.on_error)
+            socket.connectToServer(host)
+        else:
+            socket = QTcpSocket(self)
+            socket.errorOccurred.connect(self.on_error)
+            socket.connectToHost(host, port)
+        socket.readyRead.connect(self.on_ready_read)
+        socket.disconnected.connect(self.on_disconnected)
+        self.socket = socket
+        self.address = address
+        self.status_changed.emit(f"Connecting to {address}")
+
+    def stop(self):
+        self.timer.stop()
+        self.outbox = []
+        self.client_id = None
+        if self.socket is not None:
+            socket, self.socket = self.socket, None
+            socket.readyRead.disconnect()
+            socket.disconnected.disconnect()
+            socket.errorOccurred.disconnect()
+            socket.abort()
+            socket.deleteLater()
+
+    def shutdown(self):
+        """Send what is still gathered, then disconnect."""
+        self.flush()
+        if self.socket is not None and self.connected:
+            self.socket.waitForBytesWritten(1000)
+        self.stop()
+
+    def resync(self):
+        """Ask for the server's whole board again, e.g. after a conflicting edit."""
+        if self.connected:
+            self.flush()
+            self.socket.write(encode({'type': 'resync'}))
+
+    def on_change(self, change):
+        if self.applying or not self.connected:
+            return
+        if change.op == 'reset':
+            # Another board was opened or started here.
+            self.stop()
+            self.status_changed.emit("Sync stopped: the board was replaced")
+            return
+        changes = change.changes if change.op == 'batch' else (change,)
+        if not self.outbox:
+            self.outbox_seq = self.seq
+        self.outbox.extend(sub.record() for sub in changes)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if self.outbox and self.connected:
+            ops, self.outbox = coalesce_ops(self.outbox), []
+            self.socket.write(encode({'type': 'ops', 'seq': self.outbox_seq, 'epoch': self.epoch, 'ops': ops}))
+
+    def on_ready_read(self):
+        ops = []
+        while self.socket is not None and self.socket.canReadLine():
+            message = json.loads(bytes(self.socket.readLine()))
+            if message['type'] == 'snapshot':
+                self.apply_remote(ops)
+                ops = []
+                self.adopt(message)
+            else:
+                ops.extend(message['ops'])
+                self.seq = message['seq']
+        self.apply_remote(ops)
+
+    def adopt(self, message):
+        board = self.board
+        board.cancel_loading()
+        # The server has the board now; the file keeps what it had.
+        board.autosaver.flush()
+        board.watcher.stop()
+        board.journal.invalidate()
+        board.set_filename(None)
+        self.outbox = []
+        self.applying = True
+        try:
+            board.model.load(message['board'])
+        finally:
+            self.applying = False
+        self.client_id = message['client']
+        self.seq = message.get('seq', 0)
+        self.epoch = message.get('epoch')
+        self.status_changed.emit(f"Connected to {self.address}")
+
+    def apply_remote(self, ops):
+        if not ops:
+            return
+        self.applying = True
+        try:
+            with self.board.history.untracked():
+                apply_ops(self.board.model, ops)
+        finally:
+            self.applying = False
+        self.received += len(ops)
+
+    def on_disconnected(self):
+        was_connected = self.connected
+        self.stop()
+        if was_connected:
+            self.status_changed.emit(f"Disconnected from {self.address}")
+
+    def on_error(self, error):
+        if self.socket is not None:
+            self.status_changed.emit(f"Sync error: {self.socket.errorString()}")
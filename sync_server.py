@@ -0,0 +1,511 @@
+# sync_server.py
+#
+# Optional local sync service, so several people can edit one board at once.
+# A small asyncio server holds the board and talks newline-delimited JSON
+# over a Unix socket or TCP:
+#
+#   server -> client  {"type": "snapshot", "client": id, "seq": n, "epoch": e, "board": {...}}
+#                     {"type": "ops", "seq": n, "ops": [record, ...]}
+#   client -> server  {"type": "ops", "seq": n, "epoch": e, "ops": [record, ...]}
+#                     {"type": "resync"}
+#
+# Ops are journal records (see journal.py), so a change costs O(change) on
+# the wire just as it does on disk. The server applies them to its own model
+# in arrival order and broadcasts, once per frame, everything that arrived
+# during the frame to every other client; each sender's records are coalesced
+# first (see coalesce_ops). A client applies what it receives as one batch.
+#
+# Clients apply their own ops before the server has ordered them, so the
+# server settles disagreements:
+# - A client's ops carry the last frame ``seq`` it had applied when it made
+#   them. An op on a card that another client changed in a later frame came
+#   second on the server but first on its sender. The server echoes the
+#   card's fields and place back to that sender alone, after the other
+#   client's change, so every board ends up with the server's last write.
+# - An op the server can't apply (a card created twice, or moved after
+#   someone deleted it) gets its sender a new snapshot. Ops the sender made
+#   before adopting that snapshot still carry the old ``epoch`` and are
+#   dropped.
+# Cards moved concurrently past each other within one column can still end
+# up in a different order on some clients until the next resync.
+#
+# With a board file the server persists the ops to it the way the autosaver
+# does (journal appends, or row writes for SQLite), on a thread of its own so
+# the writes never hold up a frame. A write that fails is counted and the
+# next frame rewrites the whole board.
+#
+# HeadlessClient is a Qt-free client for tests and the benchmark; the board
+# uses sync_client.SyncClient.
+#
+#   python sync_server.py /tmp/kanban.sock --board team.json
+#   python sync_server.py 127.0.0.1:7070
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import COMPACT_BYTES, append_records, journal_path, load_board, write_snapshot
+from model import BoardModel, checklist_to_dicts, empty_board
+from sqlite_store import SqliteStore, is_sqlite_path
+
+FRAME_MS = 16
+DEFAULT_HOST = '127.0.0.1'
+# Longest message accepted: a snapshot of a big board is one line.
+LINE_LIMIT = 1 << 28
+# A client that has this much unsent output is dropped; it can reconnect.
+SLOW_CLIENT_BYTES = 64 << 20
+FIELD_OPS = ('edit', 'tag', 'priority')
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def parse_address(address):
+    """(host, port) for 'host:port' or ':port', (path, None) for a Unix socket path."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host or DEFAULT_HOST, int(port)
+    return address, None
+
+
+async def open_connection(address):
+    host, port = parse_address(address)
+    if port is None:
+        return await asyncio.open_unix_connection(host, limit=LINE_LIMIT)
+    return await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+
+def coalesce_ops(ops):
+    """Shorten one client's run of records without changing what they do.
+
+    Field updates of a card fold into its earlier update or into its
+    creation, updates of a card that is then deleted are dropped, and back
+    to back moves of a card within its column keep only the last. Moves
+    between columns are all kept, for the board's transitions.
+    """
+    out = []
+    fields_at = {}
+    for op in ops:
+        kind = op['op']
+        if kind in FIELD_OPS:
+            i = fields_at.get(op['id'])
+            if i is not None:
+                target = out[i]
+                if target['op'] == 'create':
+                    target['item'].update(op['fields'])
+                else:
+                    target['fields'].update(op['fields'])
+                    if target['op'] != kind:
+                        target['op'] = 'edit'
+                continue
+            op = dict(op, fields=dict(op['fields']))
+            fields_at[op['id']] = len(out)
+        elif kind == 'create':
+            op = dict(op, item=dict(op['item']))
+            fields_at[op['item']['id']] = len(out)
+        elif kind == 'delete':
+            i = fields_at.pop(op['id'], None)
+            if i is not None and out[i]['op'] in FIELD_OPS:
+                out[i] = None
+        elif kind == 'move' and op.get('at') is None and out and out[-1] is not None:
+            last = out[-1]
+            if last['op'] == 'move' and last['id'] == op['id'] and last.get('at') is None:
+                out[-1] = op
+                continue
+        out.append(op)
+    return [op for op in out if op is not None]
+
+
+def apply_ops(model, ops):
+    """Apply records from another client to ``model`` as one batch; returns how many applied.
+
+    Records that no longer fit the board (a card created twice, a column
+    that is gone) are skipped.
+    """
+    applied = 0
+    with model.batch():
+        for op in ops:
+            try:
+                model.apply(op)
+            except (KeyError, TypeError, ValueError):
+                continue
+            applied += 1
+    return applied
+
+
+def read_board(filename):
+    """(data, clean) for a board file of any format."""
+    if is_sqlite_path(filename):
+        with SqliteStore(filename) as store:
+            return store.load(), True
+    return load_board(filename)
+
+
+def write_records(filename, generation, records):
+    if is_sqlite_path(filename):
+        with SqliteStore(filename) as store:
+            store.apply_records(records)
+    else:
+        append_records(filename, generation, records)
+
+
+def write_board(filename, data):
+    if is_sqlite_path(filename):
+        with SqliteStore(filename) as store:
+            store.replace_board(data)
+    else:
+        write_snapshot(filename, data)
+
+
+class SyncServer:
+    """Holds a board, applies clients' ops to it and broadcasts them per frame."""
+
+    def __init__(self, data=None, filename=None, frame_ms=FRAME_MS):
+        self.filename = filename
+        clean = True
+        if data is None:
+            if filename is not None and os.path.exists(filename):
+                data, clean = read_board(filename)
+            else:
+                data, clean = empty_board(), False
+        self.model = BoardModel(data)
+        self.frame = frame_ms / 1000.0
+        self.clients = {}
+        self.next_client = 1
+        self.pending = []
+        self.flush_handle = None
+        self.server = None
+        self.seq = 0
+        # Snapshots sent to each client; see receive().
+        self.epochs = {}
+        # {card id: (frame seq, client)} of each card's last change.
+        self.touched = {}
+        # Board file writes, run in order on one thread; see save().
+        self.saver = ThreadPoolExecutor(max_workers=1) if filename is not None else None
+        self.saving = set()
+        # Set while the file lacks records: an unclean journal, or a failed write.
+        self.needs_snapshot = not clean
+        self.journal_bytes = 0
+        if filename is not None and clean:
+            try:
+                self.journal_bytes = os.path.getsize(journal_path(filename))
+            except OSError:
+                pass
+        self.counts = {'ops_in': 0, 'ops_out': 0, 'frames': 0, 'rejected': 0, 'stale': 0, 'echoed': 0,
+                       'dropped': 0, 'save_errors': 0}
+
+    async def start(self, address):
+        host, port = parse_address(address)
+        if port is None:
+            self.server = await asyncio.start_unix_server(self.handle, host, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        if self.filename is not None and self.needs_snapshot:
+            self.compact()
+        return self
+
+    @property
+    def address(self):
+        """Where clients connect, as accepted by parse_address (the real port if it was 0)."""
+        name = self.server.sockets[0].getsockname()
+        return name if isinstance(name, str) else f"{name[0]}:{name[1]}"
+
+    async def close(self):
+        self.flush()
+        for writer in list(self.clients.values()):
+            writer.close()
+        self.clients.clear()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.saving:
+            await asyncio.wait(self.saving)
+        if self.saver is not None:
+            self.saver.shutdown()
+
+    def stats(self):
+        return dict(self.counts, clients=len(self.clients), cards=len(self.model))
+
+    async def handle(self, reader, writer):
+        # Everything applied so far goes out first: the snapshot includes it.
+        self.flush()
+        client_id = self.next_client
+        self.next_client += 1
+        self.clients[client_id] = writer
+        writer.write(self.snapshot(client_id))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get('type') == 'ops':
+                    self.receive(client_id, message['ops'], message.get('seq'), message.get('epoch'))
+                elif message.get('type') == 'resync':
+                    self.resync(client_id)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Dropped connection, or a message we can't read: the client
+            # has to reconnect and start from a snapshot.
+            pass
+        finally:
+            if self.clients.get(client_id) is writer:
+                del self.clients[client_id]
+                self.epochs.pop(client_id, None)
+            writer.close()
+
+    def snapshot(self, client_id):
+        """The snapshot message for ``client_id``; flush() first, as it covers everything applied."""
+        epoch = self.epochs[client_id] = self.epochs.get(client_id, 0) + 1
+        return encode({'type': 'snapshot', 'client': client_id, 'seq': self.seq, 'epoch': epoch,
+                       'board': self.model.to_dict()})
+
+    def resync(self, client_id):
+        self.flush()
+        writer = self.clients.get(client_id)
+        if writer is not None:
+            writer.write(self.snapshot(client_id))
+
+    def receive(self, client_id, ops, seq=None, epoch=None):
+        """Apply a client's ops, made after it had applied frame ``seq`` of snapshot ``epoch``."""
+        if epoch is not None and epoch != self.epochs.get(client_id):
+            # Made on a board the client has since replaced with a snapshot.
+            self.counts['stale'] += len(ops)
+            return
+        seen = self.seq if seq is None else seq
+        frame = self.seq + 1
+        accepted = []
+        late = {}
+        rejected = False
+        for op in ops:
+            try:
+                card_id = op['item']['id'] if op['op'] == 'create' else op['id']
+                last = self.touched.get(card_id)
+                self.model.apply(op)
+            except (KeyError, TypeError, ValueError):
+                self.counts['rejected'] += 1
+                rejected = True
+                continue
+            accepted.append(op)
+            if last is not None and last[1] != client_id and last[0] > seen:
+                late.setdefault(card_id, set()).update(op.get('fields', ()))
+            self.touched[card_id] = (frame, client_id)
+        if accepted:
+            self.counts['ops_in'] += len(accepted)
+            self.queue(client_id, None, accepted)
+        echoes = [echo for card_id, fields in late.items() for echo in self.echo(card_id, fields)]
+        if echoes:
+            self.counts['echoed'] += len(echoes)
+            self.queue(None, client_id, echoes)
+        if rejected:
+            self.resync(client_id)
+
+    def echo(self, card_id, fields):
+        """Records that give a card back its ``fields`` and place on this server."""
+        card = self.model.card(card_id)
+        if card is None:
+            return []
+        records = [{'op': 'move', 'id': card_id, 'column': self.model.column_of(card_id),
+                    'index': self.model.index_of(card_id), 'at': None}]
+        if fields:
+            values = {key: getattr(card, key) for key in fields}
+            if 'checklist' in values:
+                values['checklist'] = checklist_to_dicts(values['checklist'])
+            records.append({'op': 'edit', 'id': card_id, 'fields': values})
+        return records
+
+    def queue(self, origin, target, ops):
+        """Add ``ops`` to the frame: from ``origin`` to everyone else, or to ``target`` alone."""
+        if self.pending and self.pending[-1][:2] == (origin, target):
+            self.pending[-1][2].extend(ops)
+        else:
+            self.pending.append((origin, target, ops))
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.frame, self.flush)
+
+    def flush(self):
+        """Send this frame's ops to every client but their sender, as one message each."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        self.seq += 1
+        self.counts['frames'] += 1
+        runs = []
+        records = []
+        for origin, target, ops in pending:
+            ops = coalesce_ops(ops)
+            if target is None:
+                records.extend(ops)
+            runs.append((origin, target,
+                         b','.join(json.dumps(op, separators=(',', ':')).encode('utf-8') for op in ops), len(ops)))
+        involved = {origin for origin, _, _, _ in runs} | {target for _, target, _, _ in runs}
+        messages = {}
+        for client_id, writer in list(self.clients.items()):
+            key = client_id if client_id in involved else None
+            if key not in messages:
+                parts = [(fragment, count) for origin, target, fragment, count in runs
+                         if (target is None and origin != key) or (target is not None and target == key)]
+                messages[key] = (b'{"type":"ops","seq":%d,"ops":[' % self.seq + b','.join(p for p, _ in parts)
+                                 + b']}\n', sum(c for _, c in parts)) if parts else None
+            if messages[key] is None:
+                continue
+            message, count = messages[key]
+            writer.write(message)
+            self.counts['ops_out'] += count
+            if writer.transport.get_write_buffer_size() > SLOW_CLIENT_BYTES:
+                self.counts['dropped'] += 1
+                del self.clients[client_id]
+                writer.close()
+        if self.filename is not None:
+            self.persist(records, sum(len(fragment) for _, target, fragment, _ in runs if target is None))
+
+    def persist(self, records, size):
+        if not is_sqlite_path(self.filename):
+            self.journal_bytes += size
+        if self.needs_snapshot or self.journal_bytes > COMPACT_BYTES:
+            self.compact()
+        else:
+            self.save(write_records, self.filename, self.model.meta.get('journal_generation', 0), records)
+
+    def compact(self):
+        """Write the board as a new snapshot, which drops its journal."""
+        meta = self.model.meta
+        meta['journal_generation'] = meta.get('journal_generation', 0) + 1
+        self.journal_bytes = 0
+        self.needs_snapshot = False
+        self.save(write_board, self.filename, self.model.to_dict())
+
+    def save(self, write, *args):
+        """Run ``write(*args)`` on the saver thread, after every write queued before it."""
+        future = asyncio.get_running_loop().run_in_executor(self.saver, write, *args)
+        self.saving.add(future)
+        future.add_done_callback(self.saved)
+
+    def saved(self, future):
+        self.saving.discard(future)
+        error = future.exception()
+        if error is not None:
+            self.counts['save_errors'] += 1
+            self.needs_snapshot = True
+            print(f"Saving {self.filename} failed: {error}", file=sys.stderr)
+
+
+class HeadlessClient:
+    """A sync client without Qt: a BoardModel kept in step with the server."""
+
+    def __init__(self, frame_ms=FRAME_MS):
+        self.frame = frame_ms / 1000.0
+        self.model = None
+        self.client_id = None
+        self.seq = 0
+        self.epoch = None
+        self.outbox = []
+        self.outbox_seq = 0
+        self.flush_handle = None
+        self.applying = False
+        self.reader = self.writer = None
+        self.task = None
+        self.received = 0
+        # Called with each list of ops received, after it is applied.
+        self.listeners = []
+
+    async def connect(self, address):
+        self.reader, self.writer = await open_connection(address)
+        self.adopt(json.loads(await self.reader.readline()))
+        self.task = asyncio.get_running_loop().create_task(self.receive())
+        return self
+
+    def adopt(self, message):
+        self.client_id = message['client']
+        self.seq = message.get('seq', 0)
+        self.epoch = message.get('epoch')
+        # Edits not sent yet were made on the board being replaced.
+        self.outbox = []
+        if self.model is not None:
+            self.model.unsubscribe(self.on_change)
+        self.model = BoardModel(message['board'])
+        self.model.subscribe(self.on_change)
+
+    def on_change(self, change):
+        if self.applying or change.op == 'reset':
+            return
+        changes = change.changes if change.op == 'batch' else (change,)
+        if not self.outbox:
+            self.outbox_seq = self.seq
+        self.outbox.extend(sub.record() for sub in changes)
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.frame, self.flush)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.outbox:
+            ops, self.outbox = coalesce_ops(self.outbox), []
+            self.writer.write(encode({'type': 'ops', 'seq': self.outbox_seq, 'epoch': self.epoch, 'ops': ops}))
+
+    def resync(self):
+        self.flush()
+        self.writer.write(encode({'type': 'resync'}))
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if message['type'] == 'snapshot':
+                self.adopt(message)
+                continue
+            ops = message['ops']
+            self.seq = message['seq']
+            self.applying = True
+            try:
+                apply_ops(self.model, ops)
+            finally:
+                self.applying = False
+            self.received += len(ops)
+            for listener in self.listeners:
+                listener(ops)
+
+    async def close(self):
+        self.flush()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        if self.task is not None:
+            self.task.cancel()
+
+
+async def serve(address, filename=None, frame_ms=FRAME_MS):
+    server = await SyncServer(filename=filename, frame_ms=frame_ms).start(address)
+    print(f"Serving {filename or 'a new board'} on {server.address}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kanban sync server")
+    parser.add_argument("address", help="Unix socket path, or host:port for TCP (port 0 picks one)")
+    parser.add_argument("--board", help="board file to serve and save to (a new board if missing)")
+    parser.add_argument("--frame-ms", type=int, default=FRAME_MS,
+                        help="how long to gather ops before broadcasting them")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.address, args.board, args.frame_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# conftest.py
+#
+# The modules live at the top of the repository, not in a package, so the
+# tests import them from there. Qt runs headless.
+
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+# test_bulk.py
+#
+# Bulk import keeps input ids as source_id on every kind of board.
+
+import io
+import json
+
+import pytest
+
+from bulk import import_records, iter_board
+
+
+@pytest.mark.parametrize("suffix", ["json", "kbb", "db"])
+def test_import_keeps_source_id(tmp_path, suffix):
+    board = str(tmp_path / f"board.{suffix}")
+    source = io.StringIO("\n".join(json.dumps(record) for record in [
+        {'id': 'EXT-1', 'title': 'From the tracker', 'column': 'todo'},
+        {'title': 'No id'},
+    ]))
+    assert import_records(source, 'jsonl', board, 'backlog') == (2, 0)
+    items = [item for _, item in iter_board(board)]
+    assert [item['title'] for item in items] == ['No id', 'From the tracker']
+    assert items[1]['source_id'] == 'EXT-1'
+    assert 'source_id' not in items[0]
+
+
+def test_sqlite_target_round_trips_source_id(tmp_path):
+    board = str(tmp_path / "board.db")
+    import_records(io.StringIO(json.dumps({'id': 42, 'title': 'Imported'})), 'jsonl', board, 'backlog')
+
+    from sqlite_store import SqliteStore
+    with SqliteStore(board) as store:
+        data = store.load()
+        store.replace_board(data)
+        reloaded = store.load()
+        page = store.cards_page('backlog', 0, 10)
+    item = reloaded['columns']['backlog']['items'][0]
+    assert item['source_id'] == '42' and item['id'] != '42'
+    assert page[0]['source_id'] == '42'
+
+
+@pytest.mark.parametrize("suffix", ["json", "kbb", "db"])
+def test_dry_run_does_not_create_the_board(tmp_path, suffix):
+    board = tmp_path / f"board.{suffix}"
+    source = io.StringIO(json.dumps({'title': 'Checked only'}))
+    assert import_records(source, 'jsonl', str(board), 'backlog', dry_run=True) == (1, 0)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("suffix", ["json", "db"])
+def test_import_stops_after_the_records_before_an_invalid_one(tmp_path, suffix):
+    board = str(tmp_path / f"board.{suffix}")
+    source = io.StringIO("\n".join(json.dumps(record) for record in [
+        {'title': 'First'},
+        {'title': 'Second', 'column': 'nowhere'},
+        {'title': 'Third'},
+    ]))
+    assert import_records(source, 'jsonl', board, 'backlog', log=io.StringIO()) == (1, 1)
+    assert [item['title'] for _, item in iter_board(board)] == ['First']
@@ -0,0 +1,55 @@
+# test_leaks.py
+#
+# Opening and closing boards must give back every widget and model object,
+# and a board reused for many loads must not keep growing (see
+# bench.leak_check, which runs the same cycles at larger sizes).
+
+import gc
+
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+import bench
+from board import KanbanBoard
+from model import BoardModel, Card
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def live_objects(app):
+    counts = bench.live_widgets(app)
+    objects = gc.get_objects()
+    counts['models'] = sum(1 for obj in objects if isinstance(obj, BoardModel))
+    counts['model cards'] = sum(1 for obj in objects if isinstance(obj, Card))
+    return counts
+
+
+def open_and_close(app, data):
+    board = KanbanBoard(data)
+    board.show()
+    app.processEvents()
+    card_id = board.model.columns['backlog'].cards[0].id
+    board.model.move_card(card_id, 'done', 0)
+    board.model.update_card(card_id, {'title': 'moved'})
+    board.undo()
+    board.set_theme('light')
+    board.close()
+    board.deleteLater()
+
+
+def test_closed_boards_are_released(app):
+    data = bench.generate_board(200)
+    # The first board warms up Qt's and the theme's caches.
+    open_and_close(app, bench.copy.deepcopy(data))
+    baseline = live_objects(app)
+    for _ in range(3):
+        open_and_close(app, bench.copy.deepcopy(data))
+    assert live_objects(app) == baseline
+
+
+def test_reloading_a_board_does_not_grow(app):
+    result = bench.leak_check(app, 200, 4)
+    assert result['grew'] == {}
@@ -0,0 +1,34 @@
+# test_loader.py
+#
+# A file that is not a readable board must fail the load with a message, not
+# take the loader thread (and the app) down with it.
+
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+from board import read_board_file
+from loader import BoardLoader
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.mark.parametrize("name, blob", [
+    ("board.db", b"not a database" * 100),
+    ("board.kbb", b"KBB" + bytes(200)),
+    ("board.json", b"[1, 2]"),
+    ("board.json", b"{\"columns\": {\"todo\": {\"items\": [7]}}}"),
+])
+def test_unreadable_files_fail_the_load(app, tmp_path, name, blob):
+    path = tmp_path / name
+    path.write_bytes(blob)
+    loader = BoardLoader(str(path), read_board_file)
+    loaded, failed = [], []
+    loader.loaded.connect(lambda model, clean: loaded.append(model))
+    loader.failed.connect(failed.append)
+    loader.start()
+    assert loader.wait(5000)
+    app.processEvents()
+    assert failed and not loaded
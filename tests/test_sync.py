@@ -0,0 +1,155 @@
+# test_sync.py
+#
+# A sync server and a few headless clients editing one board at once: after
+# the traffic settles every client must hold the server's board.
+
+import asyncio
+import os
+
+import bench
+import sync_server
+from journal import append_records, journal_path, write_snapshot
+from sync_server import HeadlessClient, SyncServer, read_board
+
+FRAME_MS = 5
+
+
+def columns(model):
+    return model.to_dict()['columns']
+
+
+async def start(clients, size=30):
+    server = await SyncServer(bench.generate_board(size), frame_ms=FRAME_MS).start('127.0.0.1:0')
+    connected = [await HeadlessClient(frame_ms=FRAME_MS).connect(server.address) for _ in range(clients)]
+    return server, connected
+
+
+async def settle(server, clients, timeout=5.0):
+    """Wait until every client has the server's board; False if that never happens."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        for client in clients:
+            client.flush()
+        await asyncio.sleep(FRAME_MS / 1000.0 * 4)
+        server.flush()
+        await asyncio.sleep(FRAME_MS / 1000.0 * 4)
+        expected = columns(server.model)
+        if all(columns(client.model) == expected for client in clients):
+            return True
+    return False
+
+
+async def close(server, clients):
+    for client in clients:
+        await client.close()
+    await server.close()
+
+
+def test_clients_converge_on_create_edit_move_delete():
+    async def scenario():
+        server, (a, b, c) = await start(3)
+        todo = [card.id for card in server.model.columns['todo'].cards]
+        created = a.model.add_card('todo', {'title': 'from a'})
+        a.model.update_card(created.id, {'tag': 'Bug'})
+        b.model.update_card(todo[0], {'title': 'renamed by b'})
+        b.model.move_card(todo[1], 'done', 0)
+        c.model.delete_card(todo[2])
+        c.model.move_card(todo[3], 'backlog')
+        assert await settle(server, (a, b, c))
+        assert server.model.card(created.id).tag == 'Bug'
+        assert server.model.card(todo[0]).title == 'renamed by b'
+        assert server.model.column_of(todo[1]) == 'done'
+        assert server.model.card(todo[2]) is None
+        await close(server, (a, b, c))
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_edits_of_one_card_converge():
+    async def scenario():
+        server, clients = await start(3)
+        card_id = server.model.columns['todo'].cards[0].id
+        # Every client edits and moves the same card before hearing from the others.
+        for i, client in enumerate(clients):
+            client.model.update_card(card_id, {'title': f"edit {i}"})
+            client.model.move_card(card_id, ['backlog', 'inprogress', 'done'][i], 0)
+        for client in clients:
+            client.flush()
+        assert await settle(server, clients)
+        assert server.counts['echoed']
+        # And again, with one client behind on a frame the others already applied.
+        clients[0].model.update_card(card_id, {'priority': 'High'})
+        clients[1].model.update_card(card_id, {'priority': 'Low', 'title': 'late'})
+        assert await settle(server, clients)
+        await close(server, clients)
+
+    asyncio.run(scenario())
+
+
+def test_rejected_ops_resync_their_sender():
+    async def scenario():
+        server, (a, b) = await start(2)
+        card_id = server.model.columns['todo'].cards[0].id
+        # Both pick the same next id for a new card, and b moves a card that
+        # a deletes; b's ops only reach the server after a's.
+        b.frame = 60.0
+        b.model.add_card('todo', {'title': 'b'})
+        b.model.move_card(card_id, 'done')
+        a.model.add_card('todo', {'title': 'a'})
+        a.model.delete_card(card_id)
+        a.flush()
+        while server.model.card(card_id) is not None:
+            await asyncio.sleep(0.001)
+        b.flush()
+        assert await settle(server, (a, b))
+        assert server.counts['rejected']
+        assert server.model.card(card_id) is None
+        await close(server, (a, b))
+
+    asyncio.run(scenario())
+
+
+def test_server_counts_the_journal_on_disk(tmp_path):
+    filename = str(tmp_path / "board.json")
+    data = bench.generate_board(10)
+    write_snapshot(filename, data)
+    card_id = data['columns']['todo']['items'][0]['id']
+    append_records(filename, data.get('journal_generation', 0),
+                   [{'op': 'edit', 'id': card_id, 'fields': {'title': 'edited'}}])
+
+    async def scenario():
+        server = SyncServer(filename=filename)
+        assert server.journal_bytes == os.path.getsize(journal_path(filename))
+
+    asyncio.run(scenario())
+
+
+def test_failed_saves_are_counted_and_rewritten(tmp_path, monkeypatch):
+    filename = str(tmp_path / "board.json")
+    write_snapshot(filename, bench.generate_board(30))
+    failures = []
+
+    def append_fails_once(*args):
+        if not failures:
+            failures.append(args)
+            raise OSError("disk full")
+        append_records(*args)
+
+    monkeypatch.setattr(sync_server, 'append_records', append_fails_once)
+
+    async def scenario():
+        server = await SyncServer(filename=filename, frame_ms=FRAME_MS).start('127.0.0.1:0')
+        client = await HeadlessClient(frame_ms=FRAME_MS).connect(server.address)
+        todo = [card.id for card in client.model.columns['todo'].cards]
+        client.model.update_card(todo[0], {'title': 'lost on disk'})
+        assert await settle(server, (client,))
+        while server.saving:
+            await asyncio.sleep(0.001)
+        assert server.counts['save_errors'] == 1
+        client.model.move_card(todo[1], 'done', 0)
+        assert await settle(server, (client,))
+        await close(server, (client,))
+        assert columns(sync_server.BoardModel(read_board(filename)[0])) == columns(server.model)
+
+    asyncio.run(scenario())
@@ -1,8 +1,54 @@
 # theme.py
 
+from functools import lru_cache
+
 from PyQt6.QtGui import QPalette, QColor
 from PyQt6.QtCore import Qt
 
+TAG_COLORS = {'Bug': '#e74c3c', 'Feature': '#2980b9', 'Urgent': '#f39c12'}
+PRIORITY_COLORS = {'Low': '#27ae60', 'Med': '#f39c12', 'High': '#e74c3c'}
+
+# Colors used by the board stylesheet, per theme.
+THEMES = {
+    'light': {
+        'board_bg': '#f5f5f5',
+        'column_bg': '#f5f5f5',
+        'column_border': 'none',
+        'header_fg': '#222222',
+        'card_bg': '#f5f5f5',
+        'card_fg': '#222222',
+        'card_hover': '#333333',
+        'highlight': '#00aaff',
+        'fg': '#222222',
+    },
+    'dark': {
+        'board_bg': '#121212',
+        'column_bg': '#1c1c1c',
+        'column_border': '1px solid #333',
+        'header_fg': '#00aaff',
+        'card_bg': '#1e1e1e',
+        'card_fg': '#d6d6d6',
+        'card_hover': '#333333',
+        'highlight': '#00aaff',
+        'fg': '#ffffff',
+    },
+    'msu': {
+        'board_bg': '#18453B',
+        'column_bg': '#ffffff',
+        'column_border': '1px solid #ccc',
+        'header_fg': '#18453B',
+        'card_bg': '#ffffff',
+        'card_fg': '#18453B',
+        'card_hover': '#eeeeee',
+        'highlight': '#18453B',
+        'fg': '#ffffff',
+    },
+}
+
+
+def theme_colors(theme):
+    return THEMES.get(theme, THEMES['dark'])
+
 
 def apply_dark_palette() -> QPalette:
     palette = QPalette()
@@ -54,3 +100,96 @@ def apply_global_dark_stylesheet(app):
             color: #ffffff;
         }
     """)
+
+
+@lru_cache(maxsize=None)
+def board_stylesheet(theme):
+    """Build the one stylesheet a KanbanBoard needs for ``theme``.
+
+    Cards are styled through their ``priority`` dynamic property, so changing a
+    card only needs a re-polish of that card and switching themes is a single
+    setStyleSheet call on the board.
+    """
+    c = theme_colors(theme)
+    padding = '0px' if theme == 'light' else '8px'
+    priority_rules = ''.join(
+        f'KanbanCard[priority="{level}"] {{ border-left-color: {color}; }}\n'
+        for level, color in PRIORITY_COLORS.items()
+    )
+    return f"""
+        KanbanBoard, KanbanBoard > QMenuBar {{
+            background-color: {c['board_bg']};
+        }}
+        QFrame#separator {{
+            color: #ffffff;
+            background-color: #ffffff;
+        }}
+        KanbanColumn {{
+            background-color: {c['column_bg']};
+            border-radius: 15px;
+        }}
+        KanbanColumn QScrollArea, KanbanColumn QScrollArea > QWidget, KanbanColumn QListView {{
+            background-color: {c['column_bg']};
+            border: none;
+        }}
+        KanbanColumn QScrollBar {{
+            background-color: {c['column_bg']};
+        }}
+        QScrollArea#boardScroll, QWidget#columnsArea {{
+            background-color: {c['board_bg']};
+            border: none;
+        }}
+        QLabel#columnPlaceholder {{
+            background-color: {c['column_bg']};
+            color: #888888;
+            padding-top: 12px;
+        }}
+        QLabel#columnHeader, QWidget#scrollContent {{
+            background-color: {c['column_bg']};
+            border: {c['column_border']};
+            border-radius: 15px;
+            padding: {padding};
+        }}
+        QLabel#columnHeader {{
+            color: {c['header_fg']};
+            font-weight: bold;
+        }}
+        KanbanCard {{
+            background-color: {c['card_bg']};
+            color: {c['card_fg']};
+            border-radius: 10px;
+            padding: 12px;
+            border: {c['column_border']};
+            border-left: 10px solid #888888;
+        }}
+        {priority_rules}
+        KanbanCard:hover {{
+            background-color: {c['card_hover']};
+        }}
+        QLineEdit#searchBar {{
+            background-color: {c['column_bg']};
+            color: {c['card_fg']};
+            border: 1px solid {c['highlight']};
+            border-radius: 8px;
+            padding: 4px 8px;
+            margin: 8px 20px 0px 20px;
+        }}
+        QLabel#perfOverlay {{
+            background-color: rgba(0, 0, 0, 190);
+            color: #e0e0e0;
+            border-radius: 6px;
+            padding: 8px;
+        }}
+    """
+
+
+def board_palette(palette, theme):
+    """Return a copy of ``palette`` with the text and highlight roles for ``theme``."""
+    palette = QPalette(palette)
+    c = theme_colors(theme)
+    fg = QColor(c['fg'])
+    palette.setColor(QPalette.ColorRole.WindowText, fg)
+    palette.setColor(QPalette.ColorRole.ButtonText, fg)
+    palette.setColor(QPalette.ColorRole.Highlight, QColor(c['highlight']))
+    palette.setColor(QPalette.ColorRole.HighlightedText, QColor("#ffffff"))
+    return palette
@@ -0,0 +1,359 @@
+# watch.py
+#
+# Live reload of a board file that is changed by someone else: a script, or
+# another instance on a shared disk. BoardWatcher watches the open board
+# file (and its journal), waits for a burst of writes to settle, reads the
+# file on a worker thread and applies only the difference to the model, as
+# one batch of ordinary card changes matched by id, so the columns reconcile
+# the cards that changed and keep every other widget.
+#
+# The board's own saves are told apart by the file's size and mtime after
+# each save. For every card edited here since the last save the watcher
+# keeps the card as the file had it (its base), so a reload is a three-way
+# merge: a card the file left as it was keeps its local edits, and only a
+# card changed both here and on disk is a conflict, where the user picks
+# which version wins.
+
+import os
+
+from PyQt6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+from PyQt6.QtWidgets import QMessageBox
+
+from journal import journal_path
+from loader import READ_ERRORS
+from model import Card, checklist_to_dicts
+
+RELOAD_DELAY_MS = 300
+
+
+def file_signature(filename):
+    """(size, mtime) of the board file and its journal, None for a missing file."""
+    signature = []
+    for path in (filename, journal_path(filename)):
+        try:
+            st = os.stat(path)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def card_diff(card, item):
+    """Fields of dict-format ``item`` that differ from ``card``, for BoardModel.update_card."""
+    new = Card.from_dict(item)
+    fields = {}
+    for key in ('title', 'tag', 'priority'):
+        if getattr(new, key) != getattr(card, key):
+            fields[key] = getattr(new, key)
+    if card.body is not None and new.body is not None and card._description is None \
+            and card._checklist is None and card.body.raw() == new.body.raw():
+        # Both bodies still on disk (binary boards) and byte for byte equal.
+        return fields
+    description, checklist = card.peek_body()
+    new_description, new_checklist = new.peek_body()
+    if new_description != description:
+        fields['description'] = new_description
+    new_checklist = checklist_to_dicts(new_checklist)
+    if new_checklist != checklist_to_dicts(checklist):
+        fields['checklist'] = new_checklist
+    return fields
+
+
+def card_state(model, card_id):
+    """(column key, dict-format item) of ``card_id`` in ``model``, None if it has no such card."""
+    card = model.card(card_id)
+    return None if card is None else (model.column_of(card_id), card.to_dict(lazy=True))
+
+
+def file_states(data):
+    """{card id: (column key, item)} for every card of dict-format ``data``."""
+    return {item['id']: (key, item) for key, col in data['columns'].items() for item in col['items']}
+
+
+def same_state(state, other):
+    """Whether two card states (None for no card) hold the same card in the same column."""
+    if state is None or other is None:
+        return state is other
+    return state[0] == other[0] and not card_diff(Card.from_dict(state[1]), other[1])
+
+
+def base_states(model, changes):
+    """{card id: (column key, item) or None} for the cards ``changes`` touched, as they were before them."""
+    before = {}
+    for change in reversed(changes):
+        card = change.card
+        if change.op == 'create':
+            before[card.id] = None
+        elif change.op == 'delete':
+            before[card.id] = (change.column, card.to_dict(lazy=True))
+        else:
+            state = before.get(card.id) or card_state(model, card.id)
+            column_key, item = state
+            if change.op == 'move':
+                column_key = change.source
+            else:
+                item = dict(item)
+                for key, value in change.previous.items():
+                    item[key] = checklist_to_dicts(value) if key == 'checklist' else value
+            before[card.id] = (column_key, item)
+    return before
+
+
+def board_diff(model, data):
+    """(changed, reordered) for turning ``model`` into ``data``.
+
+    ``changed`` holds the ids of cards that ``data`` deletes, creates, edits
+    or puts in another column; ``reordered`` is True if cards also only
+    changed places within their column. Returns None when the columns
+    themselves differ (keys, order or names).
+    """
+    if [(key, col.name) for key, col in model.columns.items()] != \
+            [(key, col.get('name', key)) for key, col in data['columns'].items()]:
+        return None
+    wanted = set()
+    changed = set()
+    reordered = False
+    for key, col in data['columns'].items():
+        cards = model.columns[key].cards
+        for index, item in enumerate(col['items']):
+            card_id = item['id']
+            wanted.add(card_id)
+            card = model.card(card_id)
+            if card is None or model.column_of(card_id) != key or card_diff(card, item):
+                changed.add(card_id)
+            elif not reordered and (index >= len(cards) or cards[index] is not card):
+                reordered = True
+    changed.update(card.id for card in model.cards() if card.id not in wanted)
+    return changed, reordered
+
+
+def apply_board(model, data, changed, skip=()):
+    """Turn ``model`` into ``data`` as one batch, leaving the cards in ``skip`` alone.
+
+    Skipped cards keep their place; the others take the file's order around them.
+    """
+    wanted = set(item['id'] for col in data['columns'].values() for item in col['items'])
+    with model.batch():
+        for card_id in changed:
+            if card_id not in wanted and card_id not in skip:
+                model.delete_card(card_id)
+        for key, col in data['columns'].items():
+            cards = model.columns[key].cards
+            index = 0
+            for item in col['items']:
+                card_id = item['id']
+                if card_id in skip:
+                    continue
+                while index < len(cards) and cards[index].id in skip:
+                    index += 1
+                card = model.card(card_id)
+                if card is None:
+                    fields = dict(item)
+                    del fields['id']
+                    model.add_card(key, fields, index, card_id=card_id)
+                else:
+                    if index >= len(cards) or cards[index] is not card:
+                        model.move_card(card_id, key, index)
+                    if card_id in changed:
+                        fields = card_diff(card, item)
+                        if fields:
+                            model.update_card(card_id, fields)
+                index += 1
+    model.next_id = max(model.next_id, data.get('next_id', 1))
+
+
+def record_ids(records):
+    """Ids of the cards touched by journal records."""
+    return {record['item']['id'] if record['op'] == 'create' else record['id'] for record in records}
+
+
+class ReloadReader(QThread):
+    read = pyqtSignal(object, bool, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, reader, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.reader = reader
+
+    def run(self):
+        signature = file_signature(self.filename)
+        try:
+            data, clean = self.reader(self.filename)
+        except READ_ERRORS as e:
+            # Most likely caught mid-write; the next change retries.
+            self.failed.emit(str(e))
+            return
+        self.read.emit(data, clean, signature)
+
+
+class BoardWatcher(QObject):
+    """Reloads the board's file into its model when it changes on disk."""
+
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, board, reader, delay_ms=RELOAD_DELAY_MS):
+        super().__init__(board)
+        self.board = board
+        self.reader = reader
+        self.filename = None
+        self.known = None
+        self.loading = None
+        # {card id: (column key, item) or None} as the file has it, for the cards
+        # edited here and not saved yet; see forget().
+        self.base = {}
+        self.applying = False
+        board.model.subscribe(self.on_change)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watcher.directoryChanged.connect(self.schedule)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.check)
+
+    def watch(self, filename):
+        """Follow ``filename``, whose current contents the board shows."""
+        if filename != self.filename:
+            self.stop()
+            self.filename = filename
+            directory = os.path.dirname(os.path.abspath(filename))
+            self.watcher.addPath(directory)
+        self.remember()
+
+    def stop(self):
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.filename = None
+        self.known = None
+
+    def shutdown(self):
+        self.stop()
+        if self.loading is not None:
+            self.loading.wait()
+
+    def remember(self, filename=None):
+        """Take the file as it is now as the board's own; called after each save."""
+        if self.filename is None or (filename is not None and filename != self.filename):
+            return
+        self.known = file_signature(self.filename)
+        # Atomic saves replace the file, which drops it from the watch list.
+        for path in (self.filename, journal_path(self.filename)):
+            if os.path.exists(path) and path not in self.watcher.files():
+                self.watcher.addPath(path)
+
+    def on_change(self, change):
+        if change.op == 'reset':
+            self.base = {}
+            return
+        if self.applying:
+            return
+        changes = change.changes if change.op == 'batch' else (change,)
+        for card_id, state in base_states(self.board.model, changes).items():
+            self.base.setdefault(card_id, state)
+
+    def forget(self, card_ids=None):
+        """The edits to ``card_ids`` (all if None) are being saved; the file will have them."""
+        if card_ids is None:
+            self.base = {}
+        else:
+            for card_id in card_ids:
+                self.base.pop(card_id, None)
+
+    def schedule(self, path=None):
+        if self.filename is not None:
+            self.timer.start()
+
+    def check(self):
+        if self.filename is None:
+            return
+        if self.loading is not None or self.board.loader is not None or self.board.autosaver.worker.queued():
+            # Our own save, an open or the last reload is still under way.
+            self.timer.start()
+            return
+        signature = file_signature(self.filename)
+        if signature == self.known or signature[0] is None:
+            self.remember()
+            return
+        self.loading = ReloadReader(self.filename, self.reader, self)
+        self.loading.read.connect(self.on_read)
+        self.loading.failed.connect(self.on_failed)
+        self.loading.finished.connect(self.on_finished)
+        self.loading.start()
+
+    def on_finished(self):
+        self.sender().deleteLater()
+        self.loading = None
+
+    def on_failed(self, message):
+        self.status_changed.emit(f"Reload failed: {message}")
+
+    def on_read(self, data, clean, signature):
+        if self.sender().filename != self.filename or self.filename != self.board.filename:
+            return
+        board = self.board
+        journal = board.journal
+        states = file_states(data)
+        # Local edits to cards the file still has as they were are kept;
+        # the others are conflicts.
+        untouched = {card_id for card_id, state in self.base.items() if same_state(state, states.get(card_id))}
+        conflicts = set(self.base) - untouched
+        diff = board_diff(board.model, data)
+        if diff is None:
+            # Columns were added, removed or renamed: reload the whole board.
+            if self.base and not self.confirm_reload(len(self.base)):
+                self.keep_local()
+                return
+            board.model.load(data)
+            local = ()
+            count = len(board.model)
+        else:
+            changed, reordered = diff
+            conflicts &= changed
+            local = untouched | conflicts
+            if not changed and not reordered:
+                # Rewritten with the same cards (or only its metadata changed).
+                count = 0
+            else:
+                if conflicts and self.confirm_reload(len(conflicts)):
+                    local = untouched
+                self.applying = True
+                try:
+                    apply_board(board.model, data, changed, local)
+                finally:
+                    self.applying = False
+                count = len(changed - local)
+            # What the file has now is the base of the edits that stay.
+            self.base = {card_id: states.get(card_id) for card_id in self.base
+                         if not same_state(states.get(card_id), card_state(board.model, card_id))}
+        # What is on disk is the new base; edits made here that it doesn't
+        # have yet need a full save on top of it.
+        journal.reset(self.filename, data.get('journal_generation', 0), has_base=clean)
+        if local:
+            board.model.meta['journal_generation'] = data.get('journal_generation', 0)
+            journal.invalidate()
+            board.mark_dirty()
+        self.known = signature
+        self.remember()
+        self.status_changed.emit(f"Reloaded {count} changed cards from {os.path.basename(self.filename)}")
+
+    def keep_local(self):
+        """Keep the local board and overwrite the file with it on the next save."""
+        self.board.journal.invalidate()
+        self.board.mark_dirty()
+        self.known = file_signature(self.filename)
+        self.status_changed.emit("Kept local changes; the file will be overwritten")
+
+    def confirm_reload(self, conflicts):
+        """Ask whether the file wins over ``conflicts`` cards with unsaved local edits."""
+        box = QMessageBox(QMessageBox.Icon.Warning, "Board Changed on Disk",
+                          f"{os.path.basename(self.filename)} was changed by someone else, and {conflicts} "
+                          f"of the changed cards also have unsaved edits here.",
+                          parent=self.board)
+        reload_button = box.addButton("Use File Version", QMessageBox.ButtonRole.DestructiveRole)
+        box.addButton("Keep My Edits", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        return box.clickedButton() is reload_button
@@ -0,0 +1,148 @@
+# workspace.py
+#
+# Several boards open in tabs. A board's column and card widgets are only
+# built when its tab is first shown. When the widget trees of all boards go
+# over the memory budget, the least recently shown ones are released back to
+# their models (see KanbanBoard.release_widgets) and rebuilt, a screenful
+# first, when their tab comes back.
+
+import os
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QTabWidget, QToolButton, QFileDialog
+
+from board import KanbanBoard, BOARD_FILTER
+
+DEFAULT_BUDGET_MB = 256
+# Rough costs measured under the offscreen platform: a rich-text KanbanCard
+# with its text layout, and a column with its scroll area or list view.
+CARD_WIDGET_BYTES = 64 * 1024
+COLUMN_WIDGET_BYTES = 256 * 1024
+
+
+def same_file_key(filename):
+    return os.path.normcase(os.path.realpath(filename))
+
+
+def widget_cost(board):
+    """Estimated bytes held by ``board``'s widget tree, not counting its model."""
+    if not board.built:
+        return 0
+    return sum(COLUMN_WIDGET_BYTES + len(col.cards) * CARD_WIDGET_BYTES for col in board.columns.values())
+
+
+class Workspace(QTabWidget):
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        super().__init__()
+        self.setWindowTitle("Kanban")
+        self.resize(1600, 800)
+        self.budget = budget_mb * 1024 * 1024
+        # Every open board, least recently shown first.
+        self.recent = OrderedDict()
+        self.setTabsClosable(True)
+        self.setMovable(True)
+        self.setDocumentMode(True)
+
+        new_button = QToolButton()
+        new_button.setText("+")
+        new_button.setToolTip("New board")
+        new_button.clicked.connect(self.new_tab)
+        self.setCornerWidget(new_button)
+
+        self.currentChanged.connect(self.on_current_changed)
+        self.tabCloseRequested.connect(self.close_tab)
+
+    def boards(self):
+        return [self.widget(i) for i in range(self.count())]
+
+    def board_for(self, filename):
+        """The open board showing (or opening) ``filename``, or None."""
+        path = same_file_key(filename)
+        for board in self.boards():
+            names = [board.filename, board.loader.filename if board.loader is not None else None]
+            if any(name is not None and same_file_key(name) == path for name in names):
+                return board
+        return None
+
+    def add_board(self, board):
+        board.workspace = self
+        board.file_menu.addSeparator()
+        board.file_menu.addAction("New Tab", self.new_tab)
+        board.file_menu.addAction("Open in New Tab...", self.open_tab_dialog)
+        board.file_menu.addAction("Close Tab", lambda: self.close_tab(self.indexOf(board)))
+        board.filename_changed.connect(lambda filename: self.update_title(board))
+        # Filling in the rest of a board's cards is what makes it grow.
+        board.filler.finished.connect(self.enforce_budget)
+        self.recent[board] = None
+        self.recent.move_to_end(board, last=False)
+        index = self.addTab(board, "")
+        self.update_title(board)
+        return index
+
+    def new_tab(self):
+        board = KanbanBoard(lazy=True)
+        self.setCurrentIndex(self.add_board(board))
+        return board
+
+    def open_tab(self, filename, show=True):
+        # Two boards saving to one file would interleave their writes.
+        board = self.board_for(filename)
+        if board is not None:
+            if show:
+                self.setCurrentWidget(board)
+            return board
+        board = KanbanBoard(lazy=True)
+        index = self.add_board(board)
+        board.open_board(filename)
+        if show:
+            self.setCurrentIndex(index)
+        return board
+
+    def open_tab_dialog(self):
+        filenames, _ = QFileDialog.getOpenFileNames(self, "Open Boards", "", BOARD_FILTER)
+        for filename in filenames:
+            self.open_tab(filename)
+
+    def update_title(self, board):
+        index = self.indexOf(board)
+        if index >= 0:
+            self.setTabText(index, os.path.basename(board.filename) if board.filename else "Untitled")
+            self.setTabToolTip(index, board.filename or "Not saved yet")
+
+    def close_tab(self, index):
+        board = self.widget(index)
+        if board is None:
+            return
+        self.removeTab(index)
+        self.recent.pop(board, None)
+        board.close()
+        board.deleteLater()
+        if not self.count():
+            self.new_tab()
+
+    def set_budget(self, budget_mb):
+        self.budget = budget_mb * 1024 * 1024
+        self.enforce_budget()
+
+    def on_current_changed(self, index):
+        board = self.widget(index)
+        if board is None:
+            return
+        self.recent.move_to_end(board)
+        self.enforce_budget()
+
+    def enforce_budget(self):
+        """Release the least recently shown boards' widgets until the rest fit the budget."""
+        current = self.currentWidget()
+        total = sum(widget_cost(board) for board in self.recent)
+        for board in list(self.recent):
+            if total <= self.budget:
+                break
+            if board is not current and board.built:
+                total -= widget_cost(board)
+                board.release_widgets()
+
+    def closeEvent(self, event):
+        for board in self.boards():
+            board.close()
+        super().closeEvent(event)